@@ -0,0 +1,50 @@
+"""Benchmark the latency of hooked writes with sidecars saved synchronously or in the background.
+
+Usage::
+
+    python benchmarks/bench_async_sidecars.py --writes 200 --rows 1000
+
+"""
+import os
+import time
+import argparse
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+
+from metapandas import config
+from metapandas.background import flush_sidecars
+from metapandas.metadataframe import MetaDataFrame
+
+
+def run(writes, rows, async_sidecars):
+    """Return the mean seconds per write and the seconds until all sidecars were saved."""
+    directory = tempfile.mkdtemp()
+    mdf = MetaDataFrame(pd.DataFrame({"a": range(rows)}))
+    with patch.object(config, "ASYNC_SIDECARS", async_sidecars):
+        start = time.perf_counter()
+        for index in range(writes):
+            mdf.to_csv(os.path.join(directory, "data-{}.csv".format(index)), index=False)
+        written = time.perf_counter() - start
+        flush_sidecars()
+        flushed = time.perf_counter() - start
+    return written / writes, flushed
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    run(1, args.rows, 0)  # warm up the environment metadata caches
+    print("{:>6} {:>14} {:>14}".format("mode", "ms/write", "total seconds"))
+    for mode, async_sidecars in (("sync", 0), ("async", 1)):
+        latency, total = run(args.writes, args.rows, async_sidecars)
+        print("{:>6} {:>14.3f} {:>14.3f}".format(mode, 1000 * latency, total))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark concurrent writers saving metadata stages to a single shared sidecar.
+
+Each writer process repeatedly merges a new stage into the same sidecar, after
+which the sidecar is checked to ensure that no stages were lost.
+
+Usage::
+
+    python benchmarks/bench_concurrent_writers.py --writers 1 2 4 8 --saves 50
+
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+from metapandas.metadata import MetaData
+from metapandas.sidecar import read_stages
+
+
+def write_stages(filepath, writer, saves, full):
+    """Save :code:`saves` stages to :code:`filepath` from a single writer."""
+    metadata = MetaData()
+    for i in range(saves):
+        data = None if full else {"writer": writer, "save": i}
+        metadata.save_sidecar(filepath=filepath, data=data, additional_data={"save": i})
+    return saves
+
+
+def run(writers, saves, sidecar_format, full):
+    """Return the elapsed time and number of stages recorded for a single benchmark run."""
+    directory = tempfile.mkdtemp()
+    filepath = os.path.join(directory, "data.csv.meta." + sidecar_format)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=writers) as executor:
+        futures = [
+            executor.submit(write_stages, filepath, writer, saves, full)
+            for writer in range(writers)
+        ]
+        expected = sum(future.result() for future in futures)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(read_stages(filepath)), expected
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--saves", type=int, default=50, help="saves per writer")
+    parser.add_argument("--formats", nargs="+", default=["json", "jsonl"])
+    parser.add_argument("--full", action="store_true", help="collect full environment metadata")
+    args = parser.parse_args()
+
+    print("{:>6} {:>8} {:>10} {:>12} {:>10}".format("format", "writers", "seconds", "saves/sec", "lost"))
+    for sidecar_format in args.formats:
+        for writers in args.writers:
+            elapsed, stages, expected = run(writers, args.saves, sidecar_format, args.full)
+            print(
+                "{:>6} {:>8} {:>10.3f} {:>12.1f} {:>10}".format(
+                    sidecar_format, writers, elapsed, expected / elapsed, expected - stages
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark the cost of capturing operation lineage for MetaDataFrames.
+
+Reports the time taken to record a single operation, and the time of a typical
+small-frame operation with and without lineage capture.
+
+Usage::
+
+    python benchmarks/bench_lineage.py --number 200000
+
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+import metapandas.config as cfg
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.lineage import record_operation
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    cfg.LINEAGE = 1
+    source, derived = MetaDataFrame({"a": [1]}), MetaDataFrame({"a": [1]})
+    state = derived.__dict__
+    baseline = min(timeit.repeat(lambda: None, number=args.number, repeat=5))
+    print("{:>28} {:>12}".format("case", "ns/op"))
+    for rate in (1.0, 0.1):
+        cfg.LINEAGE_SAMPLE_RATE = rate
+        for method in ("copy", None):
+            elapsed = min(timeit.repeat(lambda: record_operation(state, source, method), number=args.number, repeat=5))
+            print(
+                "{:>28} {:>12.0f}".format(
+                    "record (rate={}, {})".format(rate, "named" if method else "frame"),
+                    1e9 * (elapsed - baseline) / args.number,
+                )
+            )
+
+    cfg.LINEAGE_SAMPLE_RATE = 1.0
+    frame = pd.DataFrame({"a": range(100)})
+    number = max(args.number // 20, 1)
+    timings = {0: [], 1: []}
+    for _ in range(5):  # interleaved, as the difference is close to the noise
+        for enabled in timings:
+            cfg.LINEAGE = enabled
+            mdf = MetaDataFrame(frame)
+            timings[enabled].append(timeit.timeit(lambda: mdf.head(10), number=number))
+    for enabled, elapsed in timings.items():
+        print("{:>28} {:>12.0f}".format("head() lineage={}".format(enabled), 1e9 * min(elapsed) / number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark the per-operation overhead of each metadata mode on a groupby and merge heavy workload.
+
+The same workload is timed on a plain DataFrame without metadata ('raw'), a MetaDataFrame
+('subclass') and a plain DataFrame holding its metadata in DataFrame.attrs ('accessor'),
+each carrying metadata similar to that of a hooked read.
+
+Usage::
+
+    python benchmarks/bench_metadata_modes.py --rows 100000 --repeat 20
+
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from metapandas.metadata import MetaData
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.accessor import get_metadata, set_metadata
+
+MODES = ("raw", "subclass", "accessor")
+
+# the number of pandas operations performed by workload()
+OPERATIONS = 10
+
+
+def make_frames(rows, metadata):
+    """Return the fact and dimension frames for each mode."""
+    rng = np.random.default_rng(0)
+    facts = pd.DataFrame(
+        {"key": rng.integers(0, 1000, rows), "group": rng.integers(0, 20, rows), "value": rng.random(rows)}
+    )
+    dims = pd.DataFrame({"key": np.arange(1000), "weight": rng.random(1000)})
+    frames = {"raw": (facts, dims)}
+    frames["subclass"] = tuple(MetaDataFrame.from_frame(df.copy(), metadata=dict(metadata)) for df in (facts, dims))
+    frames["accessor"] = tuple(set_metadata(df.copy(), dict(metadata)) for df in (facts, dims))
+    return frames
+
+
+def workload(facts, dims):
+    """Perform a typical chain of groupby and merge operations."""
+    merged = facts.merge(dims, on="key")
+    merged = merged.assign(weighted=merged["value"] * merged["weight"])
+    totals = merged.groupby("group")["weighted"].sum().reset_index()
+    counts = merged.groupby(["group", "key"]).size().reset_index(name="n")
+    result = counts.merge(totals, on="group").sort_values("n")
+    return result[result["n"] > 1].head(10)
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    frames = make_frames(args.rows, MetaData().get_metadata())
+    timings = {}
+    for mode in MODES:
+        workload(*frames[mode])  # warm up
+        timings[mode] = min(timeit.repeat(lambda: workload(*frames[mode]), number=1, repeat=args.repeat))
+
+    print("{:>10} {:>12} {:>16} {:>16}".format("mode", "workload ms", "overhead ms/op", "keeps metadata"))
+    for mode in MODES:
+        print(
+            "{:>10} {:>12.3f} {:>16.4f} {:>16}".format(
+                mode,
+                1000 * timings[mode],
+                1000 * (timings[mode] - timings["raw"]) / OPERATIONS,
+                str(bool(get_metadata(workload(*frames[mode])))),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark reading the metadata of derived frames, which share the metadata of their source.
+
+Each case derives a frame from one whose metadata is that of a hooked read, then reads a
+scalar item ('read'), retrieves a nested dict ('retrieve') or modifies an item ('write')
+of its metadata. Copying all nested dicts and lists upon first access ('eager', as done
+previously) is compared with the shallow copy taken by :code:`MetadataDict`, whose
+immutable nested values are shared rather than copied ('shared').
+
+Usage::
+
+    python benchmarks/bench_metadata_sharing.py --number 2000
+
+"""
+import argparse
+import timeit
+
+from metapandas.metadata import MetaData
+from metapandas.metadataframe import LazyMetadata, thaw
+
+CASES = {
+    "read": lambda metadata: metadata["python-version"],
+    "retrieve": lambda metadata: metadata["environment-variables"],
+    "write": lambda metadata: metadata.update({"checked": True}),
+}
+
+
+def eager(source):
+    """Derive from :code:`source` and copy all nested dicts and lists upon first access."""
+    return thaw(source.derive().data)
+
+
+def shared(source):
+    """Derive from :code:`source` copying on write, see :code:`MetadataDict`."""
+    return source.derive().materialise()
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    source = LazyMetadata(MetaData().get_metadata())
+    print("{:>10} {:>12} {:>12} {:>10}".format("case", "eager us", "shared us", "speedup"))
+    for case, access in CASES.items():
+        timings = {}
+        for name, derive in (("eager", eager), ("shared", shared)):
+            elapsed = min(timeit.repeat(lambda: access(derive(source)), number=args.number, repeat=5))
+            timings[name] = 1e6 * elapsed / args.number
+        print(
+            "{:>10} {:>12.2f} {:>12.2f} {:>9.1f}x".format(
+                case, timings["eager"], timings["shared"], timings["eager"] / timings["shared"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark reading many files and their sidecars one at a time versus with read_many().
+
+Usage::
+
+    python benchmarks/bench_read_many.py --files 200 --rows 10000 --reader csv
+
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import metapandas.hooks.pandas as hooks
+from metapandas.bulk import read_many
+from metapandas.metadataframe import MetaDataFrame
+
+
+def make_files(files, rows, reader):
+    """Write :code:`files` data files, each with a sidecar, returning their paths."""
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, "part-{}.{}".format(index, reader))
+        mdf = MetaDataFrame(pd.DataFrame({"key": rng.integers(0, 1000, rows), "value": rng.random(rows)}))
+        getattr(mdf, "to_" + reader)(path)
+        paths.append(path)
+    return paths
+
+
+def sequential(paths, reader):
+    """Read each file in turn with the hooked reader, loading its metadata."""
+    return [getattr(hooks, "read_" + reader)(path).metadata for path in paths]
+
+
+def bulk(paths, reader, executor, workers):
+    """Read the files with read_many(), loading their metadata."""
+    return [frame.metadata for frame in read_many(paths, reader=reader, executor=executor, max_workers=workers)]
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--reader", default="csv", choices=["csv", "parquet", "pickle"])
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    paths = make_files(args.files, args.rows, args.reader)
+    runs = [
+        ("sequential", lambda: sequential(paths, args.reader)),
+        ("thread", lambda: bulk(paths, args.reader, "thread", args.workers)),
+        ("process", lambda: bulk(paths, args.reader, "process", args.workers)),
+    ]
+    print("{:>10} {:>10} {:>12}".format("mode", "seconds", "files/sec"))
+    for mode, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print("{:>10} {:>10.3f} {:>12.1f}".format(mode, elapsed, args.files / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark the peak memory of reading data with metadata hooks installed versus raw pandas.
+
+Each read is measured in a fresh process, recording the growth of the peak resident set
+size (RSS) during the read. The benchmark fails when the hooked reads exceed the raw
+pandas peak by more than the given tolerance.
+
+Usage::
+
+    python benchmarks/bench_read_memory.py --rows 1000000 --tolerance 0.05
+
+"""
+import os
+import sys
+import argparse
+import resource
+import tempfile
+import multiprocessing
+
+from contextlib import redirect_stderr, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+VARIANTS = ("raw", "hooked", "constructor")
+
+
+def current_rss() -> int:
+    """Return the current resident set size of this process in bytes."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> int:
+    """Return the peak resident set size of this process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(reader, path, variant):
+    """Return the peak RSS growth in bytes whilst reading :code:`path` in the given :code:`variant`."""
+    import gc
+    import pandas
+    from metapandas.metadataframe import MetaDataFrame
+    from metapandas.hooks.pandas import PandasMetaDataHooks
+
+    if variant == "hooked":
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+            PandasMetaDataHooks.install_metadata_hooks()
+    read = getattr(pandas, reader)
+    gc.collect()
+    before = current_rss()
+    result = read(path)
+    if variant == "constructor":  # the previous wrapping of read results
+        result = MetaDataFrame(result)
+    # a typical reduction, which consolidates the blocks of some frames first
+    result.select_dtypes("number").sum()
+    return peak_rss() - before
+
+
+def make_data(directory, rows):
+    """Write csv and parquet files (with sidecars) of :code:`rows` rows and return their paths."""
+    from metapandas.metadataframe import MetaDataFrame
+
+    rng = np.random.default_rng(0)
+    frame = MetaDataFrame({"f{}".format(i): rng.random(rows) for i in range(6)})
+    frame["i"] = np.arange(rows)
+    frame["s"] = pd.Series(np.arange(rows) % 100).astype(str).to_numpy()
+    paths = {"read_csv": os.path.join(directory, "data.csv")}
+    frame.to_csv(paths["read_csv"], index=False)
+    try:
+        import pyarrow  # noqa: F401
+
+        paths["read_parquet"] = os.path.join(directory, "data.parquet")
+        frame.to_parquet(paths["read_parquet"])
+    except ImportError:
+        print("Skipping read_parquet as pyarrow is not installed", file=sys.stderr)
+    return paths
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3, help="take the minimum of this many runs")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed relative increase")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_data(directory, args.rows)
+        print("{:>14} {:>12} {:>12} {:>8}".format("reader", "variant", "peak MiB", "ratio"))
+        for reader, path in paths.items():
+            peaks = {}
+            for variant in VARIANTS:
+                runs = []
+                for _ in range(args.repeat):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        runs.append(executor.submit(measure, reader, path, variant).result())
+                peaks[variant] = min(runs)
+            for variant in VARIANTS:
+                ratio = peaks[variant] / peaks["raw"]
+                print(
+                    "{:>14} {:>12} {:>12.1f} {:>8.3f}".format(
+                        reader, variant, peaks[variant] / 2 ** 20, ratio
+                    )
+                )
+            if peaks["hooked"] > peaks["raw"] * (1 + args.tolerance):
+                failed = True
+                print(
+                    "FAIL: hooked {} peak exceeds raw pandas by more than {:.0%}".format(
+                        reader, args.tolerance
+                    ),
+                    file=sys.stderr,
+                )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark encoding and decoding of a typical metadata sidecar with each serializer.
+
+Usage::
+
+    python benchmarks/bench_serializers.py --repeat 50
+
+"""
+import argparse
+import timeit
+
+import pandas as pd
+
+from metapandas.metadata import MetaData
+from metapandas.serializers import SERIALIZERS, get_serializer
+
+
+def sample_metadata():
+    """Return metadata similar to that saved by a hooked DataFrame.to_csv() call."""
+    data = MetaData().get_metadata()
+    data["storage"] = {"method": pd.DataFrame.to_csv, "args": [], "kwargs": {"index": False}}
+    return data
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    data = sample_metadata()
+    print("{:>22} {:>12} {:>12} {:>12}".format("serializer", "encode ms", "decode ms", "bytes"))
+    for name, (_, available) in SERIALIZERS.items():
+        if not available():
+            continue
+        serializer = get_serializer(name)
+        for indent in (None, 2):
+            encoded = serializer.dumps(data, indent=indent)
+            encode = timeit.timeit(lambda: serializer.dumps(data, indent=indent), number=args.repeat)
+            decode = timeit.timeit(lambda: serializer.loads(encoded), number=args.repeat)
+            print(
+                "{:>22} {:>12.3f} {:>12.3f} {:>12}".format(
+                    "{} (indent={})".format(name, indent),
+                    1000 * encode / args.repeat,
+                    1000 * decode / args.repeat,
+                    len(encoded.encode("utf8")),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark the size and parse time of a typical metadata sidecar in each format.
+
+Indented JSON, as written by earlier versions, is compared against compact JSON and
+MessagePack, with the latter both uncompressed and compressed with gzip and zstd.
+
+Usage::
+
+    python benchmarks/bench_sidecar_formats.py --repeat 50
+
+"""
+import os
+import argparse
+import tempfile
+import timeit
+
+from unittest.mock import patch
+
+import pandas as pd
+
+from metapandas import config
+from metapandas.metadata import MetaData
+from metapandas.sidecar import load_sidecar
+
+CASES = [
+    # (label, sidecar format, indent, compression)
+    ("json (indent=4)", "json", 4, "none"),
+    ("json", "json", 0, "none"),
+    ("msgpack", "msgpack", 0, "none"),
+    ("msgpack+gzip", "msgpack", 0, "gzip"),
+    ("msgpack+zstd", "msgpack", 0, "zstd"),
+]
+
+
+def sample_metadata():
+    """Return metadata similar to that saved by a hooked DataFrame.to_csv() call."""
+    data = MetaData().get_metadata()
+    data["storage"] = {"method": pd.DataFrame.to_csv, "args": [], "kwargs": {"index": False}}
+    return data
+
+
+def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    data = sample_metadata()
+    directory = tempfile.mkdtemp()
+    print("{:>16} {:>10} {:>10} {:>10}".format("format", "bytes", "save ms", "load ms"))
+    for label, sidecar_format, indent, compression in CASES:
+        filepath = os.path.join(directory, "data.csv.meta." + sidecar_format)
+        with patch.object(config, "SIDECAR_INDENT", indent), patch.object(
+            config, "SIDECAR_COMPRESSION", compression
+        ):
+            save = timeit.timeit(
+                lambda: MetaData().save_sidecar(filepath=filepath, data=data, exists_action="overwrite"),
+                number=args.repeat,
+            )
+        load = timeit.timeit(lambda: load_sidecar(filepath), number=args.repeat)
+        print(
+            "{:>16} {:>10} {:>10.3f} {:>10.3f}".format(
+                label, os.path.getsize(filepath), 1000 * save / args.repeat, 1000 * load / args.repeat
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
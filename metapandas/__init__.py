@@ -2,6 +2,7 @@
 
 from metapandas.metadataframe import MetaDataFrame
 from metapandas.metadata import MetaData
+from metapandas.context import metadata_context
 from metapandas.hooks.pandas import (
     PandasMetaDataHooks,
     pandas_read_with_metadata,
@@ -17,3 +18,6 @@ from metapandas.hooks.pandas import (
     read_sql_table,
     read_sql_query,
 )
+from metapandas.bulk import read_many
+from metapandas.background import flush_sidecars
+from metapandas import aio
@@ -0,0 +1,170 @@
+"""Provides the :code:`DataFrame.meta` accessor for tracking metadata without subclassing.
+
+When :code:`metapandas.config.METADATA_MODE` is 'accessor' the read hooks return plain
+:code:`pandas.DataFrame` objects, rather than :code:`MetaDataFrame` instances, holding
+their metadata in :code:`DataFrame.attrs`. This keeps any library fast paths which
+check :code:`type(df) is pd.DataFrame` and avoids the Python-level constructor of a
+DataFrame subclass on every operation.
+
+pandas deep copies :code:`DataFrame.attrs` onto each derived frame, so the metadata is
+held by a :code:`LazyMetadata` whose deep copy is a copy-on-write view, see
+:code:`LazyMetadata.derive()`, keeping derivation cheap however large the metadata.
+It is wrapped in a :code:`MetadataAttr`, which serialises to JSON as an empty object,
+so writers storing :code:`DataFrame.attrs` as JSON, e.g. :code:`to_parquet()`, keep
+the remaining attrs even when called without the metadata hooks.
+
+Examples
+--------
+>>> import pandas as pd
+>>> df = pd.DataFrame({'a': [1, 2]})
+>>> df.meta['source'] = 'example'
+>>> df.head(1).meta.metadata
+{'source': 'example'}
+>>> type(df.head(1)) is pd.DataFrame
+True
+
+"""
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from metapandas.metadataframe import LazyMetadata, MetaDataFrame
+
+METADATA_ATTR = "metapandas"
+
+
+class MetadataAttr(dict):
+    """The :code:`DataFrame.attrs` entry holding the metadata of a plain DataFrame.
+
+    This is an empty dictionary as far as serialisers are concerned, e.g.
+    :code:`json.dumps()`, with the metadata itself saved to the sidecar.
+
+    Parameters
+    ----------
+    lazy: LazyMetadata
+        The metadata of the frame.
+
+    Examples
+    --------
+    >>> import json
+    >>> json.dumps({'user': 1, METADATA_ATTR: MetadataAttr(LazyMetadata({'source': 'example'}))})
+    '{"user": 1, "metapandas": {}}'
+
+    """
+
+    __slots__ = ("lazy",)
+
+    def __init__(self, lazy: LazyMetadata):
+        """Create a new (empty) entry holding :code:`lazy`."""
+        super(MetadataAttr, self).__init__()
+        self.lazy = lazy
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "MetadataAttr":
+        """Return an entry holding a copy-on-write view, as pandas deep copies attrs onto derived frames."""
+        return MetadataAttr(self.lazy.derive())
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare by identity, so pandas only propagates the attrs of frames holding the same metadata."""
+        return self is other
+
+    def __ne__(self, other: Any) -> bool:
+        """Compare by identity, see :code:`MetadataAttr.__eq__()`."""
+        return self is not other
+
+    __hash__ = None  # type: ignore
+
+    def __reduce__(self):
+        """Pickle with the (loaded) metadata."""
+        return (MetadataAttr, (self.lazy,))
+
+    def __repr__(self) -> str:
+        """Return a representation showing the wrapped metadata."""
+        return "MetadataAttr({!r})".format(self.lazy.data)
+
+
+def _lazy_metadata(frame: pd.DataFrame) -> Optional[LazyMetadata]:
+    """Return the metadata held in the attrs of :code:`frame`, if any."""
+    entry = (getattr(frame, "attrs", None) or {}).get(METADATA_ATTR)  # n.b. attrs were added in pandas 1.0
+    return entry.lazy if isinstance(entry, MetadataAttr) else None
+
+
+def get_metadata(frame: Any) -> Dict[str, Any]:
+    """Return the metadata dictionary of :code:`frame`, or a new empty dictionary if it has none.
+
+    Both :code:`MetaDataFrame` instances and plain DataFrames with metadata held
+    in :code:`DataFrame.attrs` are supported.
+
+    """
+    if isinstance(frame, MetaDataFrame):
+        return frame.metadata
+    lazy = _lazy_metadata(frame) if isinstance(frame, pd.DataFrame) else None
+    return lazy.materialise() if lazy is not None else {}
+
+
+def set_metadata(frame: pd.DataFrame, metadata: Any) -> pd.DataFrame:
+    """Set the metadata of :code:`frame` from a dictionary or :code:`LazyMetadata` and return the frame."""
+    if isinstance(frame, MetaDataFrame):
+        frame.metadata = metadata
+    else:
+        lazy = metadata if isinstance(metadata, LazyMetadata) else LazyMetadata(metadata)
+        frame.attrs[METADATA_ATTR] = MetadataAttr(lazy)
+    return frame
+
+
+def strip_metadata_attrs(frame: Any) -> Any:
+    """Return :code:`frame` without metadata in its :code:`attrs`, e.g. before pandas writes attrs to a file.
+
+    A shallow copy is returned when there is metadata to remove, so neither the data
+    nor the attrs of :code:`frame` itself are modified.
+
+    """
+    attrs = getattr(frame, "attrs", None) if isinstance(frame, pd.DataFrame) else None
+    if not attrs or METADATA_ATTR not in attrs:
+        return frame
+    stripped = frame.copy(deep=False)
+    stripped.attrs = {key: value for key, value in attrs.items() if key != METADATA_ATTR}
+    return stripped
+
+
+@pd.api.extensions.register_dataframe_accessor("meta")
+class MetaAccessor:
+    """Accessor for the metadata of a DataFrame, registered as :code:`DataFrame.meta`.
+
+    Parameters
+    ----------
+    frame: DataFrame
+        The frame whose metadata is accessed.
+
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        """Create a new accessor for :code:`frame`."""
+        self._frame = frame
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """The metadata dictionary, with any sidecar only loaded upon first access."""
+        if isinstance(self._frame, MetaDataFrame):
+            return self._frame.metadata
+        lazy = _lazy_metadata(self._frame)
+        if lazy is None:
+            lazy = LazyMetadata()
+            self._frame.attrs[METADATA_ATTR] = MetadataAttr(lazy)
+        return lazy.materialise()
+
+    @metadata.setter
+    def metadata(self, value: Any):
+        """Set the metadata from a dictionary or :code:`LazyMetadata` instance."""
+        set_metadata(self._frame, value)
+
+    def __getitem__(self, key: str) -> Any:
+        """Return the metadata item :code:`key`."""
+        return self.metadata[key]
+
+    def __setitem__(self, key: str, value: Any):
+        """Set the metadata item :code:`key`."""
+        self.metadata[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether the metadata contains :code:`key`."""
+        return key in self.metadata
@@ -0,0 +1,203 @@
+"""Provides a compact, bounded log of the processing actions registered with MetaData.
+
+Actions are appended to buffers of plain tuples, so registering an action is O(1) and
+a long-running process only retains the most recent actions. Each thread appends to its
+own buffer, so concurrent writers never contend for a lock, with the buffers merged in
+registration order when read. Every :code:`maxlen` registrations, whichever thread
+registers trims the actions no longer retained from all buffers, and removes the empty
+buffers of finished threads, so the log holds at most about twice :code:`maxlen` actions
+however many threads write to it. Timestamps and descriptions are only formatted when
+the log is serialised, see :code:`ActionLog.to_dict()`.
+
+Examples
+--------
+>>> log = ActionLog(maxlen=2)
+>>> for batch in range(3):
+...     _ = log.register('data.csv', 'load', 'batch {}'.format(batch))
+>>> len(log), log.dropped
+(2, 1)
+
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import time
+import heapq
+import datetime
+import itertools
+import threading
+
+# a logged action: (sequence number, on, timestamp, action, description)
+Entry = Tuple[int, str, float, str, str]
+
+
+class ActionLog:
+    """An append-only log of processing actions, holding at most :code:`maxlen` entries.
+
+    Parameters
+    ----------
+    maxlen: int or None
+        The maximum number of actions to retain, with the oldest actions dropped
+        first. The log is unbounded when None (or zero).
+
+    """
+
+    __slots__ = ("maxlen", "_buffers", "_counter", "_registered", "_cleared", "_trimming")
+
+    def __init__(self, maxlen: Optional[int] = None):
+        """Create a new empty log."""
+        self.maxlen = maxlen or None
+        self._buffers = {}  # type: Dict[int, deque]
+        self._counter = itertools.count()
+        self._registered = 0  # the sequence number following the last registered action
+        self._cleared = 0  # the number of actions registered before the last call of clear()
+        self._trimming = threading.Lock()
+
+    def register(self, on: Any, action: str, description: str) -> "FormattedActions":
+        """Append an action undertaken :code:`on` something, returning the (lazily formatted) actions on it.
+
+        n.b. next(), dict.setdefault() and deque.append() are atomic, so registration is thread-safe without a lock.
+
+        """
+        buffer = self._buffers.get(threading.get_ident())
+        if buffer is None:
+            threading.current_thread()  # n.b. so that _trim() sees threads not started by threading as alive
+            buffer = self._buffers.setdefault(threading.get_ident(), deque())
+        sequence = next(self._counter)
+        buffer.append((sequence, str(on), time.time(), str(action), description))
+        if sequence >= self._registered:  # n.b. another thread may have since registered a later action
+            self._registered = sequence + 1
+        if self.maxlen and sequence % self.maxlen == self.maxlen - 1:
+            self._trim()
+        return FormattedActions(self, str(on), sequence)
+
+    def _trim(self):
+        """Remove the actions no longer retained from all buffers, and the empty buffers of finished threads.
+
+        n.b. only the thread holding the lock removes actions, from the left, whereas the
+        thread owning a buffer only appends to its right, so registration need not wait.
+
+        """
+        if not self._trimming.acquire(blocking=False):
+            return  # already being trimmed by another thread
+        try:
+            oldest = self._registered - self.maxlen
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident, buffer in list(self._buffers.items()):
+                while buffer and buffer[0][0] < oldest:
+                    buffer.popleft()
+                if not buffer and ident not in alive:
+                    self._buffers.pop(ident, None)
+        finally:
+            self._trimming.release()
+
+    def _snapshot(self) -> List[Entry]:
+        """Return the retained actions of all threads in registration order."""
+        # n.b. copying a deque is atomic, whereas iterating over one being appended to is not
+        buffers = [list(buffer) for buffer in list(self._buffers.values())]
+        entries = buffers[0] if len(buffers) == 1 else list(heapq.merge(*buffers))
+        return entries[-self.maxlen:] if self.maxlen else entries
+
+    @property
+    def registered(self) -> int:
+        """The number of actions registered, including those since dropped or cleared."""
+        return self._registered
+
+    @property
+    def dropped(self) -> int:
+        """The number of actions dropped from the log as it reached :code:`maxlen`, since last cleared."""
+        return self._registered - self._cleared - len(self)
+
+    def __len__(self) -> int:
+        """Return the number of actions retained."""
+        registered = self._registered - self._cleared
+        return min(registered, self.maxlen) if self.maxlen else registered
+
+    def __bool__(self) -> bool:
+        """Check whether any actions are retained."""
+        return self._registered > self._cleared
+
+    def __iter__(self) -> Iterator[Entry]:
+        """Iterate over a snapshot of the retained actions, oldest first."""
+        return iter(self._snapshot())
+
+    def clear(self):
+        """Remove all actions."""
+        self._buffers.clear()
+        self._cleared = self._registered
+
+    @staticmethod
+    def _timestamp(seconds: float) -> str:
+        """Format a timestamp as previously used for keys of :code:`MetaData.actions`."""
+        return str(datetime.datetime.fromtimestamp(seconds))
+
+    def to_dict(self, until: Optional[int] = None) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """Return the actions as nested dictionaries of :code:`{on: {timestamp: {action: description}}}`.
+
+        Descriptions of the same action at the same time are joined by newlines.
+        Only actions with a sequence number up to :code:`until` are included, if given.
+
+        """
+        actions = {}  # type: Dict[str, Dict[str, Dict[str, str]]]
+        for sequence, on, seconds, action, description in self:
+            if until is not None and sequence > until:
+                break
+            described = actions.setdefault(on, {}).setdefault(self._timestamp(seconds), {})
+            described[action] = described.get(action, "") + (
+                description.strip("\n") + "\n" if description else ""
+            )
+        return actions
+
+
+class FormattedActions(Sequence):
+    """The actions logged on something, formatted as for :code:`MetaData.register_action()` when first accessed.
+
+    This is a view of the log, formatted from the actions it retains when first accessed
+    and unchanged thereafter. Actions dropped from the log, or cleared, before then are
+    therefore missing, whereas actions registered later are never included.
+
+    Parameters
+    ----------
+    log: ActionLog
+        The log of actions.
+    on: str
+        The filename (or thing) the actions refer to.
+    until: int
+        The sequence number of the last action to include.
+
+    """
+
+    __slots__ = ("_log", "_on", "_until", "_items")
+
+    def __init__(self, log: ActionLog, on: str, until: int):
+        """Create a new (unformatted) list of actions."""
+        self._log = log
+        self._on = on
+        self._until = until
+        self._items = None  # type: Optional[List[str]]
+
+    def _format(self) -> List[str]:
+        """Return (and cache) the formatted actions."""
+        if self._items is None:
+            timestamps = self._log.to_dict(until=self._until).get(self._on, {})
+            self._items = [
+                "{}: {}".format(k, ["<{ki}> {vi}".format(ki=ki, vi=vi) for ki, vi in v.items()])
+                for k, v in timestamps.items()
+            ]
+        return self._items
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        """Return the formatted action(s) at :code:`index`."""
+        return self._format()[index]
+
+    def __len__(self) -> int:
+        """Return the number of formatted actions."""
+        return len(self._format())
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare the formatted actions with a list."""
+        return self._format() == list(other) if isinstance(other, Sequence) else NotImplemented
+
+    def __repr__(self) -> str:
+        """Represent as a list."""
+        return repr(self._format())
@@ -0,0 +1,138 @@
+"""Provides asyncio variants of the metadata read hooks and :code:`DataFrame.to_*` methods.
+
+The hooked pandas functions block whilst reading or writing data, loading or saving the
+sidecar and collecting the environment metadata (which may list packages using
+subprocesses). Their asyncio variants, e.g. :code:`await metapandas.aio.read_parquet(...)`
+and :code:`await df.aio.to_parquet(...)`, instead run all of this in the executor of the
+event loop, with the sidecar of a read decoded there too rather than upon first access of
+its metadata on the loop.
+
+At most :code:`metapandas.config.AIO_CONCURRENCY` calls per event loop run at once, with
+further calls waiting their turn without blocking the loop. The executor is that of the
+loop, see :code:`asyncio.AbstractEventLoop.set_default_executor()`, and the
+:code:`MetaData` of the calling task, see :code:`metapandas.context.metadata_context()`,
+is used when saving.
+
+Examples
+--------
+>>> async def convert(paths):  # doctest: +SKIP
+...     frames = await asyncio.gather(*(read_csv(path) for path in paths))
+...     await asyncio.gather(*(df.aio.to_parquet(path + '.parquet') for df, path in zip(frames, paths)))
+
+"""
+from functools import partial
+from typing import Any, Callable, Tuple
+from weakref import WeakKeyDictionary
+
+import asyncio
+
+import pandas as pd
+
+import metapandas.config as cfg
+import metapandas.hooks.pandas as hooks
+from metapandas.context import current_metadata, metadata_context
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.accessor import get_metadata
+
+_SEMAPHORES = WeakKeyDictionary()  # type: WeakKeyDictionary
+
+
+def _semaphore(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """Return the semaphore limiting the concurrent calls on :code:`loop`.
+
+    At most :code:`metapandas.config.AIO_CONCURRENCY` calls run at once, with the
+    semaphore replaced should the limit be changed.
+
+    """
+    limit = max(1, cfg.AIO_CONCURRENCY)
+    limited = _SEMAPHORES.get(loop)  # type: Tuple[int, asyncio.Semaphore]
+    if limited is None or limited[0] != limit:
+        limited = (limit, asyncio.Semaphore(limit))
+        _SEMAPHORES[loop] = limited
+    return limited[1]
+
+
+def _call_with_metadata(recorder: Any, func: Callable, *args, **kwargs) -> Any:
+    """Call :code:`func` within the metadata context of the calling task, e.g. in an executor thread."""
+    with metadata_context(recorder):
+        result = func(*args, **kwargs)
+    if isinstance(result, pd.DataFrame):
+        get_metadata(result)  # load any sidecar here rather than on the event loop
+    return result
+
+
+async def run_in_executor(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking metadata read or write :code:`func` in the executor of the running event loop.
+
+    Parameters
+    ----------
+    func: Callable
+        The function to call, e.g. a hooked pandas reader.
+    args: tuple
+        Positional arguments of :code:`func`.
+    kwargs: dict
+        Keyword arguments of :code:`func`.
+
+    Returns
+    -------
+    Any
+        The result of :code:`func`.
+
+    """
+    # n.b. asyncio.get_running_loop() was added in Python 3.7, before which get_event_loop() returns the running loop
+    loop = (getattr(asyncio, "get_running_loop", None) or asyncio.get_event_loop)()
+    async with _semaphore(loop):
+        call = partial(_call_with_metadata, current_metadata(), func, *args, **kwargs)
+        return await loop.run_in_executor(None, call)
+
+
+def _async_reader(name: str) -> Callable:
+    """Return the asyncio variant of the hooked pandas reader :code:`name`."""
+    reader = getattr(hooks, name)
+
+    async def read(*args, **kwargs):
+        return await run_in_executor(reader, *args, **kwargs)
+
+    read.__name__ = read.__qualname__ = name
+    read.__doc__ = "Asynchronously call :code:`metapandas.{}()`, see :code:`run_in_executor()`.".format(name)
+    return read
+
+
+def _async_writer(name: str) -> Callable:
+    """Return the asyncio variant of the hooked :code:`DataFrame` method :code:`name`."""
+    # n.b. the MetaDataFrame method is hooked whether or not the pandas hooks are installed
+    writer = getattr(MetaDataFrame, name)
+
+    async def write(self, *args, **kwargs):
+        return await run_in_executor(writer, self._frame, *args, **kwargs)
+
+    write.__name__ = write.__qualname__ = name
+    write.__doc__ = "Asynchronously call :code:`DataFrame.{}()` saving metadata, see :code:`run_in_executor()`.".format(
+        name
+    )
+    return write
+
+
+@pd.api.extensions.register_dataframe_accessor("aio")
+class AsyncAccessor:
+    """Accessor for the asyncio variants of the metadata saving methods, registered as :code:`DataFrame.aio`.
+
+    Parameters
+    ----------
+    frame: DataFrame
+        The frame to save.
+
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        """Create a new accessor for :code:`frame`."""
+        self._frame = frame
+
+
+for _method in hooks.PandasMetaDataHooks.PANDAS_DATAFRAME_SAVE_HOOKS:
+    setattr(AsyncAccessor, _method, _async_writer(_method))
+
+# add asynchronous pandas readers to module symbols
+for _method in hooks.PandasMetaDataHooks.PANDAS_READ_HOOKS:
+    if getattr(hooks, _method, None) is not None:
+        globals()[_method] = _async_reader(_method)
@@ -0,0 +1,145 @@
+"""Provides a background queue for saving sidecars off the critical path of data writes.
+
+When :code:`metapandas.config.ASYNC_SIDECARS` is set, the hooked :code:`to_*` methods
+return as soon as the pandas write is done, with the sidecar (including collecting the
+environment metadata, serialising it and merging it into any existing sidecar) saved by
+a single background thread in the order the data was written.
+
+The queue holds at most :code:`metapandas.config.SIDECAR_QUEUE_SIZE` sidecars, beyond
+which writers block until the background thread catches up. Queued sidecars are saved
+before the interpreter exits, waiting at most :code:`metapandas.config.SIDECAR_EXIT_TIMEOUT`
+seconds, or on calling :code:`flush_sidecars()`, which the read hooks also call so that
+data written in this process is always read with its metadata.
+
+A process forked whilst sidecars are queued leaves them to its parent, starting with an
+empty queue of its own.
+
+Notes
+-----
+Processing actions registered with the :code:`MetaData` of a write after the write,
+but before its sidecar is saved, are included in the sidecar. Errors saving a sidecar
+are reported and kept in :code:`SidecarQueue.errors` rather than raised to the writer.
+
+"""
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+import os
+import time
+import queue
+import atexit
+import threading
+
+import metapandas.config as cfg
+from metapandas.util import verr
+from metapandas.metadataframe import thaw
+
+
+class SidecarQueue:
+    """A bounded queue of sidecars saved in order by a background thread.
+
+    Parameters
+    ----------
+    maxsize: int
+        The maximum number of queued sidecars, with writers blocking once reached.
+        The queue is unbounded when zero.
+
+    """
+
+    def __init__(self, maxsize: int = 0):
+        """Create a new queue, whose thread is started upon first use."""
+        self.queue = queue.Queue(maxsize=max(0, maxsize))  # type: queue.Queue
+        self.errors = deque(maxlen=100)  # type: Deque[Tuple[str, Exception]]
+        self._thread = None  # type: Optional[threading.Thread]
+        self._lock = threading.Lock()
+        self._registered = False
+        self._pid = os.getpid()
+
+    def submit(self, recorder: Any, filepath: Any, **kwargs):
+        """Queue :code:`recorder.save_sidecar(filepath=filepath, **kwargs)`, blocking whilst the queue is full.
+
+        n.b. the metadata to save is copied, so the caller may go on to modify it.
+
+        """
+        if "additional_data" in kwargs:
+            kwargs["additional_data"] = thaw(kwargs["additional_data"])
+        self._start()
+        self.queue.put((recorder, filepath, kwargs))
+
+    def _start(self):
+        """Start the background thread, unless already running (or lost on forking)."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="metapandas-sidecar-writer", daemon=True)
+                self._thread.start()
+            if not self._registered:
+                atexit.register(self._flush_at_exit)
+                self._registered = True
+
+    def _run(self):
+        """Save queued sidecars until the interpreter exits."""
+        while True:
+            recorder, filepath, kwargs = self.queue.get()
+            try:
+                recorder.save_sidecar(filepath=filepath, **kwargs)
+            except Exception as err:
+                self.errors.append((str(filepath), err))
+                verr("Could not save metadata to {} due to {!r}".format(filepath, err))
+            finally:
+                self.queue.task_done()
+
+    def _flush_at_exit(self):
+        """Save the queued sidecars before the interpreter exits, unless taking too long or forked since."""
+        if self._pid != os.getpid():
+            return  # queued by the parent process, which saves them
+        if not self.flush(cfg.SIDECAR_EXIT_TIMEOUT):
+            verr("Exiting without saving {} queued sidecar(s)".format(self.pending))
+
+    @property
+    def pending(self) -> int:
+        """The number of sidecars queued or being saved."""
+        return self.queue.unfinished_tasks
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued sidecars are saved, returning False if :code:`timeout` seconds passed first."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+_SIDECAR_QUEUE = None  # type: Optional[SidecarQueue]
+_SIDECAR_QUEUE_LOCK = threading.Lock()
+
+
+def sidecar_queue() -> SidecarQueue:
+    """Return the sidecar queue of this process, sized by :code:`metapandas.config.SIDECAR_QUEUE_SIZE`."""
+    global _SIDECAR_QUEUE
+    if _SIDECAR_QUEUE is None:
+        with _SIDECAR_QUEUE_LOCK:
+            if _SIDECAR_QUEUE is None:
+                _SIDECAR_QUEUE = SidecarQueue(cfg.SIDECAR_QUEUE_SIZE)
+    return _SIDECAR_QUEUE
+
+
+def flush_sidecars(timeout: Optional[float] = None) -> bool:
+    """Wait until all sidecars queued in the background are saved, see :code:`SidecarQueue.flush()`."""
+    return _SIDECAR_QUEUE is None or _SIDECAR_QUEUE.flush(timeout)
+
+
+def _reset_sidecar_queue():
+    """Discard the queue of the parent process, whose thread (and any waiters on its locks) is not forked."""
+    global _SIDECAR_QUEUE, _SIDECAR_QUEUE_LOCK
+    _SIDECAR_QUEUE = None
+    _SIDECAR_QUEUE_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # Python >= 3.7
+    os.register_at_fork(after_in_child=_reset_sidecar_queue)
@@ -0,0 +1,251 @@
+"""Provides caches for expensive-to-collect environment metadata.
+
+Two layers are available:
+
+  1. :code:`EnvironmentCache` - a process-wide, in-memory cache.
+  2. :code:`DiskCache` - a host-level cache shared by processes, e.g. ~/.cache/metapandas,
+     which is only used when enabled by :code:`metapandas.config.DISK_CACHE`
+
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+
+from loguru import logger
+
+import metapandas.config as cfg
+from metapandas.util import atomic_write
+
+try:
+    import psutil
+except (ImportError, PermissionError):
+    psutil = None
+
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+_MISSING = object()
+
+
+def path_mtime(path: Optional[Union[Path, str]]) -> Optional[int]:
+    """Return the modification time of :code:`path` in nanoseconds or None if unavailable."""
+    if not path:
+        return None
+    try:
+        return os.stat(str(path)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_boot_id() -> str:
+    """Return an identifier which changes whenever the host is rebooted."""
+    try:
+        with open(BOOT_ID_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    return str(psutil.boot_time()) if psutil else ""
+
+
+class DiskCache:
+    """A host-level cache of JSON compatible values shared between processes.
+
+    Each value is stored in its own file named after a hash of the entry name and key,
+    where the key combines the boot id, the python interpreter and a fingerprint of the
+    state the value was derived from. Files are written atomically, so concurrent
+    readers observe either the previous or the new value but never a partial write.
+
+    Parameters
+    ----------
+    directory: str or Path
+        The directory to store cache files within, which is created on first write.
+
+    """
+
+    MISSING = _MISSING
+
+    def __init__(self, directory: Union[Path, str]):
+        """Create a new disk cache within :code:`directory`."""
+        self.directory = Path(os.path.expanduser(str(directory)))
+        self._host_key = (get_boot_id(), sys.executable)
+
+    def _filepath(self, name: str, fingerprint: Hashable) -> Path:
+        """Return the cache file path for entry :code:`name` with :code:`fingerprint`."""
+        key = json.dumps([name, self._host_key, fingerprint], default=str)
+        return self.directory / "{}.json".format(hashlib.sha1(key.encode("utf8")).hexdigest())
+
+    def load(
+        self,
+        name: str,
+        fingerprint: Hashable = None,
+        ttl: Optional[float] = None,
+        not_before: float = 0.0,
+    ) -> Any:
+        """Return the cached value or :code:`DiskCache.MISSING` if unavailable.
+
+        Parameters
+        ----------
+        name: str
+            The cache entry identifier.
+        fingerprint: Hashable
+            A JSON compatible token describing the state the value depends upon.
+        ttl: float or None
+            Values older than this many seconds are ignored.
+        not_before: float
+            Values written before this (epoch) time are ignored.
+
+        """
+        filepath = self._filepath(name, fingerprint)
+        try:
+            mtime = filepath.stat().st_mtime
+            if mtime < not_before or (ttl is not None and time.time() - mtime >= ttl):
+                return self.MISSING
+            with open(str(filepath), encoding="utf8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self.MISSING
+
+    def store(self, name: str, value: Any, fingerprint: Hashable = None):
+        """Atomically write :code:`value` to the cache, logging rather than raising on failure."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self._filepath(name, fingerprint), json.dumps(value))
+        except (OSError, TypeError, ValueError) as err:
+            logger.warning('Unable to write "{}" to disk cache due to "{}"'.format(name, err))
+
+
+class EnvironmentCache:
+    """A thread-safe, process-wide cache for expensive environment metadata.
+
+    Each entry is stored against a name together with a fingerprint of the
+    state it was derived from, e.g. the modification time of a package database.
+    An entry is recomputed when its fingerprint changes, once it is older than
+    :code:`ttl` seconds or after being explicitly invalidated.
+
+    Parameters
+    ----------
+    ttl: float or None
+        The maximum age of an entry in seconds. Entries never expire when None,
+        whereas caching is disabled entirely for a zero (or negative) value.
+    disk_cache: DiskCache or None
+        An optional host-level cache used for entries requested with :code:`persist=True`.
+
+    Examples
+    --------
+    >>> cache = EnvironmentCache(ttl=60)
+    >>> cache.get("answer", lambda: 42)
+    42
+    >>> "answer" in cache
+    True
+    >>> cache.invalidate("answer")
+    >>> "answer" in cache
+    False
+
+    """
+
+    def __init__(self, ttl: Optional[float] = None, disk_cache: Optional[DiskCache] = None):
+        """Create a new (empty) cache."""
+        self.ttl = ttl
+        self.disk_cache = disk_cache
+        self._entries = {}  # type: Dict[str, Tuple[Hashable, float, Any]]
+        self._locks = {}  # type: Dict[str, Any]
+        self._lock = threading.Lock()
+        self._invalidated = {}  # type: Dict[Optional[str], float]
+
+    def __contains__(self, name: str) -> bool:
+        """Check whether a cached value for :code:`name` is held."""
+        return name in self._entries
+
+    def _is_fresh(self, entry: Optional[Tuple[Hashable, float, Any]], fingerprint: Hashable) -> bool:
+        """Check whether :code:`entry` is still valid for :code:`fingerprint`."""
+        if entry is None or entry[0] != fingerprint:
+            return False
+        return self.ttl is None or (time.monotonic() - entry[1]) < self.ttl
+
+    def _entry_lock(self, name: str):
+        """Return the lock guarding computation of entry :code:`name`."""
+        with self._lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        fingerprint: Hashable = None,
+        persist: bool = False,
+    ) -> Any:
+        """Return the cached value for :code:`name`, calling :code:`factory` to (re)compute it if stale.
+
+        Parameters
+        ----------
+        name: str
+            The cache entry identifier.
+        factory: Callable
+            A function without arguments returning the value to cache.
+        fingerprint: Hashable
+            A cheap-to-compute token describing the state the value depends upon.
+            The entry is recomputed whenever this differs from the cached fingerprint.
+        persist: bool
+            Whether to share the (JSON compatible) value with other processes via :code:`disk_cache`.
+
+        Returns
+        -------
+        Any
+            The (possibly cached) value returned by :code:`factory`.
+
+        Notes
+        -----
+        Concurrent callers requesting the same stale entry will wait on a
+        single computation rather than each calling :code:`factory`.
+
+        """
+        if self.ttl is not None and self.ttl <= 0:
+            return factory()
+        entry = self._entries.get(name)
+        if self._is_fresh(entry, fingerprint):
+            return entry[2]
+        with self._entry_lock(name):
+            # another thread may have refreshed the entry whilst waiting on the lock
+            entry = self._entries.get(name)
+            if self._is_fresh(entry, fingerprint):
+                return entry[2]
+            disk_cache = self.disk_cache if persist else None
+            value = _MISSING
+            if disk_cache:
+                not_before = max(self._invalidated.get(None, 0.0), self._invalidated.get(name, 0.0))
+                value = disk_cache.load(name, fingerprint, self.ttl, not_before)
+            if value is _MISSING:
+                value = factory()
+                if disk_cache:
+                    disk_cache.store(name, value, fingerprint)
+            self._entries[name] = (fingerprint, time.monotonic(), value)
+        return value
+
+    def invalidate(self, name: Optional[str] = None):
+        """Remove entry :code:`name` from the cache or all entries when not given.
+
+        Notes
+        -----
+        Persisted entries are not removed from disk, but are ignored by this cache
+        until rewritten with a freshly computed value.
+
+        """
+        with self._lock:
+            self._invalidated[name] = time.time()
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+def default_disk_cache() -> Optional[DiskCache]:
+    """Return a cache in :code:`metapandas.config.DISK_CACHE_DIR` if enabled by :code:`metapandas.config.DISK_CACHE`."""
+    return DiskCache(cfg.DISK_CACHE_DIR) if cfg.DISK_CACHE else None
+
+
+ENVIRONMENT_CACHE = EnvironmentCache(ttl=cfg.ENVIRONMENT_CACHE_TTL, disk_cache=default_disk_cache())
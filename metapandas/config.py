@@ -42,4 +42,42 @@ INCLUDE_BREW_PACKAGES = parse_env_flag("METAPANDAS_INCLUDE_BREW_PACKAGES", 1)
 INCLUDE_CONDA_PACKAGES = parse_env_flag("METAPANDAS_INCLUDE_CONDA_PACKAGES", 1)
 INCLUDE_PYTHON_PACKAGE = parse_env_flag("METAPANDAS_INCLUDE_PYTHON_PACKAGES", 1)
 
+IO_THREADS = parse_env_flag("METAPANDAS_IO_THREADS", 8)
+READ_MANY_EXECUTOR = parse_env_flag("METAPANDAS_READ_MANY_EXECUTOR", "thread", str, "thread")
+AIO_CONCURRENCY = parse_env_flag("METAPANDAS_AIO_CONCURRENCY", 8)
+
+COLLECTOR_THREADS = parse_env_flag("METAPANDAS_COLLECTOR_THREADS", 8)
+COLLECTOR_TIMEOUT = parse_env_flag("METAPANDAS_COLLECTOR_TIMEOUT", 30, float)
+
+ENVIRONMENT_CACHE_TTL = parse_env_flag("METAPANDAS_ENVIRONMENT_CACHE_TTL", 3600, float)
+DISK_CACHE = parse_env_flag("METAPANDAS_DISK_CACHE", 0)
+DISK_CACHE_DIR = parse_env_flag(
+    "METAPANDAS_CACHE_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME", "~/.cache"), "metapandas"),
+    str,
+)
+ENVIRONMENT_STORE_DIR = parse_env_flag("METAPANDAS_ENVIRONMENT_STORE", "", str, "")
+TRUST_SIDECAR_ENVIRONMENT_STORE = parse_env_flag("METAPANDAS_TRUST_SIDECAR_ENVIRONMENT_STORE", 0)
+PREFETCH_METADATA = parse_env_flag("METAPANDAS_PREFETCH_METADATA", 0)
+
+SIDECAR_FORMAT = parse_env_flag("METAPANDAS_SIDECAR_FORMAT", "json", str)
+ASYNC_SIDECARS = parse_env_flag("METAPANDAS_ASYNC_SIDECARS", 0)
+SIDECAR_QUEUE_SIZE = parse_env_flag("METAPANDAS_SIDECAR_QUEUE_SIZE", 1000)
+SIDECAR_EXIT_TIMEOUT = parse_env_flag("METAPANDAS_SIDECAR_EXIT_TIMEOUT", 60, float)
+READ_STAGES = parse_env_flag("METAPANDAS_READ_STAGES", "all", str)
+LAZY_METADATA = parse_env_flag("METAPANDAS_LAZY_METADATA", 1)
+METADATA_MODE = parse_env_flag("METAPANDAS_METADATA_MODE", "subclass", str, "subclass")
+
+ACTION_LOG_SIZE = parse_env_flag("METAPANDAS_ACTION_LOG_SIZE", 10000)
+
+LINEAGE = parse_env_flag("METAPANDAS_LINEAGE", 0)
+LINEAGE_MAX_DEPTH = parse_env_flag("METAPANDAS_LINEAGE_MAX_DEPTH", 256)
+LINEAGE_SAMPLE_RATE = parse_env_flag("METAPANDAS_LINEAGE_SAMPLE_RATE", 1.0, float, 1.0)
+CONSTRUCTOR_SUMMARY_BYTES = parse_env_flag("METAPANDAS_CONSTRUCTOR_SUMMARY_BYTES", 1024)
+
+SERIALIZER = parse_env_flag("METAPANDAS_SERIALIZER", "auto", str, "auto")
+SIDECAR_INDENT = parse_env_flag("METAPANDAS_SIDECAR_INDENT", 0)
+SIDECAR_COMPRESSION = parse_env_flag("METAPANDAS_SIDECAR_COMPRESSION", "none", str, "none")
+EMBED_METADATA = parse_env_flag("METAPANDAS_EMBED_METADATA", 0)
+
 JSON_DUMPS_KWARGS = parse_env_flag("METAPANDAS_JSON_DUMPS_KWARGS", {}, dict, {})
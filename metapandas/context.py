@@ -0,0 +1,81 @@
+"""Provides the :code:`MetaData` used by the save hooks within the current thread or asyncio task.
+
+Each save hook records to the :code:`MetaData` given by :code:`current_metadata()`, which is
+that of the innermost :code:`metadata_context()`, or else a new instance for every save, so
+that concurrent writers never share one by default.
+
+"""
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import threading
+
+if TYPE_CHECKING:  # pragma: no cover
+    from metapandas.metadata import MetaData  # noqa: F401
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python < 3.7, where the context is approximated by the current thread
+
+    class ContextVar:  # type: ignore
+        """A minimal thread-local stand-in for :code:`contextvars.ContextVar`."""
+
+        def __init__(self, name: str, default: Any = None):
+            """Create a new variable."""
+            self.name = name
+            self._default = default
+            self._local = threading.local()
+
+        def get(self) -> Any:
+            """Return the value of the variable in the current thread."""
+            return getattr(self._local, "value", self._default)
+
+        def set(self, value: Any) -> Any:
+            """Set the value of the variable in the current thread, returning a token to reset it."""
+            token = self.get()
+            self._local.value = value
+            return token
+
+        def reset(self, token: Any):
+            """Restore the value prior to the :code:`set()` call returning :code:`token`."""
+            self._local.value = token
+
+
+_CURRENT_METADATA = ContextVar("metapandas_metadata", default=None)
+
+
+def _new_metadata() -> "MetaData":
+    """Return a new :code:`MetaData` instance."""
+    from metapandas.metadata import MetaData  # n.b. imported here as metapandas.metadata imports this module
+
+    return MetaData()
+
+
+def current_metadata() -> "MetaData":
+    """Return the :code:`MetaData` of the current context, see :code:`metadata_context()`, or else a new instance."""
+    metadata = _CURRENT_METADATA.get()
+    return metadata if metadata is not None else _new_metadata()
+
+
+@contextmanager
+def metadata_context(metadata: Optional["MetaData"] = None) -> Iterator["MetaData"]:
+    """Use :code:`metadata` (or a new :code:`MetaData`) when saving DataFrames within this context.
+
+    The context is that of the current thread (or asyncio task), so each concurrent writer
+    may record to its own :code:`MetaData`. Threads started within the context, e.g. by a
+    :code:`ThreadPoolExecutor`, do not inherit it unless run with :code:`contextvars.copy_context()`.
+
+    Examples
+    --------
+    >>> with metadata_context() as metadata:
+    ...     _ = metadata.register_action('data.csv', 'clean', 'drop nulls')
+    ...     current_metadata() is metadata
+    True
+
+    """
+    metadata = metadata if metadata is not None else _new_metadata()
+    token = _CURRENT_METADATA.set(metadata)
+    try:
+        yield metadata
+    finally:
+        _CURRENT_METADATA.reset(token)
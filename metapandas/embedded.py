@@ -0,0 +1,346 @@
+"""Provides functions for embedding metadata within self-describing data files.
+
+Rather than writing a separate sidecar, metadata may be stored within the data file
+itself, as part of the same write:
+
+  1. parquet and feather - in the key-value metadata of the Arrow schema.
+  2. hdf - as a (compressed) attribute of the HDF5 node holding the data.
+
+The embedded metadata is encoded in the same way as a json sidecar and is read back
+from the footer (or node attributes) using the file handle the data is read through,
+so no extra file is opened.
+
+"""
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from loguru import logger
+
+from metapandas.sidecar import decode_document, encode_document
+from metapandas.serializers import compress, decompress
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    import pyarrow.feather
+except ImportError:
+    pyarrow = None
+
+try:
+    import tables
+except ImportError:
+    tables = None
+
+EMBEDDED_METADATA_KEY = "metapandas"
+
+EMBED_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".h5": "hdf",
+    ".hdf": "hdf",
+    ".hdf5": "hdf",
+}  # type: Dict[str, str]
+
+# keyword arguments of the pandas writers which open the HDF5 file rather than write the data
+HDF_STORE_KWARGS = ("mode", "complevel", "complib", "fletcher32")
+
+# HDF5 attributes are limited to 64KiB, less some space for the attribute header
+HDF_ATTRIBUTE_LIMIT = 65536 - 1024
+
+
+def get_embed_format(filepath: Union[Path, str]) -> Optional[str]:
+    """Return the embedded metadata format of :code:`filepath` based upon its extension, if any."""
+    return EMBED_EXTENSIONS.get(os.path.splitext(str(filepath))[1].lower())
+
+
+def is_available(embed_format: Optional[str]) -> bool:
+    """Check whether the libraries needed to embed metadata in :code:`embed_format` are installed."""
+    if embed_format in ("parquet", "feather"):
+        return pyarrow is not None
+    if embed_format == "hdf":
+        return tables is not None
+    return False
+
+
+def can_embed(embed_format: Optional[str], path: Any, kwargs: Dict[str, Any]) -> bool:
+    """Check whether metadata may be embedded when writing to :code:`path` with writer :code:`kwargs`.
+
+    Only local file paths are supported, with parquet additionally restricted to
+    single (non-partitioned) files written by the pyarrow engine and hdf requiring
+    the :code:`key` to be given by keyword.
+
+    """
+    if not is_available(embed_format) or not isinstance(path, (str, Path)):
+        return False
+    if embed_format == "parquet":
+        return (
+            kwargs.get("engine", "auto") in (None, "auto", "pyarrow")
+            and not kwargs.get("partition_cols")
+            and not kwargs.get("storage_options")
+            and not kwargs.get("filesystem")
+        )
+    if embed_format == "hdf":
+        return "key" in kwargs
+    return True
+
+
+def _encode(metadata: Dict[str, Any]) -> bytes:
+    """Encode :code:`metadata` for embedding."""
+    encoded = encode_document(metadata, "json")
+    return encoded if isinstance(encoded, bytes) else encoded.encode("utf8")
+
+
+def _decode(encoded: Optional[Union[bytes, str, np.ndarray]]) -> Optional[Dict[str, Any]]:
+    """Decode embedded metadata, returning None when absent."""
+    if encoded is None:
+        return None
+    if isinstance(encoded, np.ndarray):  # HDF5 attribute
+        encoded = encoded.tobytes()
+    encoded = encoded if isinstance(encoded, bytes) else encoded.encode("utf8")
+    return decode_document(decompress(encoded), "json")
+
+
+def _hdf_metadata(store: Any, key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Return the metadata embedded within node :code:`key` of open HDFStore :code:`store`, if any."""
+    if key is None:
+        keys = store.keys()
+        key = keys[0] if len(keys) == 1 else None
+    storer = store.get_storer(key) if key is not None else None
+    return _decode(getattr(storer.attrs, EMBEDDED_METADATA_KEY, None) if storer is not None else None)
+
+
+def _arrow_metadata(embed_format: str, source: Any) -> Optional[Dict[str, Any]]:
+    """Return the metadata embedded within the Arrow schema of parquet or feather :code:`source`, if any."""
+    try:
+        if embed_format == "parquet":
+            schema = pyarrow.parquet.read_schema(source)
+        else:
+            schema = pyarrow.ipc.open_file(source).schema
+    except (pyarrow.ArrowException, OSError):  # e.g. a feather v1 file
+        return None
+    return _decode((schema.metadata or {}).get(EMBEDDED_METADATA_KEY.encode("utf8")))
+
+
+def _read_metadata(path: str, reader: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Return the embedded metadata of :code:`path` from :code:`reader()`, logging rather than raising decode errors."""
+    try:
+        return reader()
+    except ValueError as err:
+        logger.warning('Unable to decode metadata embedded in "{}" due to "{}"'.format(path, err))
+        return None
+
+
+def _arrow_table(frame: pd.DataFrame, metadata: Dict[str, Any], preserve_index: Optional[bool] = None):
+    """Return :code:`frame` as an Arrow table with :code:`metadata` added to its schema."""
+    table = pyarrow.Table.from_pandas(frame, preserve_index=preserve_index)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[EMBEDDED_METADATA_KEY.encode("utf8")] = _encode(metadata)
+    return table.replace_schema_metadata(schema_metadata)
+
+
+def write_embedded(
+    embed_format: str,
+    func: Callable,
+    frame: pd.DataFrame,
+    path: Union[Path, str],
+    metadata: Dict[str, Any],
+    **kwargs
+) -> Any:
+    """Write :code:`frame` to :code:`path` with :code:`metadata` embedded in the same write.
+
+    Parameters
+    ----------
+    embed_format: {'parquet', 'feather', 'hdf'}
+        The file format to write.
+    func: Callable
+        The (undecorated) pandas writer, e.g. :code:`pandas.DataFrame.to_hdf`.
+    frame: DataFrame
+        The data to write.
+    path: str or Path
+        The local file to write.
+    metadata: dict
+        The metadata to embed.
+    kwargs: dict
+        Keyword arguments of the pandas writer.
+
+    Returns
+    -------
+    Any
+        The value returned by the pandas writer, i.e. None.
+
+    Raises
+    ------
+    ValueError
+        If the metadata cannot be embedded in :code:`embed_format`, in which case nothing is written.
+
+    Notes
+    -----
+    HDF5 attributes are limited in size, so the metadata is gzip compressed when embedded in hdf files.
+
+    """
+    path = str(path)
+    if embed_format == "parquet":
+        kwargs.pop("engine", None)
+        for key in ("partition_cols", "storage_options", "filesystem"):
+            kwargs.pop(key, None)
+        table = _arrow_table(frame, metadata, preserve_index=kwargs.pop("index", None))
+        if getattr(frame, "attrs", None):
+            # retain DataFrame.attrs as pandas itself does
+            schema_metadata = dict(table.schema.metadata)
+            schema_metadata[b"PANDAS_ATTRS"] = json.dumps(frame.attrs).encode("utf8")
+            table = table.replace_schema_metadata(schema_metadata)
+        pyarrow.parquet.write_table(table, path, compression=kwargs.pop("compression", "snappy"), **kwargs)
+        return None
+
+    if embed_format == "feather":
+        pyarrow.feather.write_feather(_arrow_table(frame, metadata), path, **kwargs)
+        return None
+
+    if embed_format == "hdf":
+        encoded = compress(_encode(metadata), "gzip")
+        if len(encoded) > HDF_ATTRIBUTE_LIMIT:
+            raise ValueError(
+                "Metadata of {} bytes is too large to embed as an HDF5 attribute".format(len(encoded))
+            )
+        key = kwargs.pop("key")
+        store_kwargs = {k: kwargs.pop(k) for k in HDF_STORE_KWARGS if k in kwargs}
+        with pd.HDFStore(path, **store_kwargs) as store:
+            result = func(frame, store, key=key, **kwargs)
+            # n.b. stored as an array as numpy.bytes_ would drop trailing null bytes
+            setattr(store.get_storer(key).attrs, EMBEDDED_METADATA_KEY, np.frombuffer(encoded, dtype=np.uint8))
+        return result
+
+    raise ValueError("Cannot embed metadata in {!r} files".format(embed_format))
+
+
+def can_read_embedded(embed_format: Optional[str], path: Any, kwargs: Dict[str, Any]) -> bool:
+    """Check whether :code:`path` can be read with its embedded metadata from a single open file."""
+    if not is_available(embed_format) or not isinstance(path, (str, Path)):
+        return False
+    if not os.path.isfile(str(path)) or kwargs.get("storage_options") or kwargs.get("filesystem"):
+        return False
+    if embed_format == "parquet":
+        return kwargs.get("engine", "auto") in (None, "auto", "pyarrow")
+    if embed_format == "hdf":
+        # iterators keep the store open after returning
+        return not kwargs.get("iterator") and not kwargs.get("chunksize")
+    return True
+
+
+def read_embedded(
+    embed_format: str, func: Callable, path: Union[Path, str], *args, **kwargs
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Read :code:`path` with pandas reader :code:`func` together with any embedded metadata.
+
+    Parameters
+    ----------
+    embed_format: {'parquet', 'feather', 'hdf'}
+        The file format to read.
+    func: Callable
+        The (undecorated) pandas reader, e.g. :code:`pandas.read_parquet`.
+    path: str or Path
+        The local file to read.
+    args, kwargs:
+        The remaining arguments of the pandas reader.
+
+    Returns
+    -------
+    Tuple[Any, dict or None]
+        The value returned by the pandas reader and the embedded metadata, if any.
+        Undecodable metadata is logged and otherwise ignored.
+
+    """
+    path = str(path)
+    if embed_format == "hdf":
+        with pd.HDFStore(path, mode="r") as store:
+            result = func(store, *args, **kwargs)
+            key = kwargs.get("key", args[0] if args else None)
+            return result, _read_metadata(path, lambda: _hdf_metadata(store, key))
+
+    with open(path, "rb") as f:
+        result = func(f, *args, **kwargs)
+        f.seek(0)
+        return result, _read_metadata(path, lambda: _arrow_metadata(embed_format, f))
+
+
+def load_embedded(
+    path: Union[Path, str], embed_format: Optional[str] = None, key: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Return the metadata embedded within :code:`path` without reading the data, if any.
+
+    Parameters
+    ----------
+    path: str or Path
+        The data file.
+    embed_format: {'parquet', 'feather', 'hdf'} or None
+        The file format, inferred from the :code:`path` extension when not given.
+    key: str or None
+        The HDF5 node to read, which may be omitted when the file only holds one.
+
+    """
+    embed_format = embed_format or get_embed_format(path)
+    if not is_available(embed_format):
+        return None
+    path = str(path)
+    if embed_format == "hdf":
+        with pd.HDFStore(path, mode="r") as store:
+            return _hdf_metadata(store, key)
+    with open(path, "rb") as f:
+        return _arrow_metadata(embed_format, f)
+
+
+def save_embedded(
+    metadata: Any,
+    embed_format: str,
+    func: Callable,
+    frame: pd.DataFrame,
+    filepath: Optional[Union[Path, str]] = None,
+    data: Optional[dict] = None,
+    additional_data: Optional[dict] = None,
+    environment_store: Optional[Union[Path, str]] = None,
+    **kwargs
+) -> Any:
+    """Write :code:`frame` to :code:`filepath` with the metadata of a :code:`MetaData` embedded within the data file.
+
+    Parameters
+    ----------
+    metadata: MetaData
+        The metadata object collecting the metadata to embed.
+    embed_format: {'parquet', 'feather', 'hdf'}
+        The format of the data file.
+    func: Callable
+        The (undecorated) pandas writer for :code:`embed_format`, e.g. :code:`pandas.DataFrame.to_parquet`.
+    frame: DataFrame
+        The data to write.
+    filepath: str or Path or None
+        The path of the data file. Uses the filepath of :code:`metadata` when not given.
+    data: dict or None
+        The data to write. Will call :code:`Metadata.get_metdata()` method if not given.
+    additional_data: dict or None
+        Extra JSON compatible dictionary to include.
+    environment_store: str or Path or None
+        See :code:`MetaData.save_as_json()`.
+    kwargs: dict
+        Keyword arguments passed to the pandas writer.
+
+    Notes
+    -----
+    As the data file is rewritten, any previously embedded metadata is replaced rather than merged.
+
+    See Also
+    --------
+    write_embedded
+    load_embedded
+
+    """
+    data = metadata.prepare_data(data, additional_data, environment_store)
+    return write_embedded(embed_format, func, frame, filepath or metadata.filepath, data, **kwargs)
@@ -1,18 +1,26 @@
 """Provides decorator functions for modifying pandas."""
-from functools import wraps
+from functools import partial, wraps
 from contextlib import redirect_stdout, redirect_stderr
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import os
 import sys
 import inspect
 
 import pandas as pd
-import jsonpickle as json
 
-from metapandas.util import verr, vprint
+import metapandas.config as cfg
+from metapandas.util import summarise_arguments, verr, vprint
 from metapandas.metadata import MetaData
-from metapandas.metadataframe import MetaDataFrame
+from metapandas.context import current_metadata
+from metapandas.metadataframe import LazyMetadata, MetaDataFrame, thaw
+from metapandas.accessor import get_metadata, set_metadata, strip_metadata_attrs
+from metapandas.lineage import get_lineage, lineage_graph, start_lineage
+from metapandas.cache import path_mtime
+from metapandas.background import flush_sidecars, sidecar_queue
+from metapandas.store import resolve_environment_refs
+from metapandas.sidecar import find_sidecar, load_sidecar, resolve_sidecar_format, sidecar_path
+from metapandas.embedded import can_embed, can_read_embedded, read_embedded, save_embedded
 from metapandas.hooks.manager import HooksManager
 
 # exported pandas functions (pre-wrapped)
@@ -28,22 +36,161 @@ read_sql_table = getattr(pd, "read_sql_table", None)
 read_sql_query = getattr(pd, "read_sql_query", None)
 
 
+def _load_sidecar_metadata(metapath: str, stages: Optional[str], mtime: Optional[int]) -> Dict[str, Any]:
+    """Load the metadata of sidecar :code:`metapath` upon first access of a lazily read MetaDataFrame."""
+    try:
+        if path_mtime(metapath) != mtime:
+            vprint(
+                "Metadata {} has changed since its data was read".format(metapath),
+                file=sys.stderr,
+            )
+        return resolve_environment_refs(load_sidecar(metapath, stages=stages))
+    except IOError as err:
+        vprint(
+            "Could not load metadata from {} due to {!r}".format(metapath, err),
+            file=sys.stderr,
+        )
+    except Exception as err:
+        vprint("Error setting up metadata due to {!r}".format(err), file=sys.stderr)
+    return {}
+
+
+class MetaDataFrameReader:
+    """An iterator over the chunks of a chunked read, e.g. :code:`read_csv(..., chunksize=...)`.
+
+    Each chunk is returned as a MetaDataFrame (or, in accessor mode, a DataFrame) sharing
+    the metadata of the read, which is therefore loaded at most once however many chunks
+    are read, see :code:`LazyMetadata.derive()`. Other attributes, e.g. :code:`close()`,
+    are those of the wrapped pandas reader.
+
+    Parameters
+    ----------
+    reader: Iterator
+        The pandas reader, e.g. a :code:`TextFileReader`.
+    metadata: dict or LazyMetadata
+        The metadata shared by all chunks.
+    source: str or None
+        The name of the reading function, which starts the lineage of each chunk.
+
+    """
+
+    def __init__(self, reader: Any, metadata: Any, source: Optional[str] = None):
+        """Wrap :code:`reader`."""
+        self.reader = reader
+        self.metadata = metadata if isinstance(metadata, LazyMetadata) else LazyMetadata(metadata)
+        self.source = source
+        self.accessor = cfg.METADATA_MODE == "accessor"
+
+    def _wrap(self, chunk: Any) -> Any:
+        """Return :code:`chunk` with the shared metadata."""
+        if not (self.accessor and isinstance(chunk, pd.DataFrame)):
+            chunk = MetaDataFrame.from_frame(chunk)
+            if cfg.LINEAGE and self.source:
+                start_lineage(chunk, self.source)
+        return set_metadata(chunk, self.metadata.derive())
+
+    def __iter__(self) -> "MetaDataFrameReader":
+        """Return the iterator itself."""
+        return self
+
+    def __next__(self) -> Any:
+        """Read the next chunk."""
+        return self._wrap(next(self.reader))
+
+    def get_chunk(self, *args, **kwargs) -> Any:
+        """Read a chunk, see :code:`TextFileReader.get_chunk()`."""
+        return self._wrap(self.reader.get_chunk(*args, **kwargs))
+
+    def __enter__(self) -> "MetaDataFrameReader":
+        """Enter the context of the pandas reader."""
+        if hasattr(self.reader, "__enter__"):
+            self.reader.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the pandas reader."""
+        if hasattr(self.reader, "__exit__"):
+            return self.reader.__exit__(*exc_info)
+        if hasattr(self.reader, "close"):
+            self.reader.close()
+        return None
+
+    def __getattr__(self, name: str) -> Any:
+        """Return attributes of the pandas reader."""
+        return getattr(self.__dict__["reader"], name)
+
+
+def _is_chunked(result: Any, kwargs: Dict[str, Any]) -> bool:
+    """Check whether a pandas reader returned an iterator over chunks rather than the data itself."""
+    return (
+        bool(kwargs.get("chunksize") or kwargs.get("iterator"))
+        and not isinstance(result, (pd.DataFrame, pd.Series))
+        and hasattr(result, "__iter__")
+    )
+
+
 def pandas_read_with_metadata(function=None, argname="path", **meta_kwargs):
-    """Decorate pandas read function to track JSON metadata."""
+    """Decorate pandas read function to track JSON metadata.
+
+    Notes
+    -----
+    The keyword argument :code:`stages` ('all' or 'latest') controls whether every
+    stage of the sidecar is loaded or only the most recent one, defaulting to
+    :code:`metapandas.config.READ_STAGES`.
+
+    The keyword argument :code:`embed` ('parquet', 'feather' or 'hdf') names the format
+    of data files which may hold embedded metadata. Such metadata is read through the
+    same open file as the data and takes precedence over any sidecar.
+
+    When :code:`metapandas.config.LAZY_METADATA` is set, only the sidecar path and
+    modification time are recorded when reading, with the sidecar decoded upon first
+    access of :code:`MetaDataFrame.metadata`, see :code:`LazyMetadata.stats()`.
+
+    When :code:`metapandas.config.METADATA_MODE` is 'accessor', DataFrames are returned
+    as plain :code:`pandas.DataFrame` objects with their metadata held in
+    :code:`DataFrame.attrs` and accessed through :code:`DataFrame.meta`.
+
+    Chunked reads, e.g. with :code:`chunksize` or :code:`iterator=True`, return a
+    :code:`MetaDataFrameReader` whose chunks share the (once loaded) metadata.
+
+    When :code:`metapandas.config.ASYNC_SIDECARS` is set, any sidecars queued in the
+    background are saved before reading, see :code:`metapandas.background.flush_sidecars()`.
+
+    """
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            result = MetaDataFrame(func(*args, **kwargs))
+            if cfg.ASYNC_SIDECARS:
+                flush_sidecars()  # so that sidecars of data just written are found
+            embedded = None
+            embed_format = meta_kwargs.get("embed")
+            datapath = kwargs.get(argname, args[0] if args else None)
+            if embed_format and can_read_embedded(embed_format, datapath, kwargs):
+                reader_args = args if argname in kwargs else args[1:]
+                reader_kwargs = {k: v for k, v in kwargs.items() if k != argname}
+                frame, embedded = read_embedded(embed_format, func, datapath, *reader_args, **reader_kwargs)
+            else:
+                frame = func(*args, **kwargs)
+            chunked = _is_chunked(frame, kwargs)
+            if chunked:
+                result = frame
+            elif cfg.METADATA_MODE == "accessor" and isinstance(frame, pd.DataFrame):
+                result = frame
+            else:
+                result = MetaDataFrame.from_frame(frame)
+                if cfg.LINEAGE:
+                    start_lineage(result, func.__name__)
 
             # get default metadata
-            metadata = getattr(result, "metadata", {})
+            metadata = {} if chunked else get_metadata(result)
+            constructor_args, constructor_kwargs = summarise_arguments(args, kwargs)
             metadata.update(
                 {
                     "constructor": {
-                        "class": MetaDataFrame,
-                        "args": args,
-                        "kwargs": kwargs,
+                        "class": MetaDataFrame if chunked else type(result),
+                        "args": constructor_args,
+                        "kwargs": constructor_kwargs,
                     }
                 }
             )
@@ -51,16 +198,31 @@ def pandas_read_with_metadata(function=None, argname="path", **meta_kwargs):
                 metapath = None
                 if meta_kwargs.get("argname_is_path", None) is False:
                     metadata.update({argname: kwargs.get(argname, args[0])})
+                elif embedded is not None:
+                    metadata.update(
+                        {"data_filepath": datapath, "metadata_filepath": datapath}
+                    )
+                    metadata.update(resolve_environment_refs(embedded))
                 else:
                     datapath = kwargs.get(argname, args[0])
-                    metapath = str(datapath).replace("/", os.sep) + ".meta.json"
+                    metapath = find_sidecar(datapath)
+                    mtime = path_mtime(metapath)
+                    stages = meta_kwargs.get("stages")
 
-                    # load additional metadata and combine
-                    with open(metapath) as metafile:
+                    if cfg.LAZY_METADATA and mtime is not None:
+                        # defer decoding until MetaDataFrame.metadata is first accessed
+                        metadata.update(
+                            {"data_filepath": datapath, "metadata_filepath": metapath}
+                        )
+                        loader = partial(_load_sidecar_metadata, metapath, stages, mtime)
+                        metadata = LazyMetadata(metadata, loader=loader)
+                    else:
+                        # load additional metadata and combine
+                        sidecar_data = load_sidecar(metapath, stages=stages)
                         metadata.update(
                             {"data_filepath": datapath, "metadata_filepath": metapath}
                         )
-                        metadata.update(json.loads(metafile.read()))
+                        metadata.update(resolve_environment_refs(sidecar_data))
             except IOError as err:
                 vprint(
                     "Could not load metadata from {} due to {!r}".format(metapath, err),
@@ -71,7 +233,10 @@ def pandas_read_with_metadata(function=None, argname="path", **meta_kwargs):
                     "Error setting up metadata due to {!r}".format(err), file=sys.stderr
                 )
             finally:
-                result.metadata = metadata
+                if chunked:
+                    result = MetaDataFrameReader(result, metadata, source=func.__name__)
+                else:
+                    set_metadata(result, metadata)
             return result
 
         return wrapper
@@ -80,16 +245,43 @@ def pandas_read_with_metadata(function=None, argname="path", **meta_kwargs):
 
 
 def pandas_save_with_metadata(
-    function=None, argname="path", metadata=MetaData(), **meta_kwargs
+    function=None, argname="path", metadata=None, **meta_kwargs
 ):
-    """Decorate a pandas.to_*() function to additionally store metadata."""
+    """Decorate a pandas.to_*() function to additionally store metadata.
+
+    Notes
+    -----
+    Unless a :code:`metadata` instance is given, each save uses the :code:`MetaData` of
+    the current context, see :code:`metapandas.context.metadata_context()`, or else a new
+    instance, so concurrent writers never share one by default. The metadata of the frame
+    being saved is copied rather than modified.
+
+    The keyword argument :code:`sidecar_format` ('json', 'jsonl' or 'msgpack') selects the
+    sidecar format, defaulting to :code:`metapandas.config.SIDECAR_FORMAT`.
+
+    The keyword argument :code:`embed` ('parquet', 'feather' or 'hdf') names the format
+    written by the decorated function. When :code:`metapandas.config.EMBED_METADATA` is
+    set (or the :code:`embed_metadata` keyword argument is true), the metadata is stored
+    within the data file in the same write instead of a sidecar, where supported.
+
+    The keyword argument :code:`strip_attrs` removes metadata held in :code:`DataFrame.attrs`
+    (see :code:`metapandas.accessor`) from the frame given to writers which encode the
+    attrs as JSON, such as :code:`DataFrame.to_parquet()` and :code:`DataFrame.to_feather()`.
+
+    When :code:`metapandas.config.ASYNC_SIDECARS` is set, sidecars are saved by a background
+    thread after the data is written, see :code:`metapandas.background`.
+
+    """
     data = meta_kwargs.pop("data", None)
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            recorder = metadata if metadata is not None else current_metadata()
             try:
-                additional_data = getattr(args[0], "metadata", {})
+                additional_data = thaw(get_metadata(args[0]))
+                if meta_kwargs.get("strip_attrs"):
+                    args = (strip_metadata_attrs(args[0]),) + args[1:]
             except IndexError:  # no arguments given!
                 additional_data = {}
             arginfo = inspect.getargvalues(sys._getframe(0))
@@ -105,7 +297,45 @@ def pandas_save_with_metadata(
                     }
                 }
             )
-            additional_data.update()
+            lineage = get_lineage(args[0]) if args else None
+            if lineage is not None:
+                additional_data["lineage"] = lineage_graph(lineage)
+
+            embed_format = meta_kwargs.get("embed")
+            if embed_format and meta_kwargs.get("embed_metadata", cfg.EMBED_METADATA):
+                frame, writer_args = (args[0], args[1:]) if args else (None, ())
+                datapath = kwargs.get(argname, writer_args[0] if writer_args else None)
+                if (
+                    isinstance(frame, pd.DataFrame)
+                    and len(writer_args) == (0 if argname in kwargs else 1)
+                    and can_embed(embed_format, datapath, kwargs)
+                ):
+                    additional_data["storage"].update(
+                        {"data_filepath": datapath, "metadata_filepath": datapath}
+                    )
+                    writer_kwargs = {k: v for k, v in kwargs.items() if k != argname}
+                    try:
+                        return save_embedded(
+                            recorder,
+                            embed_format,
+                            func,
+                            frame,
+                            filepath=datapath,
+                            data=data,
+                            additional_data=additional_data,
+                            **writer_kwargs
+                        )
+                    except ValueError as err:
+                        # nothing was written, so fall back to a sidecar
+                        vprint(
+                            "Could not embed metadata in {} due to {!r}".format(datapath, err),
+                            file=sys.stderr,
+                        )
+                    except Exception as err:
+                        verr("Could not embed metadata in {} due to {!r}".format(datapath, err))
+                        raise
+
+            sidecar_format = resolve_sidecar_format(meta_kwargs.get("sidecar_format"))
             result = func(*args, **kwargs)
             metapath = None
             try:
@@ -115,13 +345,18 @@ def pandas_save_with_metadata(
                     if not isinstance(args[0], (pd.DataFrame, pd.Series))
                     else args[1],
                 )
-                metapath = str(datapath).replace("/", os.sep) + ".meta.json"
+                metapath = sidecar_path(datapath, sidecar_format)
                 additional_data["storage"].update(
                     {"data_filepath": datapath, "metadata_filepath": metapath,}
                 )
-                metadata.save_as_json(
-                    filepath=metapath, data=data, additional_data=additional_data
-                )
+                if cfg.ASYNC_SIDECARS:
+                    sidecar_queue().submit(
+                        recorder, metapath, data=data, additional_data=additional_data
+                    )
+                else:
+                    recorder.save_sidecar(
+                        filepath=metapath, data=data, additional_data=additional_data
+                    )
             except IndexError:
                 pass  # unable to establish filename, so skip
             except Exception as err:
@@ -151,20 +386,20 @@ class PandasMetaDataHooks(HooksManager):
     PANDAS_DATAFRAME_SAVE_HOOKS = {
         "to_csv": {"argname": "path_or_buf"},
         "to_excel": {"argname": "excel_writer"},
-        "to_feather": {"argname": "fname"},
-        "to_hdf": {"argname": "path_or_buf"},
+        "to_feather": {"argname": "fname", "embed": "feather", "strip_attrs": True},
+        "to_hdf": {"argname": "path_or_buf", "embed": "hdf"},
         "to_json": {"argname": "path_or_buf"},
-        "to_parquet": {"argname": "fname"},
+        "to_parquet": {"argname": "fname", "embed": "parquet", "strip_attrs": True},
         "to_pickle": {"argname": "path"},
     }  # type: Dict[str, Dict[str, Any]]
 
     PANDAS_READ_HOOKS = {
         "read_csv": {"argname": "filepath_or_buffer"},
         "read_excel": {"argname": "io"},
-        "read_feather": {"argname": "path"},
-        "read_hdf": {"argname": "path_or_buf"},
+        "read_feather": {"argname": "path", "embed": "feather"},
+        "read_hdf": {"argname": "path_or_buf", "embed": "hdf"},
         "read_json": {"argname": "path_or_buf"},
-        "read_parquet": {"argname": "path"},
+        "read_parquet": {"argname": "path", "embed": "parquet"},
         "read_pickle": {"argname": "path"},
         "read_sql": {"argname": "sql", "argname_is_path": False},
         "read_sql_table": {"argname": "table_name", "argname_is_path": False},
@@ -172,8 +407,20 @@ class PandasMetaDataHooks(HooksManager):
     }  # type: Dict[str, Dict[str, Any]]
 
     @classmethod
-    def install_metadata_hooks(cls):
-        """Install Pandas metadata hooks."""
+    def install_metadata_hooks(cls, prefetch: Optional[bool] = None):
+        """Install Pandas metadata hooks.
+
+        Parameters
+        ----------
+        prefetch: bool or None
+            Whether to start collecting environment metadata in a background thread, so
+            that it is ready by the time data is first saved. Defaults to
+            :code:`metapandas.config.PREFETCH_METADATA` when not given.
+
+        """
+        prefetch = cfg.PREFETCH_METADATA if prefetch is None else prefetch
+        if prefetch:
+            MetaData.prefetch_environment()
         pd = sys.modules["pandas"]
         applied_pd_hooks = cls.apply_hooks(
             pd, pandas_read_with_metadata, cls.PANDAS_READ_HOOKS
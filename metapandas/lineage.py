@@ -0,0 +1,136 @@
+"""Provides opt-in capture of the operations applied to a MetaDataFrame as a lineage graph.
+
+When :code:`metapandas.config.LINEAGE` is set, each pandas operation deriving a new
+MetaDataFrame appends a node to the lineage of its input frame(s) from within
+:code:`MetaDataFrame.__finalize__()`. To keep capture cheap, a node is simply a tuple of
+:code:`(operation, parents, depth)`, where the operation name is an interned string and
+:code:`parents` holds the nodes of the input frames, so derived frames share the nodes of
+their common ancestors.
+
+The lineage is bounded by :code:`metapandas.config.LINEAGE_MAX_DEPTH`, beyond which
+earlier operations are replaced by a single '...' node, and may be sampled by setting
+:code:`metapandas.config.LINEAGE_SAMPLE_RATE` below one, in which case operations are
+randomly omitted (with the lineage of the input frame passed on unchanged).
+
+On save, the lineage is written into the sidecar as a compact graph of integer node
+ids, see :code:`lineage_graph()`.
+
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import sys
+import random
+
+import metapandas.config as cfg
+
+LINEAGE_ATTR = "_lineage"
+
+# a lineage node: (operation, parent nodes, depth)
+Node = Tuple[str, tuple, int]
+
+TRUNCATED = ("...", (), 0)  # type: Node
+
+
+def _node(operation: str, parents: tuple) -> Node:
+    """Return a new lineage node, truncating the lineage if it would exceed the maximum depth."""
+    depth = 1 + max([parent[2] for parent in parents] or [-1])
+    if depth > cfg.LINEAGE_MAX_DEPTH:
+        return (operation, (TRUNCATED,), 1)
+    return (operation, parents, depth)
+
+
+def _input_nodes(state: Dict[str, Any]) -> tuple:
+    """Return the lineage nodes of the inputs of a pandas operation, e.g. a merge or concat."""
+    objs = state.get("input_objs") or state.get("objs")
+    if objs is None and "left" in state:  # merges of older pandas versions
+        objs = (state["left"], state.get("right"))
+    return tuple(node for node in map(get_lineage, objs or ()) if node is not None)
+
+
+def get_lineage(frame: Any) -> Optional[Node]:
+    """Return the latest lineage node of :code:`frame`, if any."""
+    return getattr(frame, "__dict__", {}).get(LINEAGE_ATTR)
+
+
+def start_lineage(frame: Any, operation: str) -> Any:
+    """Start the lineage of :code:`frame` with a source :code:`operation`, e.g. 'read_csv', and return the frame."""
+    object.__setattr__(frame, LINEAGE_ATTR, (sys.intern(operation), (), 0))
+    return frame
+
+
+def record_operation(state: Dict[str, Any], other: Any, method: Optional[str] = None, stacklevel: int = 2):
+    """Record the operation deriving a frame from :code:`other` in the lineage of the frame.
+
+    Parameters
+    ----------
+    state: dict
+        The :code:`__dict__` of the derived frame, as setting attributes of DataFrames is comparatively slow.
+    other: Any
+        The input frame, or a pandas operation with :code:`input_objs` (or :code:`objs`) such as a merge.
+    method: str or None
+        The name of the operation, as passed to :code:`__finalize__()`, otherwise taken
+        from the name of the calling function :code:`stacklevel` frames up.
+
+    """
+    # n.b. this is called for every pandas operation, so avoids (failing) getattr() calls
+    other_state = getattr(other, "__dict__", None)
+    if other_state is None or other_state is state:
+        return
+    parent = other_state.get(LINEAGE_ATTR)
+    parents = (parent,) if parent is not None else _input_nodes(other_state)
+    if not parents:  # lineage was not started, see start_lineage()
+        return
+
+    rate = cfg.LINEAGE_SAMPLE_RATE
+    if rate < 1.0 and random.random() >= rate:
+        if parent is not None:
+            state[LINEAGE_ATTR] = parent
+        return
+
+    # n.b. code object names are already interned
+    operation = sys.intern(method) if method else sys._getframe(stacklevel).f_code.co_name
+    if parent is not None and parent[2] < cfg.LINEAGE_MAX_DEPTH:
+        state[LINEAGE_ATTR] = (operation, parents, parent[2] + 1)
+    else:
+        state[LINEAGE_ATTR] = _node(operation, parents)
+
+
+def lineage_graph(node: Optional[Node]) -> Optional[Dict[str, List[Any]]]:
+    """Return the lineage ending at :code:`node` as a compact, serialisable graph.
+
+    Returns
+    -------
+    dict or None
+        A dictionary with keys :code:`ops`, the distinct operation names, and :code:`nodes`,
+        a list of :code:`[op_index, [parent_node_index, ...]]` pairs in which parents precede
+        their children, so the last node is that of the frame itself.
+
+    Examples
+    --------
+    >>> source = ('read_csv', (), 0)
+    >>> lineage_graph(('merge', (('head', (source,), 1), source), 2))
+    {'ops': ['read_csv', 'head', 'merge'], 'nodes': [[0, []], [1, [0]], [2, [1, 0]]]}
+
+    """
+    if node is None:
+        return None
+    ops = []  # type: List[str]
+    op_ids = {}  # type: Dict[str, int]
+    nodes = []  # type: List[List[Any]]
+    node_ids = {}  # type: Dict[int, int]
+    stack = [(node, False)]
+    while stack:  # iterative post-order traversal, as lineage may be deep
+        current, expanded = stack.pop()
+        if id(current) in node_ids:
+            continue
+        if not expanded:
+            stack.append((current, True))
+            stack.extend((parent, False) for parent in reversed(current[1]) if id(parent) not in node_ids)
+            continue
+        operation = current[0]
+        if operation not in op_ids:
+            op_ids[operation] = len(ops)
+            ops.append(operation)
+        node_ids[id(current)] = len(nodes)
+        nodes.append([op_ids[operation], [node_ids[id(parent)] for parent in current[1]]])
+    return {"ops": ops, "nodes": nodes}
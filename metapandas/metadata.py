@@ -1,25 +1,36 @@
 """Module for quickly adding metadata to dataset when processing."""
 
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
-from collections import defaultdict
-from json import JSONDecodeError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from json import load as json_load
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from functools import partial
 
 import re
 import os
 import sys
+import time
+import itertools
 import platform
 import getpass
 import logging
 import datetime
 import warnings
+import threading
 import subprocess  # nosec
 
 import pandas as pd
 
 from loguru import logger
 
-from metapandas.util import get_json_dumps_kwargs
+import metapandas.config as cfg
+from metapandas.util import atomic_write, locked_file, shared_daemon_pool
+from metapandas.cache import ENVIRONMENT_CACHE, EnvironmentCache, path_mtime
+from metapandas.store import get_environment_store
+from metapandas.sidecar import append_stage, decode_document, encode_document, get_sidecar_format
+from metapandas.actions import ActionLog
+from metapandas.writer import open_writer
+from metapandas.context import current_metadata, metadata_context  # noqa: F401 (re-exported)
 
 try:
     import psutil
@@ -35,17 +46,46 @@ except (ImportError, PermissionError):
     )
     cpuinfo = None
 
-try:
-    import jsonpickle as json  # handle many arbitrary python objects
-except ImportError:
-    logger.error(
-        "Full JSON serialisation not available - please pip install jsonpickle"
-    )
-    import json  # type: ignore
-
+DPKG_STATUS_PATH = "/var/lib/dpkg/status"
+BREW_CELLAR_PATHS = (
+    os.environ.get("HOMEBREW_CELLAR"),
+    "/opt/homebrew/Cellar",
+    "/usr/local/Cellar",
+    "/home/linuxbrew/.linuxbrew/Cellar",
+)
 
 class MetaData:
-    """A metadata class."""
+    """A metadata class.
+
+    Attributes
+    ----------
+    environment_cache: EnvironmentCache
+        The process-wide cache of environment metadata shared by all instances.
+    action_log: ActionLog
+        The (bounded) log of actions registered with :code:`MetaData.register_action()`.
+    METADATA_COLLECTORS: Dict[str, dict]
+        A dictionary of collector names as keys and options as values, where each
+        collector contributes part of the metadata returned by :code:`MetaData.get_metadata()`.
+        The options are :code:`method` (a method name or function accepting the instance),
+        :code:`timeout` (seconds) and :code:`flag` (a :code:`metapandas.config` attribute enabling it).
+
+    """
+
+    environment_cache = ENVIRONMENT_CACHE
+
+    # streams chunks to a data file with a single sidecar stage, see metapandas.writer.open_writer()
+    writer = open_writer
+
+    METADATA_COLLECTORS = {
+        "basic": {"method": "get_basic_metadata"},
+        "cpu": {"method": "get_cpu_metadata"},
+        "conda": {"method": "get_conda_metadata", "flag": "INCLUDE_CONDA_PACKAGES"},
+        "apt": {"method": "get_apt_metadata", "flag": "INCLUDE_APT_PACKAGES"},
+        "brew": {"method": "get_brew_metadata", "flag": "INCLUDE_BREW_PACKAGES"},
+        "python": {"method": "get_python_metadata", "flag": "INCLUDE_PYTHON_PACKAGE"},
+    }  # type: Dict[str, Dict[str, Any]]
+
+    _prefetch_thread = None  # type: Optional[threading.Thread]
 
     def __init__(
         self,
@@ -66,9 +106,12 @@ class MetaData:
         self.logger = logger or logging.getLogger(__file__)
         self.filepath = filepath
         self.__dict__.update(kwargs)
-        self.actions = defaultdict(
-            lambda: defaultdict(lambda: defaultdict(lambda: "")), {}
-        )  # type: Dict[str, Any]
+        self.action_log = ActionLog(cfg.ACTION_LOG_SIZE)
+
+    @property
+    def actions(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """The registered actions as :code:`{on: {timestamp: {action: description}}}`, see :code:`ActionLog`."""
+        return self.action_log.to_dict()
 
     @staticmethod
     def _list_packages(
@@ -96,26 +139,40 @@ class MetaData:
 
         Notes
         -----
-        When the subprocess command fails, an empty dataframe will be returned.
+        When the subprocess command fails or exceeds :code:`metapandas.config.COLLECTOR_TIMEOUT`
+        seconds, an empty dataframe will be returned.
 
         """
         try:
             output_bytes = subprocess.check_output(
-                cmd, shell=True, stderr=subprocess.PIPE  # nosec
+                cmd,
+                shell=True,  # nosec
+                stderr=subprocess.PIPE,
+                timeout=cfg.COLLECTOR_TIMEOUT if cfg.COLLECTOR_TIMEOUT > 0 else None,
             )
             pkgs = output_bytes.decode("utf8", errors="ignore")
             lines = re.split("[\r\n]+", re.sub("[ \t]+", ",", pkgs))[
                 ignore_first_n_lines:
             ]
-            data = [line.split(",")[: len(columns)] for line in lines if line.strip()]
-        except subprocess.CalledProcessError:
+            # pad rows with missing trailing fields, e.g. a blank conda channel
+            data = [
+                (line.split(",") + [""] * len(columns))[: len(columns)]
+                for line in lines
+                if line.strip()
+            ]
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
             data = []
         return pd.DataFrame(data, columns=columns)
 
     @classmethod
-    def list_conda_packages(cls) -> pd.DataFrame:
+    def list_conda_packages(cls, prefix: Optional[Union[Path, str]] = None) -> pd.DataFrame:
         """List Conda packages as a pandas DataFrame.
 
+        Parameters
+        ----------
+        prefix: str or Path or None
+            The conda environment to inspect. Defaults to :code:`$CONDA_PREFIX`.
+
         Returns
         -------
         pd.DataFrame
@@ -127,15 +184,100 @@ class MetaData:
 
         Notes
         -----
-        When the subprocess command fails, an empty dataframe will be returned.
+        The package records within :code:`<prefix>/conda-meta` are read directly where
+        available, otherwise :code:`conda list` is used. When the subprocess command fails,
+        an empty dataframe will be returned.
 
         """
+        columns = ["name", "version", "build", "channel"]
+        prefix = prefix or os.environ.get("CONDA_PREFIX", None)
+        conda_meta = os.path.join(str(prefix), "conda-meta") if prefix else None
+        if conda_meta and os.path.isdir(conda_meta):
+            return pd.DataFrame(cls.read_conda_meta(conda_meta), columns=columns)
         return cls._list_packages(
             cmd="conda list",
             ignore_first_n_lines=3,
-            columns=["name", "version", "build", "channel"],
+            columns=columns,
+        )
+
+    @staticmethod
+    def _read_conda_meta_record(filepath: str) -> Optional[Tuple[str, str, str, str]]:
+        """Return the name, version, build and channel of a single conda-meta JSON record."""
+        try:
+            with open(filepath, encoding="utf8") as f:
+                record = json_load(f)
+        except (OSError, ValueError):
+            # conda-meta records are named <name>-<version>-<build>.json
+            name, _, version_build = os.path.basename(filepath)[:-5].rpartition("-")
+            name, _, version = name.rpartition("-")
+            return (name, version, version_build, "") if name else None
+        # conda list shows e.g. 'conda-forge' for 'https://conda.anaconda.org/conda-forge/linux-64'
+        channel = record.get("schannel") or str(record.get("channel") or "")
+        subdir = record.get("subdir")
+        if subdir and channel.endswith("/" + subdir):
+            channel = channel[: -len(subdir) - 1]
+        channel = re.sub("^[a-z]+://[^/]+/", "", channel)
+        return (
+            record.get("name", ""),
+            record.get("version", ""),
+            record.get("build", ""),
+            "" if channel.startswith("pkgs/") else channel,
+        )
+
+    @classmethod
+    def read_conda_meta(cls, conda_meta: Union[Path, str]) -> List[Tuple[str, str, str, str]]:
+        """Read the package records of a conda environment from its conda-meta directory.
+
+        Parameters
+        ----------
+        conda_meta: str or Path
+            The :code:`conda-meta` directory of the conda environment.
+
+        Returns
+        -------
+        List[Tuple[str, str, str, str]]
+            The name, version, build and channel of each package sorted by name,
+            which mirrors the output of :code:`conda list`.
+
+        Notes
+        -----
+        The JSON records are read concurrently using :code:`metapandas.config.IO_THREADS`
+        threads and the result is cached within :code:`MetaData.environment_cache` until
+        the modification time of :code:`conda_meta` changes.
+
+        """
+        conda_meta = str(conda_meta)
+
+        def read_records():
+            filepaths = [
+                os.path.join(conda_meta, filename)
+                for filename in os.listdir(conda_meta)
+                if filename.endswith(".json")
+            ]
+            with ThreadPoolExecutor(max_workers=max(1, cfg.IO_THREADS)) as executor:
+                records = executor.map(cls._read_conda_meta_record, filepaths)
+                return sorted(record for record in records if record)
+
+        return cls.environment_cache.get(
+            "conda-meta:" + conda_meta, read_records, fingerprint=path_mtime(conda_meta)
         )
 
+    @classmethod
+    def get_conda_packages(cls, prefix: Optional[Union[Path, str]] = None) -> Dict[str, str]:
+        """Return a dictionary of conda package names and versions.
+
+        Notes
+        -----
+        This avoids booting :code:`conda list` by reading :code:`<prefix>/conda-meta` directly,
+        falling back to :code:`MetaData.list_conda_packages()` when it is unavailable.
+
+        """
+        prefix = prefix or os.environ.get("CONDA_PREFIX", None)
+        conda_meta = os.path.join(str(prefix), "conda-meta") if prefix else None
+        if conda_meta and os.path.isdir(conda_meta):
+            return {record[0]: record[1] for record in cls.read_conda_meta(conda_meta)}
+        return cls.list_conda_packages(prefix).set_index("name").version.to_dict()
+
     @classmethod
     def list_brew_packages(cls) -> pd.DataFrame:
         """List Brew packages as a pandas DataFrame.
@@ -170,19 +312,83 @@ class MetaData:
 
         Notes
         -----
-        When the subprocess command fails, an empty dataframe will be returned.
+        The dpkg status database is parsed directly where possible, otherwise
+        :code:`dpkg -l` is used. When the subprocess command fails, an empty dataframe will be returned.
 
         """
+        columns = ["name", "version", "architecture"]
+        try:
+            return pd.DataFrame(list(cls.iter_dpkg_status()), columns=columns)
+        except OSError:
+            pass
         df = cls._list_packages(
             cmd="dpkg -l",
             ignore_first_n_lines=5,
-            columns=["installed", "name", "version", "architecture"],
+            columns=["installed"] + columns,
         )
         return df[df.columns[1:]]
 
+    @staticmethod
+    def iter_dpkg_status(
+        filepath: Union[Path, str] = DPKG_STATUS_PATH
+    ) -> Iterator[Tuple[str, str, str]]:
+        """Stream the installed packages recorded in the dpkg status database.
+
+        Parameters
+        ----------
+        filepath: str or Path
+            The location of the dpkg status file.
+
+        Yields
+        ------
+        Tuple[str, str, str]
+            The name, version and architecture of each installed package. As with
+            :code:`dpkg -l`, names of :code:`Multi-Arch: same` packages are qualified by architecture.
+
+        Raises
+        ------
+        OSError
+            If the status file cannot be read.
+
+        """
+        fields = {}  # type: Dict[str, str]
+        wanted = ("Package", "Status", "Version", "Architecture", "Multi-Arch")
+        with open(str(filepath), encoding="utf8", errors="ignore") as f:
+            for line in itertools.chain(f, [""]):
+                if line[:1] in (" ", "\t"):
+                    continue  # continuation of a multiline field
+                if line.strip():
+                    key, _, value = line.partition(":")
+                    if key in wanted:
+                        fields[key] = value.strip()
+                    continue
+                # a blank line (or EOF) terminates each package paragraph
+                if "Package" in fields and fields.get("Status", "").endswith(" installed"):
+                    name = fields["Package"]
+                    arch = fields.get("Architecture", "")
+                    if fields.get("Multi-Arch") == "same":
+                        name = "{}:{}".format(name, arch)
+                    yield name, fields.get("Version", ""), arch
+                fields = {}
+
+    @classmethod
+    def get_apt_packages(cls, filepath: Union[Path, str] = DPKG_STATUS_PATH) -> Dict[str, str]:
+        """Return a dictionary of installed Debian APT package names and versions.
+
+        Notes
+        -----
+        This avoids spawning :code:`dpkg -l` by streaming :code:`filepath` directly,
+        falling back to :code:`MetaData.list_apt_packages()` when it cannot be read.
+
+        """
+        try:
+            return {name: version for name, version, _ in cls.iter_dpkg_status(filepath)}
+        except OSError:
+            return cls.list_apt_packages().set_index("name").version.to_dict()
+
     def register_action(
         self, on: Union[Path, str], action: str, description: str
-    ) -> List[str]:
+    ) -> Sequence[str]:
         """Denote processing undertaken for :code:`filename`.
 
         Parameters
@@ -197,19 +403,16 @@ class MetaData:
 
         Returns
         -------
-        List[str]
-            A list of actions undertaken.
+        Sequence[str]
+            A list of actions undertaken, which is only formatted when first accessed, see :code:`FormattedActions`.
+
+        Notes
+        -----
+        At most :code:`metapandas.config.ACTION_LOG_SIZE` actions are retained, with the
+        oldest dropped first, see :code:`MetaData.action_log`.
 
         """
-        self.actions[str(on)][str(datetime.datetime.now())][action] += (
-            description.strip("\n") + "\n" if description else ""
-        )
-        return [
-            "{}: {}".format(
-                k, ["<{ki}> {vi}".format(**locals()) for ki, vi in v.items()]
-            )
-            for k, v in self.actions[str(on)].items()
-        ]
+        return self.action_log.register(on, action, description)
 
     @classmethod
     def merge(
@@ -234,23 +437,60 @@ class MetaData:
                 merged[key] = cls.merge(left[key], right[key])
         return merged
 
-    def get_basic_metadata(self) -> Dict[str, Any]:
-        """Return basic metadata in dictionary form.
+    @classmethod
+    def prefetch_environment(cls) -> threading.Thread:
+        """Populate :code:`MetaData.environment_cache` in a background daemon thread.
+
+        Returns
+        -------
+        threading.Thread
+            The prefetch thread, which is reused whilst a previous prefetch is still running.
+
+        Notes
+        -----
+        Any metadata save requesting an environment entry which is still being prefetched
+        will wait for that entry to finish, rather than computing it a second time.
+
+        """
+        thread = cls._prefetch_thread
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(
+                target=cls._prefetch, name="metapandas-prefetch", daemon=True
+            )
+            cls._prefetch_thread = thread
+            thread.start()
+        return thread
+
+    @classmethod
+    def _prefetch(cls):
+        """Collect metadata once purely to warm up the environment cache."""
+        try:
+            cls().collect_metadata()
+        except Exception as err:
+            logger.error('Unable to prefetch environment metadata due to "{}"'.format(err))
+
+    @classmethod
+    def invalidate_environment_cache(cls, name: Optional[str] = None):
+        """Force environment metadata :code:`name` (or all when None) to be recomputed on next use."""
+        cls.environment_cache.invalidate(name)
+
+    @staticmethod
+    def get_system_metadata() -> Dict[str, Any]:
+        """Return metadata describing the host system and python interpreter.
 
         Returns
         -------
         dict
-            Dictionary of metadata information.
+            Dictionary of system information, which is not expected to change during the process lifetime.
+
         """
         metadata = {
             "os": platform.system(),
             "created-by": getpass.getuser().capitalize(),
-            "created-timestamp": str(datetime.datetime.now()),
             "processed-on-machine": platform.node(),
             "python-executable": sys.executable,
             "python-version": platform.python_version(),
             "python-implementation": platform.python_implementation(),
-            "python-command": " ".join(sys.argv),
         }  # type: Dict[str, Any]
 
         if psutil:
@@ -260,11 +500,6 @@ class MetaData:
                     "cpu-threads": psutil.cpu_count(logical=True),
                 }
             )
-        metadata["environment-variables"] = {
-            k: v
-            for k, v in os.environ.items()
-            if not re.match(".*(KEY|PASSWORD|TOKEN).*", k.upper())
-        }
         try:
             os_ver = {
                 "Linux": getattr(
@@ -279,62 +514,304 @@ class MetaData:
         except AttributeError:
             pass
 
-        if cpuinfo:
-            metadata["cpu"] = " @ ".join(
-                [
-                    v
-                    for k, v in cpuinfo.get_cpu_info().items()
-                    if k in ["brand", "hz_advertised"]
-                ]
-            )
         return metadata
 
-    def get_metadata(self) -> Dict[str, Any]:
-        """Create a metadata dictionary or tagging generated data with.
+    @staticmethod
+    def get_cpu_description() -> str:
+        """Return the cpu brand and advertised clock speed as reported by py-cpuinfo."""
+        info = cpuinfo.get_cpu_info()
+        # newer py-cpuinfo releases provide the string values under *_raw/*_friendly keys
+        return " @ ".join(
+            str(v)
+            for v in [
+                info.get("brand", info.get("brand_raw")),
+                info.get("hz_advertised_friendly", info.get("hz_advertised")),
+            ]
+            if v
+        )
+
+    @staticmethod
+    def get_python_packages() -> Dict[str, str]:
+        """Return the versions of all imported (public) python modules."""
+        return {
+            k: str(getattr(v, "__version__", None))
+            for k, v in list(sys.modules.items())
+            if hasattr(v, "__version__") and not k.startswith("_")
+        }
+
+    def get_basic_metadata(self) -> Dict[str, Any]:
+        """Return basic metadata in dictionary form.
 
         Returns
         -------
         dict
             Dictionary of metadata information.
 
+        Notes
+        -----
+        The system information is cached within :code:`MetaData.environment_cache`,
+        so only the timestamp, command and environment variables are evaluated per call.
+
         """
-        metadata = self.get_basic_metadata()
+        metadata = dict(
+            self.environment_cache.get("system", self.get_system_metadata)
+        )  # type: Dict[str, Any]
+        metadata.update(
+            {
+                "created-timestamp": str(datetime.datetime.now()),
+                "python-command": " ".join(sys.argv),
+            }
+        )
+        metadata["environment-variables"] = {
+            k: v
+            for k, v in os.environ.items()
+            if not re.match(".*(KEY|PASSWORD|TOKEN).*", k.upper())
+        }
+        return metadata
+
+    def get_cpu_metadata(self) -> Dict[str, Any]:
+        """Return the (cached) cpu description when py-cpuinfo is available."""
+        if not cpuinfo:
+            return {}
+        return {
+            "cpu": self.environment_cache.get("cpu", self.get_cpu_description, persist=True)
+        }
+
+    def get_conda_metadata(self) -> Dict[str, Any]:
+        """Return the (cached) conda environment name and packages when within a conda environment."""
         conda_prefix = os.environ.get("CONDA_PREFIX", None)
-        if conda_prefix:
-            metadata["conda-environment"] = Path(conda_prefix).name
-            metadata["conda-packages"] = (
-                self.list_conda_packages().set_index("name").version.to_dict()
+        if not conda_prefix:
+            return {}
+        return {
+            "conda-environment": Path(conda_prefix).name,
+            "conda-packages": dict(
+                self.environment_cache.get(
+                    "conda-packages:" + conda_prefix,
+                    lambda: self.get_conda_packages(conda_prefix),
+                    fingerprint=path_mtime(os.path.join(conda_prefix, "conda-meta")),
+                    persist=True,
+                )
+            ),
+        }
+
+    def get_apt_metadata(self) -> Dict[str, Any]:
+        """Return the (cached) Debian APT packages when running on Linux."""
+        if platform.system() != "Linux":
+            return {}
+        return {
+            "apt-packages": dict(
+                self.environment_cache.get(
+                    "apt-packages",
+                    self.get_apt_packages,
+                    fingerprint=path_mtime(DPKG_STATUS_PATH),
+                    persist=True,
+                )
+            )
+        }
+
+    def get_brew_metadata(self) -> Dict[str, Any]:
+        """Return the (cached) Homebrew packages when running on MacOS."""
+        if platform.system() != "Darwin":
+            return {}
+        return {
+            "brew-packages": dict(
+                self.environment_cache.get(
+                    "brew-packages",
+                    lambda: self.list_brew_packages().set_index("name").version.to_dict(),
+                    fingerprint=next(filter(None, map(path_mtime, BREW_CELLAR_PATHS)), None),
+                    persist=True,
+                )
             )
+        }
 
-        if platform.system() == "Linux":
-            metadata["apt-packages"] = (
-                self.list_apt_packages().set_index("name").version.to_dict()
+    def get_python_metadata(self) -> Dict[str, Any]:
+        """Return the (cached) versions of imported python packages."""
+        return {
+            "python-packages": dict(
+                self.environment_cache.get(
+                    "python-packages",
+                    self.get_python_packages,
+                    fingerprint=len(sys.modules),
+                )
             )
-        elif platform.system() == "Darwin":
+        }
+
+    @classmethod
+    def register_collector(
+        cls,
+        name: str,
+        method: Union[str, Callable[["MetaData"], Dict[str, Any]]],
+        timeout: Optional[float] = None,
+        flag: Optional[str] = None,
+    ):
+        """Register an additional metadata collector for use by :code:`MetaData.get_metadata()`.
+
+        Parameters
+        ----------
+        name: str
+            The collector identifier. An existing collector of the same name is replaced.
+        method: str or Callable
+            The name of a :code:`MetaData` method or a function accepting the :code:`MetaData`
+            instance. Either must return a dictionary of metadata.
+        timeout: float or None
+            The maximum number of seconds to wait for the collector.
+            Defaults to :code:`metapandas.config.COLLECTOR_TIMEOUT` when not given.
+        flag: str or None
+            The name of a :code:`metapandas.config` attribute which disables the collector when false.
+
+        """
+        collectors = dict(cls.METADATA_COLLECTORS)
+        collectors[name] = {"method": method, "timeout": timeout, "flag": flag}
+        cls.METADATA_COLLECTORS = collectors
+
+    @classmethod
+    def unregister_collector(cls, name: str):
+        """Remove metadata collector :code:`name` if registered."""
+        cls.METADATA_COLLECTORS = {
+            k: v for k, v in cls.METADATA_COLLECTORS.items() if k != name
+        }
+
+    def _get_collectors(self) -> List[Tuple[str, Callable[[], Dict[str, Any]], Optional[float]]]:
+        """Return the name, bound function and timeout of each enabled collector."""
+        collectors = []
+        for name, options in self.METADATA_COLLECTORS.items():
+            flag = options.get("flag")
+            if flag and not getattr(cfg, flag, True):
+                continue
+            method = options["method"]
+            func = getattr(self, method) if isinstance(method, str) else partial(method, self)
+            timeout = options.get("timeout") or cfg.COLLECTOR_TIMEOUT
+            collectors.append((name, func, timeout if timeout > 0 else None))
+        return collectors
+
+    def collect_metadata(self) -> Dict[str, Any]:
+        """Run the registered collectors and merge their metadata.
+
+        Returns
+        -------
+        dict
+            Dictionary of metadata information from all collectors which completed in time.
+
+        Notes
+        -----
+        Collectors run concurrently on up to :code:`metapandas.config.COLLECTOR_THREADS` (daemon)
+        threads shared by all instances, so the total latency is that of the slowest collector
+        rather than the sum, and a hung collector never blocks the interpreter exiting. A collector
+        which fails or exceeds its timeout is logged and omitted from the result, whilst
+        setting :code:`COLLECTOR_THREADS` to zero runs all collectors sequentially without timeouts.
+
+        """
+        metadata = {}  # type: Dict[str, Any]
+        collectors = self._get_collectors()
+        if cfg.COLLECTOR_THREADS <= 0 or not collectors:
+            futures = [(name, None, func, None) for name, func, _ in collectors]
+        else:
+            pool = shared_daemon_pool("metapandas-collector", cfg.COLLECTOR_THREADS)
+            futures = [(name, pool.submit(func), func, timeout) for name, func, timeout in collectors]
+        start = time.monotonic()
+        for name, future, func, timeout in futures:
             try:
-                metadata["brew-packages"] = (
-                    self.list_brew_packages().set_index("name").version.to_dict()
+                if future is None:
+                    metadata.update(func())
+                else:
+                    remaining = None if timeout is None else max(0, start + timeout - time.monotonic())
+                    metadata.update(future.result(timeout=remaining))
+            except FuturesTimeoutError:
+                # never block on hung collectors - they are abandoned rather than awaited
+                future.cancel()
+                self.logger.error(
+                    'Unable to establish {} metadata within {}s'.format(name, timeout)
                 )
             except Exception as err:
                 self.logger.error(
-                    'Unable to establish brew packages used due to "{}"'.format(err)
+                    'Unable to establish {} metadata due to "{}"'.format(name, err)
                 )
-        try:
-            metadata["python-packages"] = {
-                k: str(getattr(v, "__version__", None))
-                for k, v in sys.modules.items()
-                if hasattr(v, "__version__") and not k.startswith("_")
-            }
-        except Exception as err:
-            self.logger.error(
-                'Unable to establish python packages used due to "{}"'.format(err)
-            )
+        return metadata
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """Create a metadata dictionary or tagging generated data with.
+
+        Returns
+        -------
+        dict
+            Dictionary of metadata information.
 
-        if self.actions:
+        See Also
+        --------
+        MetaData.collect_metadata
+
+        """
+        metadata = self.collect_metadata()
+
+        if self.action_log:
             metadata["processing-actions"] = self.actions
 
         return metadata
 
+    def prepare_data(
+        self,
+        data: Optional[dict] = None,
+        additional_data: Optional[dict] = None,
+        environment_store: Optional[Union[Path, str]] = None,
+    ) -> dict:
+        """Return the metadata to save (e.g. in a sidecar or data file), see :code:`MetaData.save_as_json()`."""
+        data = (data or {}).copy() if data is not None else self.get_metadata()
+        data.update(additional_data or {})
+
+        store = get_environment_store(environment_store)
+        if store is not None:
+            data = store.split(data)
+        return data
+
+    def _save_document(
+        self,
+        sidecar_format: str,
+        filepath: Optional[Union[Path, str]] = None,
+        data: Optional[dict] = None,
+        additional_data: Optional[dict] = None,
+        exists_action: str = "merge",
+        errors: str = "warn",
+        environment_store: Optional[Union[Path, str]] = None,
+    ):
+        """Save metadata as a single document in :code:`sidecar_format`, see :code:`MetaData.save_as_json()`."""
+        data = self.prepare_data(data, additional_data, environment_store)
+
+        filepath = Path(filepath or self.filepath)
+        filename = str(filepath).replace("/", os.sep)  # protect from py35 Path -> str bug on Windows
+
+        if exists_action == "raise_error" and filepath.exists():
+            raise FileExistsError("{filepath} already exists".format(**locals()))
+
+        if exists_action != "merge":
+            atomic_write(filename, encode_document(data, sidecar_format))
+            return
+
+        # hold an advisory lock whilst reading, merging and replacing the file
+        # so that concurrent writers cannot lose each other's stages
+        with locked_file(filename, binary=True) as f:
+            contents = f.read()
+            if contents.strip():
+                try:
+                    original_data = decode_document(contents, sidecar_format)
+                except ValueError as err:
+                    original_data = {}
+                    if errors == "warn":
+                        warnings.warn(
+                            'Error decoding {} data for "{}" due to {}'
+                            "".format(sidecar_format.upper(), filepath, err)
+                        )
+                    elif errors == "raise":
+                        raise
+
+                if "stages" in original_data:
+                    # extend stages list with new metadata
+                    data = {"stages": original_data["stages"] + [data]}
+                else:
+                    # create new top-level stages key with list of metadata
+                    data = {"stages": [original_data, data]}
+
+            atomic_write(filename, encode_document(data, sidecar_format))
+
     def save_as_json(
         self,
         filepath: Optional[Union[Path, str]] = None,
@@ -342,6 +819,7 @@ class MetaData:
         additional_data: Optional[dict] = None,
         exists_action: str = "merge",
         errors: str = "warn",
+        environment_store: Optional[Union[Path, str]] = None,
     ):
         """Save metadata in JSON format to disk with optional additional data.
 
@@ -355,44 +833,150 @@ class MetaData:
             Extra JSON compatible dictionary to include.
         exists_action: {'merge', 'overwrite', 'raise_error'}
             What to do when the file already exists. Merging will attempt to include both old
-            and new JSON data, but under separate ::'stages' keys.
+            and new JSON data, but under separate ::'stages' keys. An advisory lock is held
+            whilst merging, so concurrent writers to the same file do not lose stages.
         errors: {'ignore', 'warn', 'raise'}
             Action to perform on error.
+        environment_store: str or Path or None
+            Directory of a content-addressed store in which to write the environment block
+            (packages and environment variables) once, so that the JSON only holds a digest
+            reference. Defaults to :code:`metapandas.config.ENVIRONMENT_STORE_DIR`, with an
+            empty value embedding the environment block as usual.
+
+        Notes
+        -----
+        The JSON is encoded by the serializer selected with :code:`metapandas.config.SERIALIZER`
+        and is compact unless :code:`metapandas.config.SIDECAR_INDENT` is set.
 
         See Also
         --------
         Metadata.get_metdata
+        metapandas.store.EnvironmentStore
 
         """
-        data = (data or {}).copy() if data is not None else self.get_metadata()
-        data.update(additional_data or {})
+        self._save_document(
+            "json",
+            filepath=filepath,
+            data=data,
+            additional_data=additional_data,
+            exists_action=exists_action,
+            errors=errors,
+            environment_store=environment_store,
+        )
+
+    def save_as_msgpack(
+        self,
+        filepath: Optional[Union[Path, str]] = None,
+        data: Optional[dict] = None,
+        additional_data: Optional[dict] = None,
+        exists_action: str = "merge",
+        errors: str = "warn",
+        environment_store: Optional[Union[Path, str]] = None,
+    ):
+        """Save metadata in (optionally compressed) MessagePack format to disk.
+
+        Parameters
+        ----------
+        filepath: str
+            The path for the output MessagePack file. Uses object's filepath when not given.
+        data: dict or None
+            The data to write. Will call :code:`Metadata.get_metdata()` method if not given.
+        additional_data: dict or None
+            Extra dictionary to include.
+        exists_action: {'merge', 'overwrite', 'raise_error'}
+            See :code:`MetaData.save_as_json()`.
+        errors: {'ignore', 'warn', 'raise'}
+            Action to perform on error.
+        environment_store: str or Path or None
+            See :code:`MetaData.save_as_json()`.
+
+        Notes
+        -----
+        The output is compressed as set by :code:`metapandas.config.SIDECAR_COMPRESSION`.
+
+        See Also
+        --------
+        Metadata.save_as_json
+        metapandas.sidecar.read_stages
+
+        """
+        self._save_document(
+            "msgpack",
+            filepath=filepath,
+            data=data,
+            additional_data=additional_data,
+            exists_action=exists_action,
+            errors=errors,
+            environment_store=environment_store,
+        )
+
+    def save_as_jsonl(
+        self,
+        filepath: Optional[Union[Path, str]] = None,
+        data: Optional[dict] = None,
+        additional_data: Optional[dict] = None,
+        exists_action: str = "merge",
+        environment_store: Optional[Union[Path, str]] = None,
+        **kwargs
+    ):
+        """Append metadata as a single stage to a JSON Lines file on disk.
+
+        Parameters
+        ----------
+        filepath: str
+            The path for the output JSON Lines file. Uses object's filepath when not given.
+        data: dict or None
+            The data to write. Will call :code:`Metadata.get_metdata()` method if not given.
+        additional_data: dict or None
+            Extra JSON compatible dictionary to include.
+        exists_action: {'merge', 'overwrite', 'raise_error'}
+            What to do when the file already exists. Merging appends a new stage line
+            without reading or rewriting the existing stages.
+        environment_store: str or Path or None
+            See :code:`MetaData.save_as_json()`.
+
+        See Also
+        --------
+        Metadata.save_as_json
+        metapandas.sidecar.read_stages
+
+        """
+        data = self.prepare_data(data, additional_data, environment_store)
 
         filepath = Path(filepath or self.filepath)
         filename = str(filepath).replace("/", os.sep)  # protect from py35 Path -> str bug on Windows
 
         if filepath.exists():
-            if exists_action == "merge":
-                with open(filename) as f:
-                    try:
-                        original_data = json.loads(f.read())
-                    except JSONDecodeError as err:
-                        original_data = {}
-                        if errors == "warn":
-                            warnings.warn(
-                                'Error decoding JSON data for "{}" due to {}'
-                                "".format(filepath, err)
-                            )
-                        elif errors == "raise":
-                            raise
-
-                if "stages" in original_data:
-                    # extend stages list with new JSON metadata
-                    data = original_data["stages"] + [data]
-                else:
-                    # create new top-level stages key with list of JSON metadata
-                    data = {"stages": [original_data, data]}
+            if exists_action == "overwrite":
+                filepath.unlink()
             elif exists_action == "raise_error":
                 raise FileExistsError("{filepath} already exists".format(**locals()))
 
-        with open(filename, "w") as f:
-            f.write(json.dumps(data, **get_json_dumps_kwargs(json)))
+        append_stage(filename, data)
+
+    def save_sidecar(
+        self,
+        filepath: Optional[Union[Path, str]] = None,
+        sidecar_format: Optional[str] = None,
+        **kwargs
+    ):
+        """Save metadata to :code:`filepath` using the method for :code:`sidecar_format`.
+
+        Parameters
+        ----------
+        filepath: str or Path or None
+            The path for the output file. Uses object's filepath when not given.
+        sidecar_format: {'json', 'jsonl', 'msgpack'} or None
+            The sidecar format, inferred from the :code:`filepath` extension when not given.
+        kwargs: dict
+            Keyword arguments passed to :code:`MetaData.save_as_json()`, :code:`MetaData.save_as_jsonl()`
+            or :code:`MetaData.save_as_msgpack()`.
+
+        """
+        filepath = filepath or self.filepath
+        sidecar_format = sidecar_format or get_sidecar_format(filepath)
+        save = {
+            "jsonl": self.save_as_jsonl,
+            "msgpack": self.save_as_msgpack,
+        }.get(sidecar_format, self.save_as_json)
+        return save(filepath=filepath, **kwargs)
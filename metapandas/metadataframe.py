@@ -1,6 +1,348 @@
 """Defines MetaDataFrame class, which extends pandas.DataFrame."""
+from typing import Any, Callable, Dict, Optional
+
+import weakref
+import threading
+
 import pandas as pd
 
+import metapandas.config as cfg
+from metapandas.util import summarise_arguments
+from metapandas.lineage import get_lineage, lineage_graph, record_operation, start_lineage
+
+_STATS_LOCK = threading.Lock()
+_SHARE_LOCK = threading.RLock()
+
+
+def _read_only(self, *args, **kwargs):
+    """Refuse to modify an immutable metadata value in place."""
+    raise TypeError(
+        "'{}' object is immutable, set the metadata item to a new value instead".format(type(self).__name__)
+    )
+
+
+class FrozenDict(dict):
+    """An immutable dictionary of metadata, whose nested values are immutable too, see :code:`freeze()`.
+
+    Examples
+    --------
+    >>> storage = FrozenDict({'path': 'data.csv'})
+    >>> storage['rows'] = 3
+    Traceback (most recent call last):
+    ...
+    TypeError: 'FrozenDict' object is immutable, set the metadata item to a new value instead
+    >>> dict(storage, rows=3)
+    {'path': 'data.csv', 'rows': 3}
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        """Create a new immutable dictionary, freezing its values."""
+        super(FrozenDict, self).__init__((k, freeze(v)) for k, v in dict(*args, **kwargs).items())
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __ior__(self, other: Any) -> "FrozenDict":
+        """Return a new dictionary updated from :code:`other`, as for tuples, rather than updating in place."""
+        merged = dict(self)
+        merged.update(other)
+        return FrozenDict(merged)
+
+    def __reduce__(self):
+        """Pickle (and copy) as a plain dictionary."""
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """An immutable list of metadata, whose items are immutable too, see :code:`freeze()`.
+
+    Examples
+    --------
+    >>> tags = FrozenList(['raw'])
+    >>> tags.append('checked')
+    Traceback (most recent call last):
+    ...
+    TypeError: 'FrozenList' object is immutable, set the metadata item to a new value instead
+    >>> tags + ['checked']
+    ['raw', 'checked']
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, iterable: Any = ()):
+        """Create a new immutable list, freezing its items."""
+        super(FrozenList, self).__init__(freeze(v) for v in iterable)
+
+    __setitem__ = __delitem__ = _read_only
+    append = extend = insert = remove = pop = clear = sort = reverse = _read_only
+
+    def __iadd__(self, other: Any) -> list:
+        """Return a new list extended by :code:`other`, as for tuples, rather than extending in place."""
+        return self + list(other)
+
+    def __imul__(self, times: int) -> list:
+        """Return a new repeated list, as for tuples, rather than repeating in place."""
+        return self * times
+
+    def __reduce__(self):
+        """Pickle (and copy) as a plain list."""
+        return (FrozenList, (list(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Return :code:`value` with all nested dicts, lists and sets replaced by immutable equivalents.
+
+    Values already frozen are returned as they are, so are shared rather than copied.
+
+    Examples
+    --------
+    >>> frozen = freeze({'tags': ['raw'], 'shape': (3, [1])})
+    >>> frozen == {'tags': ['raw'], 'shape': (3, [1])}, type(frozen['shape'][1]).__name__
+    (True, 'FrozenList')
+    >>> freeze(frozen) is frozen
+    True
+
+    """
+    if isinstance(value, (FrozenDict, FrozenList, frozenset)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict(value)
+    if isinstance(value, list):
+        return FrozenList(value)
+    if isinstance(value, set):
+        return frozenset(value)
+    if type(value) is tuple:  # n.b. not e.g. named tuples
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Return a copy of :code:`value` in which all nested dicts and lists are (mutable) copies, but not their items.
+
+    This reverses :code:`freeze()`, e.g. before serialising metadata or to modify a copy of it.
+
+    """
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in dict.items(value)}
+    if isinstance(value, list):
+        return [thaw(v) for v in value]
+    if isinstance(value, tuple) and not hasattr(value, "_fields"):  # e.g. constructor args
+        return tuple(thaw(v) for v in value)
+    return value
+
+
+def _writes(method: Callable) -> Callable:
+    """Decorate a :code:`MetadataDict` method modifying the dictionary to first detach any frames sharing it."""
+
+    def wrapper(self, *args, **kwargs):
+        if self._sharers:
+            self._detach()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+class MetadataDict(dict):
+    """A metadata dictionary which frames derived from its owner share until it is modified.
+
+    Its values are immutable, see :code:`freeze()`, and are shared between frames
+    rather than copied, so a nested value is updated by setting the item anew.
+    Deriving a frame, e.g. by slicing, does not copy the metadata. Instead the
+    derived frame takes a shallow copy upon first access of its own :code:`metadata`,
+    or earlier if the owner modifies this dictionary, so changes never leak between
+    frames and reading the metadata never copies it.
+
+    Examples
+    --------
+    >>> mdf = MetaDataFrame({'a': [1, 2]}, metadata={'tags': ['raw']})
+    >>> head = mdf.head(1)  # shares the metadata of mdf
+    >>> mdf.metadata['tags'] += ['checked']
+    >>> head.metadata['tags'], mdf.metadata['tags']
+    (['raw'], ['raw', 'checked'])
+
+    """
+
+    __slots__ = ("_sharers",)
+
+    def __init__(self, *args, **kwargs):
+        """Create a new (unshared) metadata dictionary, freezing its values."""
+        super(MetadataDict, self).__init__((k, freeze(v)) for k, v in dict(*args, **kwargs).items())
+        self._sharers = None  # type: Optional[weakref.WeakSet]
+
+    def _share(self, holder: "LazyMetadata"):
+        """Register :code:`holder` as sharing this dictionary until detached."""
+        with _SHARE_LOCK:
+            if self._sharers is None:
+                self._sharers = weakref.WeakSet()
+            self._sharers.add(holder)
+
+    def _detach(self):
+        """Give each holder still sharing this dictionary a shallow copy of its current contents."""
+        with _SHARE_LOCK:
+            sharers, self._sharers = self._sharers, None
+            for holder in list(sharers or ()):
+                holder._adopt(self)
+
+    def _borrow(self) -> "MetadataDict":
+        """Return a shallow copy, sharing the (immutable) values of this dictionary."""
+        borrowed = MetadataDict()
+        dict.update(borrowed, self)
+        return borrowed
+
+    @_writes
+    def __setitem__(self, key: Any, value: Any):
+        """Set :code:`key` to (a frozen) :code:`value`, see :code:`dict.__setitem__()`."""
+        dict.__setitem__(self, key, freeze(value))
+
+    __delitem__ = _writes(dict.__delitem__)
+    pop = _writes(dict.pop)
+    popitem = _writes(dict.popitem)
+    clear = _writes(dict.clear)
+
+    @_writes
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        """Return the value of :code:`key`, first setting it to (a frozen) :code:`default` if not present."""
+        return dict.setdefault(self, key, freeze(default))
+
+    @_writes
+    def update(self, *args, **kwargs):
+        """Update from a mapping or iterable of pairs and keyword arguments, freezing the values."""
+        dict.update(self, ((k, freeze(v)) for k, v in dict(*args, **kwargs).items()))
+
+    def __ior__(self, other: Any) -> "MetadataDict":
+        """Update from :code:`other`, as for the in-place union of dictionaries (Python >= 3.9)."""
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        """Pickle as a plain (unshared) dictionary of the same class."""
+        return (self.__class__, (dict(self),))
+
+
+class LazyMetadata:
+    """A metadata dictionary whose (sidecar) contents are only loaded upon first access.
+
+    Parameters
+    ----------
+    data: dict
+        The metadata known up front, e.g. the constructor arguments.
+    loader: Callable or None
+        A function without arguments returning further metadata, which is merged
+        into :code:`data` when first accessed.
+
+    Examples
+    --------
+    >>> lazy = LazyMetadata({'rows': 3}, loader=lambda: {'source': 'data.csv'})
+    >>> lazy.is_loaded
+    False
+    >>> lazy.materialise()
+    {'rows': 3, 'source': 'data.csv'}
+    >>> lazy.is_loaded
+    True
+
+    """
+
+    __slots__ = ("data", "loader", "_lock", "_source", "__weakref__")
+
+    # class-wide counters of deferred and performed loads, see LazyMetadata.stats()
+    _deferred = 0
+    _loaded = 0
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, loader: Optional[Callable[[], Dict[str, Any]]] = None):
+        """Create new (unloaded) metadata."""
+        self.data = data if isinstance(data, MetadataDict) else MetadataDict(data or {})
+        self.loader = loader
+        self._lock = threading.Lock() if loader is not None else None
+        self._source = None  # type: Optional[LazyMetadata]
+        if loader is not None:
+            with _STATS_LOCK:
+                LazyMetadata._deferred += 1
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether there is no longer anything to load."""
+        return self.loader is None
+
+    def materialise(self) -> Dict[str, Any]:
+        """Return the metadata dictionary, calling the loader if not already done."""
+        if self._source is not None:
+            return self._adopt(self.data)
+        if self.loader is None:
+            return self.data
+        with self._lock:
+            loader = self.loader
+            if loader is not None:  # not loaded by another thread whilst waiting on the lock
+                # n.b. bypasses MetadataDict.update() as derived frames share the load
+                dict.update(self.data, freeze(loader() or {}))
+                self.loader = None
+                with _STATS_LOCK:
+                    LazyMetadata._loaded += 1
+        return self.data
+
+    def derive(self) -> "LazyMetadata":
+        """Return metadata for a derived frame, sharing this metadata until either is accessed or modified.
+
+        Examples
+        --------
+        >>> lazy = LazyMetadata({'tags': ['raw']})
+        >>> derived = lazy.derive()
+        >>> derived.data is lazy.data
+        True
+        >>> derived.materialise()['tags'] += ['derived']
+        >>> lazy.materialise()
+        {'tags': ['raw']}
+
+        """
+        source = self._source or self
+        derived = LazyMetadata.__new__(LazyMetadata)
+        derived.data = source.data
+        derived.loader = derived._lock = None
+        derived._source = source
+        source.data._share(derived)
+        return derived
+
+    def _adopt(self, shared: MetadataDict) -> MetadataDict:
+        """Replace :code:`shared` by a shallow copy, if this metadata still shares it, and return the copy."""
+        source = self._source
+        if source is not None and source.loader is not None:
+            source.materialise()  # load once for all frames sharing the metadata
+        with _SHARE_LOCK:
+            if self._source is not None and self.data is shared:
+                self.data = shared._borrow()
+                self._source = None
+            return self.data
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "LazyMetadata":
+        """Return a copy-on-write view, e.g. as pandas deep copies :code:`DataFrame.attrs` onto derived frames."""
+        return self.derive()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the (loaded) metadata for pickling, as locks and loaders may not be picklable."""
+        return {"data": self.materialise()}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        """Restore pickled metadata."""
+        self.data = MetadataDict(state["data"])
+        self.loader = self._lock = self._source = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Return the number of loads deferred, performed and (so far) avoided by all instances."""
+        with _STATS_LOCK:
+            return {"deferred": cls._deferred, "loaded": cls._loaded, "avoided": cls._deferred - cls._loaded}
+
+    @classmethod
+    def reset_stats(cls):
+        """Reset the counters returned by :code:`LazyMetadata.stats()`."""
+        with _STATS_LOCK:
+            cls._deferred = cls._loaded = 0
+
 
 class MetaDataFrame(pd.DataFrame):
     """A specialised DataFrame class for tracking metadata.
@@ -14,11 +356,11 @@ class MetaDataFrame(pd.DataFrame):
     0  1  2  3
     >>> mdf.metadata
     {'constructor': {'class': metapandas.metadataframe.MetaDataFrame,
-     'args': ([[1, 2, 3]],),
-     'kwargs': {'columns': ['a', 'b', 'c']}}}
+     'args': ({'type': 'list', 'len': 1, 'repr': '[[1, 2, 3]]'},),
+     'kwargs': {'columns': {'type': 'list', 'len': 3, 'repr': "['a', 'b', 'c']"}}}}
     """
 
-    _metadata = ["metadata"]  # lists properites which should be passed to copies
+    _metadata = ["_lazy_metadata"]  # lists properites which should be passed to copies, see __finalize__()
 
     def __init__(self, *args, **kwargs):
         """Wrap the pd.DataFrame.__init__ function.
@@ -28,21 +370,109 @@ class MetaDataFrame(pd.DataFrame):
         The keyword argument :code:`metadata` can be used to
         initialise the MetaDataFrame.metadata dictionary.
 
+        Only a bounded summary of the constructor arguments is recorded,
+        see :code:`metapandas.util.summarise_arguments()`, so the input
+        data is not kept alive by (nor serialised with) the metadata.
+
         """
         metadata = kwargs.pop("metadata", {})
         super(MetaDataFrame, self).__init__(*args, **kwargs)
+        args, kwargs = summarise_arguments(args, kwargs)
         metadata.update(
             {"constructor": {"class": self.__class__, "args": args, "kwargs": kwargs}}
         )
         self.metadata = metadata
+        if cfg.LINEAGE:
+            start_lineage(self, self.__class__.__name__)
+
+    @classmethod
+    def from_frame(cls, frame: Any, metadata: Optional[Dict[str, Any]] = None) -> "MetaDataFrame":
+        """Return :code:`frame` as a MetaDataFrame without copying or consolidating its data.
+
+        Parameters
+        ----------
+        frame: DataFrame
+            The frame to wrap, e.g. as returned by :code:`pandas.read_csv()`.
+            Objects other than DataFrames are passed to the constructor as usual.
+        metadata: dict or None
+            The initial metadata dictionary.
+
+        Notes
+        -----
+        A plain DataFrame is re-classed in place, so :code:`frame` itself is returned,
+        whereas the block manager of any other DataFrame subclass is shared.
+
+        Examples
+        --------
+        >>> df = pd.DataFrame({'a': [1, 2]})
+        >>> MetaDataFrame.from_frame(df) is df
+        True
+
+        """
+        if type(frame) is pd.DataFrame:
+            frame.__class__ = cls
+            result = frame
+        elif isinstance(frame, pd.DataFrame) and hasattr(cls, "_from_mgr"):
+            result = cls._from_mgr(frame._mgr, axes=frame._mgr.axes)
+        elif isinstance(frame, pd.DataFrame):
+            result = cls(frame._mgr)
+        else:
+            return cls(frame, metadata=metadata or {})
+        metadata = metadata or {}
+        metadata.setdefault("constructor", {"class": cls, "args": (), "kwargs": {}})
+        result.metadata = metadata
+        return result
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """The metadata dictionary, with any sidecar only loaded upon first access."""
+        lazy = getattr(self, "_lazy_metadata", None)
+        if lazy is None:
+            lazy = LazyMetadata()
+            object.__setattr__(self, "_lazy_metadata", lazy)
+        return lazy.materialise()
+
+    @metadata.setter
+    def metadata(self, value: Any):
+        """Set the metadata from a dictionary or :code:`LazyMetadata` instance."""
+        lazy = value if isinstance(value, LazyMetadata) else LazyMetadata(value)
+        object.__setattr__(self, "_lazy_metadata", lazy)
+
+    def __finalize__(self, other: Any, method: Optional[str] = None, **kwargs) -> "MetaDataFrame":
+        """Propagate metadata from :code:`other` to this derived frame, sharing it until either is modified.
+
+        When :code:`metapandas.config.LINEAGE` is set the operation is also recorded, see :code:`metapandas.lineage`.
+
+        """
+        result = super(MetaDataFrame, self).__finalize__(other, method=method, **kwargs)
+        state = result.__dict__
+        lazy = state.get("_lazy_metadata")
+        if result is not other and lazy is not None and lazy is getattr(other, "_lazy_metadata", None):
+            state["_lazy_metadata"] = lazy.derive()
+        if cfg.LINEAGE:
+            record_operation(state, other, method)
+        return result
+
+    @property
+    def lineage(self) -> Optional[Dict[str, Any]]:
+        """The graph of operations deriving this frame, if recorded, see :code:`metapandas.lineage.lineage_graph()`."""
+        return lineage_graph(get_lineage(self))
 
     @property
     def _constructor(self):
         """Internal pandas property for extending DataFrame construction."""
 
         def wrapper(*args, **kwargs):
-            df = MetaDataFrame(*args, **kwargs)
+            # n.b. derived frames receive their metadata from __finalize__()
+            df = pd.DataFrame.__new__(MetaDataFrame)
+            pd.DataFrame.__init__(df, *args, **kwargs)
             # call custom methods here
             return df
 
         return wrapper
+
+    if hasattr(pd.DataFrame, "_constructor_from_mgr"):
+
+        def _constructor_from_mgr(self, mgr, axes):
+            """Internal pandas method for constructing derived frames from a block manager."""
+            return MetaDataFrame._from_mgr(mgr, axes=axes)
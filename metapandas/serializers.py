@@ -0,0 +1,277 @@
+"""Provides interchangeable serializers for encoding and decoding metadata sidecars.
+
+Plain data (dictionaries, lists, strings and numbers) is encoded by the fastest
+available native JSON library, with jsonpickle only used to flatten those objects
+the native encoder does not support, such as the functions and classes recorded
+within metadata. Such objects are restored upon decoding, so the output remains
+compatible with sidecars written by jsonpickle.
+
+The serializer is selected by :code:`metapandas.config.SERIALIZER`, which is one of:
+
+  1. auto - the first available of orjson, ujson and json.
+  2. orjson, ujson or json - the named native encoder.
+  3. jsonpickle - jsonpickle for everything (slowest).
+
+Binary sidecars are encoded with :code:`MsgpackSerializer` instead, optionally
+compressed with gzip or zstd as selected by :code:`metapandas.config.SIDECAR_COMPRESSION`.
+
+"""
+from typing import Any, Dict, Optional, Union
+
+import gzip
+import json
+
+from loguru import logger
+
+import metapandas.config as cfg
+from metapandas.util import get_json_dumps_kwargs
+
+try:
+    import jsonpickle
+    from jsonpickle.pickler import Pickler
+    from jsonpickle.unpickler import Unpickler
+    from jsonpickle.tags import RESERVED as JSONPICKLE_TAGS
+except ImportError:
+    logger.error(
+        "Full JSON serialisation not available - please pip install jsonpickle"
+    )
+    jsonpickle = None
+    JSONPICKLE_TAGS = set()
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def flatten(obj: Any) -> Any:
+    """Flatten an object unsupported by native JSON encoders into jsonpickle form."""
+    if jsonpickle is None:
+        return repr(obj)
+    return Pickler(make_refs=False).flatten(obj, reset=True)
+
+
+def restore(obj: Any) -> Any:
+    """Restore any jsonpickle flattened objects nested within decoded JSON data :code:`obj`."""
+    if isinstance(obj, dict):
+        if jsonpickle is not None and not JSONPICKLE_TAGS.isdisjoint(obj):
+            return Unpickler().restore(obj, reset=True)
+        return {k: restore(v) if isinstance(v, (dict, list)) else v for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [restore(v) if isinstance(v, (dict, list)) else v for v in obj]
+    return obj
+
+
+class JsonSerializer:
+    """A serializer using the standard library :code:`json` module.
+
+    Examples
+    --------
+    >>> serializer = JsonSerializer()
+    >>> serializer.dumps({"method": len, "rows": 3})
+    '{"method":{"py/function":"builtins.len"},"rows":3}'
+    >>> serializer.loads(serializer.dumps({"method": len}))["method"] is len
+    True
+
+    """
+
+    name = "json"
+
+    def _encode(self, obj: Any, indent: Optional[int]) -> str:
+        """Encode :code:`obj` to JSON, calling :code:`flatten()` for unsupported objects."""
+        return json.dumps(
+            obj,
+            default=flatten,
+            indent=indent or None,
+            separators=None if indent else (",", ":"),
+            ensure_ascii=False,
+        )
+
+    def _decode(self, text: Union[bytes, str]) -> Any:
+        """Decode JSON :code:`text` into plain python data."""
+        return json.loads(text)
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> str:
+        """Encode :code:`obj` as a JSON string, which is compact when :code:`indent` is not given."""
+        try:
+            return self._encode(obj, indent)
+        except (TypeError, ValueError, OverflowError):
+            # e.g. non-string dictionary keys which only jsonpickle can encode
+            if jsonpickle is None:
+                raise
+            return JsonPickleSerializer().dumps(obj, indent)
+
+    def loads(self, text: Union[bytes, str]) -> Any:
+        """Decode JSON :code:`text`, restoring any objects flattened by jsonpickle."""
+        data = self._decode(text)
+        tag = b'"py/' if isinstance(text, bytes) else '"py/'
+        return restore(data) if tag in text else data
+
+
+class OrjsonSerializer(JsonSerializer):
+    """A serializer using :code:`orjson`, falling back to :code:`json` for unsupported options."""
+
+    name = "orjson"
+
+    def _encode(self, obj: Any, indent: Optional[int]) -> str:
+        """Encode :code:`obj` to JSON, calling :code:`flatten()` for unsupported objects."""
+        if indent not in (None, 0, 2):
+            return super(OrjsonSerializer, self)._encode(obj, indent)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=flatten, option=option).decode("utf8")
+
+    def _decode(self, text: Union[bytes, str]) -> Any:
+        """Decode JSON :code:`text` into plain python data."""
+        return orjson.loads(text)
+
+
+class UjsonSerializer(JsonSerializer):
+    """A serializer using :code:`ujson`."""
+
+    name = "ujson"
+
+    def _encode(self, obj: Any, indent: Optional[int]) -> str:
+        """Encode :code:`obj` to JSON, calling :code:`flatten()` for unsupported objects."""
+        return ujson.dumps(obj, default=flatten, indent=indent or 0, ensure_ascii=False)
+
+    def _decode(self, text: Union[bytes, str]) -> Any:
+        """Decode JSON :code:`text` into plain python data."""
+        return ujson.loads(text)
+
+
+class JsonPickleSerializer(JsonSerializer):
+    """A serializer using :code:`jsonpickle` for all data."""
+
+    name = "jsonpickle"
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> str:
+        """Encode :code:`obj` as a JSON string, which is compact when :code:`indent` is not given."""
+        kwargs = get_json_dumps_kwargs(jsonpickle) if indent else {}
+        if "indent" in kwargs:
+            kwargs["indent"] = indent
+        return jsonpickle.dumps(obj, **kwargs)
+
+    def loads(self, text: Union[bytes, str]) -> Any:
+        """Decode JSON :code:`text`, restoring any objects encoded by jsonpickle."""
+        return jsonpickle.loads(text)
+
+
+class MsgpackSerializer:
+    """A binary serializer using :code:`msgpack`, flattening unsupported objects as jsonpickle does.
+
+    Examples
+    --------
+    >>> serializer = MsgpackSerializer()
+    >>> serializer.loads(serializer.dumps({"method": len, "rows": 3}))
+    {'method': <built-in function len>, 'rows': 3}
+
+    """
+
+    name = "msgpack"
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> bytes:
+        """Encode :code:`obj` as MessagePack, with :code:`indent` accepted for compatibility only."""
+        if msgpack is None:
+            raise ImportError("MessagePack sidecars are not available - please pip install msgpack")
+        return msgpack.packb(obj, default=flatten, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        """Decode MessagePack :code:`data`, restoring any objects flattened by jsonpickle."""
+        if msgpack is None:
+            raise ImportError("MessagePack sidecars are not available - please pip install msgpack")
+        decoded = msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return restore(decoded) if b"py/" in data else decoded
+
+
+def compress(data: bytes, compression: Optional[str] = None) -> bytes:
+    """Compress :code:`data` using :code:`compression` (default: config.SIDECAR_COMPRESSION).
+
+    Parameters
+    ----------
+    data: bytes
+        The data to compress.
+    compression: {'zstd', 'gzip', 'none'} or None
+        The compression method, with zstd falling back to gzip when unavailable.
+
+    """
+    compression = (compression or cfg.SIDECAR_COMPRESSION or "none").lower()
+    if compression in ("zstd", "zstandard") and zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    if compression in ("zstd", "zstandard", "gzip", "gz"):
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def decompress(data: bytes) -> bytes:
+    """Return :code:`data` decompressed according to its leading magic bytes, if compressed.
+
+    Raises
+    ------
+    ValueError
+        If the compressed data is corrupt or truncated.
+
+    """
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ImportError("zstd compressed sidecars require zstandard - please pip install zstandard")
+        try:
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        except zstandard.ZstdError as err:
+            raise ValueError(str(err))
+    if data.startswith(GZIP_MAGIC):
+        try:
+            return gzip.decompress(data)
+        except (OSError, EOFError) as err:
+            raise ValueError(str(err))
+    return data
+
+
+SERIALIZERS = {
+    "orjson": (OrjsonSerializer, lambda: orjson is not None),
+    "ujson": (UjsonSerializer, lambda: ujson is not None),
+    "json": (JsonSerializer, lambda: True),
+    "jsonpickle": (JsonPickleSerializer, lambda: jsonpickle is not None),
+}  # type: Dict[str, Any]
+
+_INSTANCES = {}  # type: Dict[str, JsonSerializer]
+
+
+def get_serializer(name: Optional[str] = None) -> JsonSerializer:
+    """Return the serializer :code:`name`, defaulting to :code:`metapandas.config.SERIALIZER`.
+
+    Notes
+    -----
+    When the requested serializer is unavailable the best available alternative is used.
+
+    """
+    name = name or cfg.SERIALIZER
+    serializer = _INSTANCES.get(name)
+    if serializer is None:
+        candidates = [name] if name in SERIALIZERS else []
+        candidates += ["orjson", "ujson", "json"]
+        for candidate in candidates:
+            serializer_class, available = SERIALIZERS[candidate]
+            if available():
+                break
+        serializer = _INSTANCES.setdefault(name, serializer_class())
+    return serializer
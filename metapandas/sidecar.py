@@ -0,0 +1,183 @@
+"""Provides functions for locating, reading and appending to metadata sidecar files.
+
+A sidecar sits alongside the data file it describes, e.g. :code:`data.csv.meta.json`,
+and is stored in one of the following formats:
+
+  1. json - a single JSON document, with repeated saves merged under a 'stages' key.
+  2. jsonl - JSON Lines, with each save appending one stage per line.
+  3. msgpack - a single MessagePack document, merged like json and optionally
+     compressed with gzip or zstd (see :code:`metapandas.config.SIDECAR_COMPRESSION`).
+
+The compression of a msgpack sidecar is detected when reading, so no configuration is needed to load it.
+
+"""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import os
+import warnings
+
+import metapandas.config as cfg
+import metapandas.serializers as serializers
+from metapandas.util import locked_file
+from metapandas.serializers import MsgpackSerializer, compress, decompress, get_serializer
+
+SIDECAR_SUFFIXES = {
+    "json": ".meta.json",
+    "jsonl": ".meta.jsonl",
+    "msgpack": ".meta.msgpack",
+}  # type: Dict[str, str]
+
+
+def resolve_sidecar_format(sidecar_format: Optional[str] = None) -> str:
+    """Return the format in which to save a sidecar given :code:`sidecar_format` (default: config.SIDECAR_FORMAT).
+
+    Notes
+    -----
+    This is resolved before the data file is written, so an unknown format raises a
+    :code:`ValueError` up front, whilst msgpack falls back to json with a warning when
+    :code:`msgpack` is not installed (see the 'fast' extra).
+
+    """
+    sidecar_format = sidecar_format or cfg.SIDECAR_FORMAT
+    if sidecar_format not in SIDECAR_SUFFIXES:
+        raise ValueError(
+            "Unknown sidecar format {!r}, expected one of {}".format(sidecar_format, sorted(SIDECAR_SUFFIXES))
+        )
+    if sidecar_format == "msgpack" and serializers.msgpack is None:
+        warnings.warn("MessagePack sidecars are not available - please pip install msgpack, saving as json instead")
+        return "json"
+    return sidecar_format
+
+
+def sidecar_path(datapath: Union[Path, str], sidecar_format: Optional[str] = None) -> str:
+    """Return the sidecar filepath of :code:`datapath` for :code:`sidecar_format` (default: config.SIDECAR_FORMAT)."""
+    suffix = SIDECAR_SUFFIXES[sidecar_format or cfg.SIDECAR_FORMAT]
+    return str(datapath).replace("/", os.sep) + suffix
+
+
+def find_sidecar(datapath: Union[Path, str]) -> str:
+    """Return the path of an existing sidecar for :code:`datapath`.
+
+    The configured :code:`metapandas.config.SIDECAR_FORMAT` is preferred, followed by
+    the other supported formats. When no sidecar exists the preferred path is returned.
+
+    """
+    preferred = sidecar_path(datapath)
+    if os.path.exists(preferred):
+        return preferred
+    for sidecar_format in SIDECAR_SUFFIXES:
+        filepath = sidecar_path(datapath, sidecar_format)
+        if os.path.exists(filepath):
+            return filepath
+    return preferred
+
+
+def get_sidecar_format(filepath: Union[Path, str]) -> str:
+    """Return the sidecar format of :code:`filepath` based upon its extension, defaulting to json."""
+    extension = os.path.splitext(str(filepath))[1].lstrip(".")
+    return extension if extension in SIDECAR_SUFFIXES else "json"
+
+
+def encode_document(data: Any, sidecar_format: str = "json") -> Union[bytes, str]:
+    """Encode :code:`data` as the contents of a (non-appending) sidecar in :code:`sidecar_format`."""
+    if sidecar_format == "msgpack":
+        return compress(MsgpackSerializer().dumps(data))
+    return get_serializer().dumps(data, indent=cfg.SIDECAR_INDENT or None)
+
+
+def decode_document(contents: bytes, sidecar_format: str = "json") -> Any:
+    """Decode the :code:`contents` of a (non-appending) sidecar in :code:`sidecar_format`."""
+    if sidecar_format == "msgpack":
+        return MsgpackSerializer().loads(decompress(contents))
+    return get_serializer().loads(contents)
+
+
+def append_stage(filepath: Union[Path, str], stage: Dict[str, Any]):
+    """Append :code:`stage` as a single line to the JSON Lines sidecar :code:`filepath`.
+
+    Notes
+    -----
+    Unlike merging into a JSON sidecar, the existing stages are neither read nor
+    rewritten, so the cost of a save is independent of the number of previous stages.
+    An advisory lock is held whilst writing so lines from concurrent writers never interleave.
+
+    """
+    line = get_serializer().dumps(stage) + "\n"
+    with locked_file(filepath) as f:
+        f.write(line)
+
+
+def _read_last_line(f, block_size: int = 65536) -> bytes:
+    """Return the last non-empty line of binary file object :code:`f` by reading backwards."""
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    tail = b""
+    while position > 0:
+        step = min(block_size, position)
+        position -= step
+        f.seek(position)
+        tail = f.read(step) + tail
+        stripped = tail.rstrip(b"\r\n")
+        if b"\n" in stripped:
+            return stripped.rsplit(b"\n", 1)[-1]
+    return tail.rstrip(b"\r\n")
+
+
+def read_stages(filepath: Union[Path, str], latest: bool = False) -> List[Dict[str, Any]]:
+    """Read the stages recorded within sidecar :code:`filepath`.
+
+    Parameters
+    ----------
+    filepath: str or Path
+        The sidecar to read, in any supported format.
+    latest: bool
+        Only return the most recent stage. For JSON Lines sidecars the earlier
+        stages are skipped without being read or parsed.
+
+    Returns
+    -------
+    List[dict]
+        The stages in the order they were saved.
+
+    """
+    filepath = str(filepath)
+    sidecar_format = get_sidecar_format(filepath)
+    if sidecar_format == "jsonl":
+        serializer = get_serializer()
+        if latest:
+            with open(filepath, "rb") as f:
+                line = _read_last_line(f)
+            return [serializer.loads(line)] if line.strip() else []
+        with open(filepath, "rb") as f:
+            return [serializer.loads(line) for line in f if line.strip()]
+
+    with open(filepath, "rb") as f:
+        data = decode_document(f.read(), sidecar_format)
+    stages = data["stages"] if isinstance(data, dict) and "stages" in data else [data]
+    return stages[-1:] if latest else stages
+
+
+def load_sidecar(filepath: Union[Path, str], stages: Optional[str] = None) -> Dict[str, Any]:
+    """Load sidecar :code:`filepath` as a metadata dictionary.
+
+    Parameters
+    ----------
+    filepath: str or Path
+        The sidecar to read, in any supported format.
+    stages: {'all', 'latest'} or None
+        Whether to return all stages or just the most recent one.
+        Defaults to :code:`metapandas.config.READ_STAGES`.
+
+    Returns
+    -------
+    dict
+        The metadata of a single stage or, when more than one stage is present,
+        a dictionary with all stages listed under the 'stages' key.
+
+    """
+    latest = (stages or cfg.READ_STAGES) == "latest"
+    loaded = read_stages(filepath, latest=latest)
+    if len(loaded) == 1:
+        return loaded[0]
+    return {"stages": loaded} if loaded else {}
@@ -0,0 +1,176 @@
+"""Provides a content-addressed store for sharing environment metadata between sidecars.
+
+Rather than embedding the (often large) package and environment variable
+dictionaries within every metadata sidecar, these can be written once to an
+:code:`EnvironmentStore` and referenced by the SHA-256 digest of their canonical JSON.
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import re
+import os
+import json
+import hashlib
+import threading
+
+import metapandas.config as cfg
+from metapandas.util import atomic_write
+
+ENVIRONMENT_KEYS = (
+    "environment-variables",
+    "conda-environment",
+    "conda-packages",
+    "apt-packages",
+    "brew-packages",
+    "python-packages",
+)
+
+ENVIRONMENT_REF_KEY = "environment-ref"
+ENVIRONMENT_STORE_KEY = "environment-store"
+
+_REF_PATTERN = re.compile(r"sha256:([0-9a-f]{64})\Z")
+
+
+class EnvironmentStore:
+    """A content-addressed store of environment metadata blobs.
+
+    Parameters
+    ----------
+    directory: str or Path
+        The root directory of the store, which is created on first write.
+
+    Examples
+    --------
+    >>> import tempfile
+    >>> store = EnvironmentStore(tempfile.mkdtemp())
+    >>> metadata = store.split({"os": "Linux", "python-packages": {"pandas": "1.1.3"}})
+    >>> sorted(metadata)
+    ['environment-ref', 'environment-store', 'os']
+    >>> store.resolve(metadata)["python-packages"]
+    {'pandas': '1.1.3'}
+
+    """
+
+    def __init__(self, directory: Union[Path, str]):
+        """Create a new store rooted at :code:`directory`."""
+        self.directory = Path(os.path.abspath(os.path.expanduser(str(directory))))
+        self._blobs = {}  # type: Dict[str, Dict[str, Any]]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def canonicalise(blob: Dict[str, Any]) -> bytes:
+        """Return the canonical JSON encoding of :code:`blob` used for hashing."""
+        return json.dumps(
+            blob, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+        ).encode("utf8")
+
+    def _filepath(self, digest: str) -> Path:
+        """Return the path of the blob for :code:`digest`."""
+        return self.directory / digest[:2] / "{}.json".format(digest)
+
+    def put(self, blob: Dict[str, Any]) -> str:
+        """Store :code:`blob` (if not already present) and return its digest reference."""
+        encoded = self.canonicalise(blob)
+        digest = hashlib.sha256(encoded).hexdigest()
+        if digest not in self._blobs:
+            filepath = self._filepath(digest)
+            if not filepath.exists():
+                filepath.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write(filepath, encoded)
+            with self._lock:
+                self._blobs[digest] = json.loads(encoded.decode("utf8"))
+        return "sha256:" + digest
+
+    def get(self, ref: str) -> Dict[str, Any]:
+        """Return the blob referenced by :code:`ref`, which is cached after the first read.
+
+        Raises
+        ------
+        KeyError
+            If :code:`ref` is not a SHA-256 reference, e.g. as read from an untrusted sidecar,
+            or is not present in the store with matching content.
+
+        """
+        match = _REF_PATTERN.match(ref) if isinstance(ref, str) else None
+        if match is None:
+            raise KeyError(ref)
+        digest = match.group(1)
+        blob = self._blobs.get(digest)
+        if blob is None:
+            try:
+                with open(str(self._filepath(digest)), "rb") as f:
+                    encoded = f.read()
+                if hashlib.sha256(encoded).hexdigest() != digest:
+                    raise ValueError("digest mismatch")
+                blob = json.loads(encoded.decode("utf8"))
+            except (OSError, ValueError):
+                raise KeyError(ref)
+            if not isinstance(blob, dict):
+                raise KeyError(ref)
+            with self._lock:
+                self._blobs[digest] = blob
+        return blob
+
+    def split(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of :code:`metadata` with the environment block replaced by a store reference."""
+        blob = {k: metadata[k] for k in ENVIRONMENT_KEYS if k in metadata}
+        if not blob:
+            return metadata
+        metadata = {k: v for k, v in metadata.items() if k not in blob}
+        metadata[ENVIRONMENT_REF_KEY] = self.put(blob)
+        metadata[ENVIRONMENT_STORE_KEY] = str(self.directory)
+        return metadata
+
+    def resolve(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of :code:`metadata` with the referenced environment block merged back in."""
+        ref = metadata.get(ENVIRONMENT_REF_KEY)
+        if not ref:
+            return metadata
+        metadata = dict(metadata)
+        metadata.update(self.get(ref))
+        return metadata
+
+
+_STORES = {}  # type: Dict[str, EnvironmentStore]
+
+
+def get_environment_store(directory: Optional[Union[Path, str]] = None) -> Optional[EnvironmentStore]:
+    """Return the shared store for :code:`directory` (default: config.ENVIRONMENT_STORE_DIR) or None if disabled."""
+    directory = directory or cfg.ENVIRONMENT_STORE_DIR
+    if not directory:
+        return None
+    directory = os.path.abspath(os.path.expanduser(str(directory)))
+    store = _STORES.get(directory)
+    if store is None:
+        store = _STORES.setdefault(directory, EnvironmentStore(directory))
+    return store
+
+
+def resolve_environment_refs(metadata: Any) -> Any:
+    """Expand environment store references within :code:`metadata` where the referenced store is available.
+
+    The configured store is tried first, followed by the store recorded alongside each reference
+    if :code:`metapandas.config.TRUST_SIDECAR_ENVIRONMENT_STORE` is set, as the sidecar being read
+    may not be trusted. Unresolvable references are left in place.
+
+    """
+    if isinstance(metadata, list):
+        return [resolve_environment_refs(stage) for stage in metadata]
+    if not isinstance(metadata, dict):
+        return metadata
+    if "stages" in metadata:
+        metadata = dict(metadata, stages=resolve_environment_refs(metadata["stages"]))
+    if ENVIRONMENT_REF_KEY not in metadata:
+        return metadata
+    directories = [cfg.ENVIRONMENT_STORE_DIR]
+    if cfg.TRUST_SIDECAR_ENVIRONMENT_STORE and isinstance(metadata.get(ENVIRONMENT_STORE_KEY), str):
+        directories.append(metadata[ENVIRONMENT_STORE_KEY])
+    for directory in directories:
+        store = get_environment_store(directory) if directory else None
+        if store is None:
+            continue
+        try:
+            return store.resolve(metadata)
+        except KeyError:
+            continue
+    return metadata
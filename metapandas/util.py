@@ -1,10 +1,37 @@
 """Provide utility functions used elsewhere in this package."""
+import os
 import sys
 import re
+import queue
+import reprlib
+import tempfile
+import threading
 
-from typing import Optional
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import metapandas.config as cfg
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None  # type: ignore
+
+# bounded reprs for summarising arbitrarily large values
+_SUMMARY_REPR = reprlib.Repr()
+_SUMMARY_REPR.maxlevel = 2
+_SUMMARY_REPR.maxstring = _SUMMARY_REPR.maxother = 60
+
+# the process umask can only be queried by setting it, so do this once upon import
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
 
 def vprint(*args, **kwargs):
     """Print only when VERBOSE evaulates to true within config."""
@@ -30,6 +57,81 @@ def friendly_symbol_name(obj) -> str:
     ).strip()
 
 
+def summarise_value(value: Any, max_repr: int = 80) -> Any:
+    """Return a small, JSON compatible summary of :code:`value` which holds no reference to it.
+
+    Numbers, booleans, None and short strings are returned as is, whereas other values are
+    summarised by their type, shape (or length), dtype and a repr of at most :code:`max_repr`
+    characters (omitted when less than 16), which is computed without visiting every element
+    of large containers.
+
+    Examples
+    --------
+    >>> summarise_value([[1, 2, 3]] * 1000)
+    {'type': 'list', 'len': 1000, 'repr': '[[1, 2, 3], [1, 2, 3], [1, 2, 3], [1, 2, 3], [1, 2, 3], [1, 2, 3], ...]'}
+
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str) and len(value) <= max_repr:
+        return value
+
+    summary = {"type": friendly_symbol_name(type(value))}  # type: Dict[str, Any]
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        summary["shape"] = list(shape)
+    elif hasattr(value, "__len__"):
+        try:
+            summary["len"] = len(value)
+        except TypeError:
+            pass
+    dtype = getattr(value, "dtype", None)
+    if dtype is not None:
+        summary["dtype"] = str(dtype)
+    if max_repr >= 16:
+        if hasattr(value, "columns"):  # e.g. DataFrame, whose repr is costly and uninformative here
+            text = _SUMMARY_REPR.repr(list(value.columns[:_SUMMARY_REPR.maxlist + 1]))
+            summary["columns"] = _truncate(text, max_repr)
+        elif shape is None or dtype is None:  # n.b. arrays are described by their shape and dtype
+            try:
+                summary["repr"] = _truncate(_SUMMARY_REPR.repr(value), max_repr)
+            except Exception:  # repr of arbitrary objects may fail
+                pass
+    return summary
+
+
+def _truncate(text: str, length: int) -> str:
+    """Return :code:`text` truncated to at most :code:`length` characters."""
+    return text if len(text) <= length else text[:length - 3] + "..."
+
+
+def summarise_arguments(
+    args: Tuple[Any, ...], kwargs: Dict[str, Any], max_bytes: Optional[int] = None
+) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+    """Return summaries of call arguments :code:`args` and :code:`kwargs`, see :code:`summarise_value()`.
+
+    Parameters
+    ----------
+    args: tuple
+        The positional arguments.
+    kwargs: dict
+        The keyword arguments.
+    max_bytes: int or None
+        The total budget for reprs, after which values are only summarised by type and shape.
+        Defaults to :code:`metapandas.config.CONSTRUCTOR_SUMMARY_BYTES`.
+
+    """
+    budget = [cfg.CONSTRUCTOR_SUMMARY_BYTES if max_bytes is None else max_bytes]
+
+    def summarise(value):
+        summary = summarise_value(value, max_repr=min(80, budget[0]))
+        budget[0] -= len(summary if isinstance(summary, str) else str(summary))
+        budget[0] = max(budget[0], 0)
+        return summary
+
+    return tuple(summarise(arg) for arg in args), {k: summarise(v) for k, v in kwargs.items()}
+
+
 def get_major_minor_version(module) -> Optional[float]:
     """Return a float of the major.minor version release of module or None."""
     try:
@@ -49,7 +151,173 @@ def get_json_dumps_kwargs(json=None):
     kwargs = cfg.JSON_DUMPS_KWARGS or {"indent": 2}
     if json == sys.modules.get("jsonpickle"):
         jsonpickle_version = get_major_minor_version(json)
-        print(jsonpickle_version)
         if jsonpickle_version < 1.5:
             kwargs.pop("indent", None)  # not supported
     return kwargs
+
+
+def atomic_write(filepath: Union[Path, str], data: Union[bytes, str]):
+    """Write :code:`data` to :code:`filepath` atomically.
+
+    The data is first written to a temporary file within the same directory,
+    which then replaces :code:`filepath`, so readers never observe a partial write.
+
+    """
+    filepath = str(filepath)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(filepath)),
+        prefix="." + os.path.basename(filepath),
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        # mkstemp() creates private files, so apply the permissions open() would have used
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _lock_fd(fd: int):
+    """Acquire an exclusive advisory lock on file descriptor :code:`fd`, blocking until available."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _unlock_fd(fd: int):
+    """Release the advisory lock on file descriptor :code:`fd`."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked_file(filepath: Union[Path, str], binary: bool = False):
+    """Open :code:`filepath` for reading and appending whilst holding an exclusive advisory lock.
+
+    The file is created if it does not exist and is opened in binary mode when :code:`binary`
+    is set. Should another writer atomically replace the file whilst waiting on the lock,
+    the replacement is opened and locked instead, so the lock may be held across a read,
+    merge and :code:`atomic_write()` of the file.
+
+    """
+    filepath = str(filepath)
+    while True:
+        f = open(filepath, "a+b") if binary else open(filepath, "a+", encoding="utf8")
+        _lock_fd(f.fileno())
+        try:
+            if os.path.samestat(os.fstat(f.fileno()), os.stat(filepath)):
+                break
+        except OSError:
+            pass
+        _unlock_fd(f.fileno())
+        f.close()
+    try:
+        f.seek(0)
+        yield f
+    finally:
+        _unlock_fd(f.fileno())
+        f.close()
+
+
+class DaemonThreadPool:
+    """A minimal thread pool whose workers are daemon threads.
+
+    Unlike :code:`concurrent.futures.ThreadPoolExecutor`, whose workers are joined when
+    the interpreter exits, a task which never returns (e.g. a hung collector) does not
+    prevent the process from exiting. Workers are started as needed, up to :code:`max_workers`,
+    and then reused, although each hung task permanently occupies a worker.
+
+    Parameters
+    ----------
+    max_workers: int
+        The maximum number of worker threads.
+    name: str
+        The prefix of the worker thread names.
+
+    """
+
+    def __init__(self, max_workers: int, name: str = "metapandas-worker"):
+        """Create a new pool, which starts no threads until given a task."""
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self._queue = queue.Queue()  # type: queue.Queue
+        self._threads = []  # type: List[threading.Thread]
+        self._idle = threading.Semaphore(0)
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Run :code:`func(*args, **kwargs)` on a worker, returning a future of its result."""
+        future = Future()  # type: Future
+        self._queue.put((future, func, args, kwargs))
+        if not self._idle.acquire(blocking=False):
+            self._start_worker()
+        return future
+
+    def _start_worker(self):
+        """Start another worker unless :code:`max_workers` are already running."""
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name="{}-{}".format(self.name, len(self._threads)), daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        """Run queued tasks until given None."""
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            future, func, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as err:  # pylint: disable=broad-except
+                    future.set_exception(err)
+            del task, future
+            self._idle.release()
+
+    def shutdown(self):
+        """Stop idle workers, leaving any busy (or hung) workers to finish their tasks."""
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            self._threads = []
+
+
+_SHARED_POOLS = {}  # type: Dict[str, DaemonThreadPool]
+_SHARED_POOLS_LOCK = threading.Lock()
+
+
+def shared_daemon_pool(name: str, max_workers: int) -> DaemonThreadPool:
+    """Return the process-wide :code:`DaemonThreadPool` called :code:`name`, replacing it if resized."""
+    pool = _SHARED_POOLS.get(name)
+    if pool is None or pool.max_workers != max(1, max_workers):
+        with _SHARED_POOLS_LOCK:
+            pool = _SHARED_POOLS.get(name)
+            if pool is None or pool.max_workers != max(1, max_workers):
+                if pool is not None:
+                    pool.shutdown()
+                pool = _SHARED_POOLS[name] = DaemonThreadPool(max_workers, name=name)
+    return pool
+
+
+def _reset_shared_pools():
+    """Discard the pools of the parent process, whose threads are not forked."""
+    global _SHARED_POOLS_LOCK
+    _SHARED_POOLS.clear()
+    _SHARED_POOLS_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # Python >= 3.7
+    os.register_at_fork(after_in_child=_reset_shared_pools)
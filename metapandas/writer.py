@@ -0,0 +1,214 @@
+"""Provides a streaming writer saving a large result in chunks with a single sidecar stage.
+
+Appending chunks through the hooked pandas writers, e.g. :code:`to_csv(mode='a')`, saves
+a sidecar stage (and collects the environment metadata) for every chunk. Instead,
+:code:`MetaDataWriter` forwards each chunk to the original pandas writer, keeping running
+totals of the rows, chunks and write time, and saves exactly one sidecar stage when closed.
+
+Examples
+--------
+>>> import os, tempfile
+>>> from metapandas.metadata import MetaData
+>>> path = os.path.join(tempfile.mkdtemp(), 'data.csv')
+>>> with MetaData().writer(path, index=False) as writer:
+...     for start in range(0, 30, 10):
+...         writer.write(pd.DataFrame({'a': range(start, start + 10)}))
+>>> writer.summary()['rows'], writer.summary()['chunks']
+(30, 3)
+
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import os
+import sys
+import time
+import datetime
+
+import pandas as pd
+
+from metapandas.util import mangle, vprint
+from metapandas.sidecar import resolve_sidecar_format, sidecar_path
+from metapandas.metadataframe import thaw
+from metapandas.accessor import get_metadata, strip_metadata_attrs
+
+# keyword arguments of the pandas writers for the first and subsequent (appended) chunks
+STREAM_WRITERS = {
+    "to_csv": {"argname": "path_or_buf", "first": {}, "append": {"mode": "a", "header": False}},
+    "to_hdf": {"argname": "path_or_buf", "first": {"format": "table"}, "append": {"format": "table", "append": True}},
+    "to_json": {
+        "argname": "path_or_buf",
+        "first": {"orient": "records", "lines": True},
+        "append": {"orient": "records", "lines": True, "mode": "a"},
+    },
+}  # type: Dict[str, Dict[str, Any]]
+
+STREAM_EXTENSIONS = {
+    ".csv": "to_csv",
+    ".txt": "to_csv",
+    ".h5": "to_hdf",
+    ".hdf": "to_hdf",
+    ".hdf5": "to_hdf",
+    ".json": "to_json",
+    ".jsonl": "to_json",
+}  # type: Dict[str, str]
+
+
+def _unhooked(method: str) -> Any:
+    """Return the pandas DataFrame writer :code:`method` without any metadata hook applied."""
+    return getattr(pd.DataFrame, mangle(method), None) or getattr(pd.DataFrame, method)
+
+
+class MetaDataWriter:
+    """A context manager writing chunks of DataFrames to :code:`path` with a single sidecar stage.
+
+    Parameters
+    ----------
+    metadata: MetaData
+        The metadata object saving the sidecar.
+    path: str or Path
+        The data file to write.
+    method: {'to_csv', 'to_hdf', 'to_json'} or None
+        The pandas writer, inferred from the :code:`path` extension when not given.
+    sidecar_format: {'json', 'jsonl', 'msgpack'} or None
+        The sidecar format, defaulting to :code:`metapandas.config.SIDECAR_FORMAT`.
+    data: dict or None
+        The metadata to save instead of that collected by :code:`metadata`.
+    kwargs: dict
+        Keyword arguments passed to the pandas writer for every chunk, e.g. :code:`key` for hdf.
+
+    Raises
+    ------
+    ValueError
+        If :code:`method` is not a streaming writer, or is not given and the extension
+        of :code:`path` is not one of :code:`STREAM_EXTENSIONS`, or if :code:`sidecar_format`
+        is unknown.
+
+    """
+
+    def __init__(
+        self,
+        metadata: Any,
+        path: Union[Path, str],
+        method: Optional[str] = None,
+        sidecar_format: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ):
+        """Create a new writer, which writes nothing until given the first chunk."""
+        self.metadata = metadata
+        self.path = str(path)
+        extension = os.path.splitext(self.path)[1].lower()
+        if method is None and extension not in STREAM_EXTENSIONS:
+            raise ValueError(
+                "Cannot infer the writer of {!r} from its extension, expected one of {} or a method".format(
+                    self.path, sorted(STREAM_EXTENSIONS)
+                )
+            )
+        self.method = method or STREAM_EXTENSIONS[extension]
+        if self.method not in STREAM_WRITERS:
+            raise ValueError("Cannot stream chunks with {!r}".format(self.method))
+        self.sidecar_format = resolve_sidecar_format(sidecar_format)
+        self.data = data
+        self.kwargs = kwargs
+        self.closed = False
+        self._frame_metadata = None  # type: Optional[Dict[str, Any]]
+        self._rows = 0
+        self._chunks = 0
+        self._write_seconds = 0.0
+        self._min_rows = None  # type: Optional[int]
+        self._max_rows = 0
+        self._columns = None  # type: Optional[list]
+        self._started = None  # type: Optional[float]
+        self._finished = None  # type: Optional[float]
+
+    def write(self, chunk: pd.DataFrame):
+        """Write (or append) :code:`chunk` to the data file."""
+        if self.closed:
+            raise ValueError("Cannot write to a closed {}".format(self.__class__.__name__))
+        options = STREAM_WRITERS[self.method]
+        kwargs = dict(self.kwargs, **options["append" if self._chunks else "first"])
+        kwargs[options["argname"]] = self.path
+
+        start = time.time()
+        _unhooked(self.method)(strip_metadata_attrs(chunk), **kwargs)
+        finish = time.time()
+
+        rows = len(chunk)
+        if self._chunks == 0:
+            self._started = start
+            self._columns = [str(column) for column in chunk.columns]
+            self._frame_metadata = thaw(get_metadata(chunk))
+        self._chunks += 1
+        self._rows += rows
+        self._write_seconds += finish - start
+        self._min_rows = rows if self._min_rows is None else min(self._min_rows, rows)
+        self._max_rows = max(self._max_rows, rows)
+        self._finished = finish
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the running totals of the chunks written so far."""
+        return {
+            "rows": self._rows,
+            "chunks": self._chunks,
+            "columns": self._columns,
+            "min-chunk-rows": self._min_rows,
+            "max-chunk-rows": self._max_rows,
+            "write-seconds": round(self._write_seconds, 6),
+            "started": str(datetime.datetime.fromtimestamp(self._started)) if self._started else None,
+            "finished": str(datetime.datetime.fromtimestamp(self._finished)) if self._finished else None,
+        }
+
+    def close(self, completed: bool = True) -> Optional[str]:
+        """Save the sidecar stage (once), returning its path, or None if no chunks were written."""
+        if self.closed:
+            return None
+        self.closed = True
+        if not self._chunks:
+            return None
+        metapath = sidecar_path(self.path, self.sidecar_format)
+        additional_data = self._frame_metadata or {}
+        additional_data["storage"] = {
+            "method": _unhooked(self.method),
+            "kwargs": self.kwargs,
+            "data_filepath": self.path,
+            "metadata_filepath": metapath,
+            "chunked": dict(self.summary(), completed=completed),
+        }
+        self.metadata.save_sidecar(
+            filepath=metapath, sidecar_format=self.sidecar_format, data=self.data, additional_data=additional_data
+        )
+        return metapath
+
+    def __enter__(self) -> "MetaDataWriter":
+        """Enter the writing context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Save the sidecar, marking the output as incomplete if an error occurred."""
+        try:
+            self.close(completed=exc_type is None)
+        except Exception as err:
+            if exc_type is None:
+                raise
+            vprint("Could not save metadata for {} due to {!r}".format(self.path, err), file=sys.stderr)
+
+
+def open_writer(
+    metadata: Any,
+    path: Union[Path, str],
+    method: Optional[str] = None,
+    sidecar_format: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> MetaDataWriter:
+    """Return a :code:`MetaDataWriter` of chunks to :code:`path`, also available as :code:`MetaData.writer()`.
+
+    Examples
+    --------
+    >>> with MetaData().writer('data.csv', index=False) as writer:  # doctest: +SKIP
+    ...     for chunk in pd.read_csv('large.csv', chunksize=100000):
+    ...         writer.write(chunk[chunk['value'] > 0])
+
+    """
+    return MetaDataWriter(metadata, path, method=method, sidecar_format=sidecar_format, data=data, **kwargs)
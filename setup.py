@@ -49,6 +49,9 @@ try:
                                                                           config.get('options', {})
                                                                                 .get('install_requires', []))) +
                                                     install_requirements))
+        # optional dependencies are otherwise only picked up by PBR
+        setup_kwargs['extras_require'] = {name: [req.strip() for req in value.split('\n') if req.strip()]
+                                          for name, value in parser['extras'].items()}
 
 except ImportError:
     metadata = {}
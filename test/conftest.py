@@ -0,0 +1,14 @@
+import pytest
+
+from metapandas import config
+from metapandas.cache import ENVIRONMENT_CACHE, default_disk_cache
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_disk_cache(tmp_path_factory):
+    """Keep any disk cache enabled by METAPANDAS_DISK_CACHE within a temporary directory."""
+    cache_dir, disk_cache = config.DISK_CACHE_DIR, ENVIRONMENT_CACHE.disk_cache
+    config.DISK_CACHE_DIR = str(tmp_path_factory.mktemp('cache'))
+    ENVIRONMENT_CACHE.disk_cache = default_disk_cache()
+    yield
+    config.DISK_CACHE_DIR, ENVIRONMENT_CACHE.disk_cache = cache_dir, disk_cache
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from metapandas.accessor import METADATA_ATTR, get_metadata, set_metadata, strip_metadata_attrs
+
+
+def test_meta_accessor_propagates_to_derived_frames():
+    df = pd.DataFrame({'a': [1, 2, 3], 'b': list('xxy')})
+    assert get_metadata(df) == {} and METADATA_ATTR not in df.attrs
+    df.meta['tags'] = ['raw']
+    assert 'tags' in df.meta and df.meta.metadata == {'tags': ['raw']}
+
+    derived = df[df['a'] > 1].groupby('b')['a'].sum().reset_index()
+    assert type(derived) is pd.DataFrame
+    derived.meta['tags'] += ['derived']
+    assert df.meta['tags'] == ['raw'] and derived.meta['tags'] == ['raw', 'derived']
+
+    set_metadata(df, {'replaced': True})
+    assert get_metadata(df) == {'replaced': True}
+
+
+def test_strip_metadata_attrs():
+    df = pd.DataFrame({'a': [1]})
+    assert strip_metadata_attrs(df) is df
+    df.attrs['user'] = 1
+    df.meta['source'] = 'example'
+    stripped = strip_metadata_attrs(df)
+    assert stripped.attrs == {'user': 1}
+    assert METADATA_ATTR in df.attrs
+
+
+def test_frames_without_attrs():
+    class NoAttrsFrame(pd.DataFrame):  # as before pandas 1.0
+        @property
+        def attrs(self):
+            raise AttributeError('attrs')
+
+    df = NoAttrsFrame({'a': [1]})
+    assert get_metadata(df) == {}
+    assert strip_metadata_attrs(df) is df
+
+
+def test_attrs_round_trip_without_hooks(tmp_path):
+    import json
+    from metapandas.hooks.pandas import pandas_save_with_metadata
+
+    df = pd.DataFrame({'a': [1, 2]})
+    df.attrs['user'] = {'owner': 'example'}
+    df.meta['source'] = 'example'
+    assert json.loads(json.dumps(df.attrs)) == {'user': {'owner': 'example'}, METADATA_ATTR: {}}
+
+    # writers bypassing the hooks keep the user's attrs
+    to_parquet = getattr(pd.DataFrame, 'to_parquet_original', None) or pd.DataFrame.to_parquet
+    path = str(tmp_path / 'data.parquet')
+    to_parquet(df, path)
+    restored = (getattr(pd, 'read_parquet_original', None) or pd.read_parquet)(path)
+    assert restored.attrs == {'user': {'owner': 'example'}, METADATA_ATTR: {}}
+    assert get_metadata(restored) == {}
+
+    to_feather = pandas_save_with_metadata(
+        getattr(pd.DataFrame, 'to_feather_original', None) or pd.DataFrame.to_feather, argname='fname', strip_attrs=True
+    )
+    path = str(tmp_path / 'data.feather')
+    to_feather(df, path)
+    assert (getattr(pd, 'read_feather_original', None) or pd.read_feather)(path).attrs == {'user': {'owner': 'example'}}
+    assert df.meta['source'] == 'example'
+
+
+def test_read_in_accessor_mode(tmp_path):
+    from unittest.mock import patch
+    from metapandas import config
+    from metapandas.hooks.pandas import pandas_read_with_metadata, pandas_save_with_metadata
+
+    csv = str(tmp_path / 'data.csv')
+    to_csv = pandas_save_with_metadata(pd.DataFrame.to_csv, argname='path_or_buf')
+    to_csv(pd.DataFrame({'a': [1, 2]}), csv, index=False)
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')
+    to_pickle = pandas_save_with_metadata(pd.DataFrame.to_pickle)
+    with patch.object(config, 'METADATA_MODE', 'accessor'):
+        df = read_csv(csv)
+    assert type(df) is pd.DataFrame
+    assert df.meta['data_filepath'] == csv
+    assert df.meta['constructor']['class'] is pd.DataFrame
+
+    path = str(tmp_path / 'data.pkl')
+    to_pickle(df, path)
+    assert df.meta['storage']['data_filepath'] == csv  # saving does not modify the frame's metadata
+    assert pd.read_pickle(path).meta['data_filepath'] == csv
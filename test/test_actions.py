@@ -0,0 +1,76 @@
+from metapandas.actions import ActionLog
+from metapandas.metadata import MetaData
+
+
+def test_action_log_is_bounded():
+    log = ActionLog(maxlen=3)
+    for i in range(10):
+        log.register('data.csv', 'batch', str(i))
+    assert len(log) == 3 and log.registered == 10 and log.dropped == 7
+    assert [entry[-1] for entry in log] == ['7', '8', '9']
+    log.clear()
+    assert len(log) == 0 and log.registered == 10 and log.dropped == 0
+    log.register('data.csv', 'batch', '10')
+    assert [entry[0] for entry in log] == [10] and log.registered == 11
+
+    unbounded = ActionLog(maxlen=0)
+    for i in range(10):
+        unbounded.register('data.csv', 'batch', str(i))
+    assert len(unbounded) == 10 and unbounded.dropped == 0
+
+
+def test_action_log_is_bounded_across_threads():
+    import threading
+
+    log = ActionLog(maxlen=10)
+
+    def register(i):
+        for j in range(20):
+            log.register('thread-{}'.format(i), 'batch', str(j))
+
+    for batch in range(4):
+        threads = [threading.Thread(target=register, args=(8 * batch + i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    log.register('main', 'batch', 'last')
+
+    assert log.registered == 4 * 8 * 20 + 1 and len(log) == 10 and log.dropped == log.registered - 10
+    assert sum(len(buffer) for buffer in log._buffers.values()) <= 2 * log.maxlen
+    assert len(log._buffers) <= 9  # the buffers of finished threads are removed once trimmed
+    assert [entry[0] for entry in log] == list(range(log.registered - 10, log.registered))
+
+
+def test_action_log_formats_lazily():
+    log = ActionLog()
+    first = log.register('data.csv', 'clean', 'drop nulls\n')
+    log.register('other.csv', 'clean', '')
+    second = log.register('data.csv', 'scale', 'standardise')
+    assert first._items is None  # nothing formatted until accessed
+    assert len(first) == 1 and len(second) == 2
+    assert first[0].endswith(": ['<clean> drop nulls\\n']")
+    assert second == list(second)
+
+    # formatted when first accessed, and unchanged thereafter
+    bounded = ActionLog(maxlen=2)
+    early, late = bounded.register('data.csv', 'load', '0'), bounded.register('data.csv', 'load', '1')
+    assert '<load> 0' in ''.join(late) and '<load> 1' in ''.join(late)
+    bounded.register('other.csv', 'load', '2')
+    assert len(early) == 0 and '<load> 0' in ''.join(late)
+
+    actions = log.to_dict()
+    assert set(actions) == {'data.csv', 'other.csv'}
+    assert list(actions['other.csv'].values()) == [{'clean': ''}]
+
+
+def test_register_action_with_bounded_log(monkeypatch):
+    from metapandas import config
+
+    monkeypatch.setattr(config, 'ACTION_LOG_SIZE', 2)
+    md = MetaData()
+    for i in range(5):
+        md.register_action(on='batch', action='process', description=str(i))
+    assert md.action_log.dropped == 3
+    descriptions = [d for actions in md.actions['batch'].values() for d in actions.values()]
+    assert ''.join(descriptions) == '3\n4\n'
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pandas as pd
+
+from metapandas import aio, config
+from metapandas.context import metadata_context
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.sidecar import load_sidecar, sidecar_path
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_async_write_and_read_with_metadata(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    mdf = MetaDataFrame(pd.DataFrame({'a': [1, 2, 3]}))
+    mdf.metadata['source'] = 'example'
+
+    async def write_then_read():
+        with metadata_context() as metadata:
+            metadata.register_action(csv, 'generate', 'three rows')
+            await mdf.aio.to_csv(csv, index=False)
+        return await aio.read_csv(csv)
+
+    with patch.object(config, 'LAZY_METADATA', 1):
+        result = run(write_then_read())
+
+    assert isinstance(result, MetaDataFrame) and result['a'].tolist() == [1, 2, 3]
+    assert result._lazy_metadata.loader is None  # loaded in the executor
+    assert result.metadata['source'] == 'example'
+    assert result.metadata['data_filepath'] == csv
+    assert csv in load_sidecar(sidecar_path(csv))['processing-actions']
+
+
+def test_async_write_of_plain_frame_in_accessor_mode(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    df = pd.DataFrame({'a': [1]})
+    df.meta['source'] = 'accessor'
+    run(df.aio.to_csv(csv, index=False))
+    assert load_sidecar(sidecar_path(csv))['source'] == 'accessor'
+
+
+def test_run_in_executor_limits_concurrency_without_blocking_the_loop():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def blocking(index):
+        with lock:
+            active.append(index)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(index)
+        return index
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 5:
+                ticks.append(None)
+                await asyncio.sleep(0.01)
+
+        results = await asyncio.gather(ticker(), *(aio.run_in_executor(blocking, index) for index in range(6)))
+        return results[1:], ticks
+
+    with patch.object(config, 'AIO_CONCURRENCY', 2):
+        results, ticks = run(main())
+    assert results == list(range(6))
+    assert max(peak) == 2
+    assert len(ticks) == 5
+
+
+def test_run_in_executor_before_get_running_loop(monkeypatch):
+    monkeypatch.delattr(asyncio, 'get_running_loop')  # as on Python < 3.7
+    assert run(aio.run_in_executor(threading.get_ident)) != threading.get_ident()
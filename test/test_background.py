@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from metapandas import config
+from metapandas.background import SidecarQueue, flush_sidecars
+from metapandas.metadata import MetaData
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.sidecar import load_sidecar, sidecar_path
+
+
+class SlowMetaData(MetaData):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def save_sidecar(self, *args, **kwargs):
+        self.release.wait(5)
+        return super().save_sidecar(*args, **kwargs)
+
+
+def test_async_sidecars_are_saved_after_the_write_returns(tmp_path):
+    from metapandas.hooks.pandas import pandas_save_with_metadata, read_csv
+
+    csv = str(tmp_path / 'data.csv')
+    recorder = SlowMetaData()
+    unhooked_to_csv = getattr(pd.DataFrame, 'to_csv_original', None) or pd.DataFrame.to_csv
+    to_csv = pandas_save_with_metadata(unhooked_to_csv, argname='path_or_buf', metadata=recorder)
+    mdf = MetaDataFrame(pd.DataFrame({'a': [1, 2]}))
+    mdf.metadata['tags'] = ['raw']
+
+    with patch.object(config, 'ASYNC_SIDECARS', 1):
+        to_csv(mdf, csv, index=False)
+        mdf.metadata['tags'] += ['modified']  # after the write, so not saved
+        with open(csv) as f:  # n.b. pandas.read_csv() flushes the queue when hooked
+            assert f.read().split() == ['a', '1', '2']
+        assert flush_sidecars(timeout=0.05) is False
+        recorder.release.set()
+        assert read_csv(csv).metadata['tags'] == ['raw']  # flushed by the read hook
+
+    assert flush_sidecars(timeout=5)
+    assert load_sidecar(sidecar_path(csv))['storage']['data_filepath'] == csv
+
+
+def test_sidecar_queue_applies_back_pressure_and_keeps_order(tmp_path):
+    recorder = SlowMetaData()
+    sidecars = SidecarQueue(maxsize=1)
+    metapath = str(tmp_path / 'data.csv.meta.json')
+    submitted = []
+
+    def submit_all():
+        for stage in range(3):
+            sidecars.submit(recorder, metapath, data={'stage': stage})
+            submitted.append(stage)
+
+    thread = threading.Thread(target=submit_all)
+    thread.start()
+    time.sleep(0.2)
+    assert len(submitted) < 3 and sidecars.pending >= 1  # blocked by the full queue
+    recorder.release.set()
+    thread.join(5)
+    assert sidecars.flush(timeout=5) and sidecars.pending == 0
+    assert [stage['stage'] for stage in load_sidecar(metapath, stages='all')['stages']] == [0, 1, 2]
+
+
+def test_sidecar_queue_reports_errors(tmp_path):
+    sidecars = SidecarQueue()
+    recorder = MetaData()
+    with patch.object(recorder, 'save_sidecar', side_effect=IOError('disk full')):
+        sidecars.submit(recorder, str(tmp_path / 'data.csv.meta.json'), data={})
+        assert sidecars.flush(timeout=5)
+    assert [str(err) for _, err in sidecars.errors] == ['disk full']
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork()')
+def test_forked_child_has_its_own_queue_and_exit_flush_is_bounded():
+    import subprocess
+    import sys
+
+    script = (
+        "import os, sys, threading\n"
+        "from metapandas import config\n"
+        "from metapandas.background import flush_sidecars, sidecar_queue\n"
+        "class Recorder:\n"
+        "    def __init__(self):\n"
+        "        self.saved, self.release = [], threading.Event()\n"
+        "    def save_sidecar(self, filepath, **kwargs):\n"
+        "        if filepath == 'blocked':\n"
+        "            self.release.wait(600)\n"
+        "        self.saved.append(filepath)\n"
+        "config.SIDECAR_EXIT_TIMEOUT = 0.5\n"
+        "recorder = Recorder()\n"
+        "sidecar_queue().submit(recorder, 'blocked')\n"
+        "pid = os.fork()\n"
+        "if pid == 0:\n"
+        "    sidecar_queue().submit(recorder, 'child')\n"
+        "    assert flush_sidecars(timeout=5) and recorder.saved == ['child']\n"
+        "    sys.exit(0)  # n.b. runs the exit flush of the parent's queue too\n"
+        "assert os.waitpid(pid, 0)[1] == 0\n"
+        "assert sidecar_queue().pending == 1 and not recorder.saved\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+    start = time.monotonic()
+    subprocess.run([sys.executable, '-c', script], env=env, check=True, timeout=60)
+    assert time.monotonic() - start < 30
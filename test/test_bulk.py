@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from metapandas.bulk import merge_metadata, read_many
+from metapandas.metadataframe import MetaDataFrame
+
+
+@pytest.fixture
+def csv_files(tmp_path):
+    paths = []
+    for index in range(6):
+        path = str(tmp_path / 'part-{}.csv'.format(index))
+        mdf = MetaDataFrame(pd.DataFrame({'part': [index] * (index + 1)}))
+        mdf.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_read_many_preserves_order(csv_files, executor):
+    frames = read_many(csv_files, reader='csv', executor=executor, max_workers=3)
+    assert all(isinstance(frame, MetaDataFrame) for frame in frames)
+    assert [frame['part'].iloc[0] for frame in frames] == list(range(6))
+    assert [frame.metadata['data_filepath'] for frame in frames] == csv_files
+    assert [timing['path'] for timing in frames.timings] == csv_files
+    assert [timing['rows'] for timing in frames.timings] == [index + 1 for index in range(6)]
+
+
+def test_read_many_concatenates_with_merged_metadata(csv_files):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        mdf = read_many(csv_files, reader='read_csv', executor=executor, concat=True)
+        assert executor.submit(len, csv_files).result() == 6  # not shut down
+
+    assert isinstance(mdf, MetaDataFrame) and len(mdf) == 21
+    assert [source['data_filepath'] for source in mdf.metadata['sources']] == csv_files
+    assert 'data_filepath' not in mdf.metadata and 'storage' in mdf.metadata['sources'][0]
+    assert len(mdf.metadata['read_many']['timings']) == 6
+
+
+def test_read_many_rejects_unknown_reader_or_executor(csv_files):
+    with pytest.raises(ValueError):
+        read_many(csv_files, reader='xml')
+    with pytest.raises(ValueError):
+        read_many(csv_files, reader='csv', executor='fibers')
+
+
+def test_merge_metadata():
+    assert merge_metadata([]) == {}
+    merged = merge_metadata([{'a': 1, 'b': [1]}, {'a': 1, 'b': [2], 'c': 3}])
+    assert merged == {'a': 1, 'sources': [{'b': [1]}, {'b': [2], 'c': 3}]}
@@ -0,0 +1,63 @@
+import time
+
+from metapandas.cache import DiskCache, EnvironmentCache, get_boot_id, path_mtime
+
+
+def test_path_mtime(tmp_path):
+    assert path_mtime(None) is None
+    assert path_mtime(tmp_path / 'missing') is None
+    assert isinstance(path_mtime(tmp_path), int)
+
+
+def test_get_boot_id():
+    assert isinstance(get_boot_id(), str)
+
+
+def test_disk_cache_roundtrip(tmp_path):
+    cache = DiskCache(tmp_path / 'cache')
+    assert cache.load('cpu') is DiskCache.MISSING
+    cache.store('cpu', {'brand': 'test'}, fingerprint=1)
+    assert cache.load('cpu', fingerprint=1) == {'brand': 'test'}
+    assert cache.load('cpu', fingerprint=2) is DiskCache.MISSING
+    assert cache.load('cpu', fingerprint=1, ttl=0) is DiskCache.MISSING
+    assert cache.load('cpu', fingerprint=1, not_before=time.time() + 1) is DiskCache.MISSING
+    # no temporary files are left behind by atomic writes
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+
+
+def test_disk_cache_ignores_corrupt_files(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.store('cpu', 'value')
+    cache._filepath('cpu', None).write_text('{corrupt')
+    assert cache.load('cpu') is DiskCache.MISSING
+
+
+def test_environment_cache_shares_persisted_entries(tmp_path):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return ['pkg', len(calls)]
+
+    first = EnvironmentCache(ttl=60, disk_cache=DiskCache(tmp_path))
+    second = EnvironmentCache(ttl=60, disk_cache=DiskCache(tmp_path))
+    assert first.get('apt', factory, fingerprint=1, persist=True) == ['pkg', 1]
+    assert second.get('apt', factory, fingerprint=1, persist=True) == ['pkg', 1]
+    assert len(calls) == 1
+
+    # explicit invalidation forces a recomputation rather than reloading from disk
+    time.sleep(0.01)
+    second.invalidate('apt')
+    assert second.get('apt', factory, fingerprint=1, persist=True) == ['pkg', 2]
+    assert len(calls) == 2
+
+
+def test_default_disk_cache_follows_config(tmp_path):
+    from unittest.mock import patch
+    from metapandas import config
+    from metapandas.cache import default_disk_cache
+
+    with patch.object(config, 'DISK_CACHE', 0):
+        assert default_disk_cache() is None
+    with patch.object(config, 'DISK_CACHE', 1), patch.object(config, 'DISK_CACHE_DIR', str(tmp_path)):
+        assert default_disk_cache().directory == tmp_path
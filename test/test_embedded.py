@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+import pytest
+
+from unittest.mock import patch
+
+from metapandas import config
+from metapandas.metadata import MetaData
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.hooks.pandas import pandas_read_with_metadata
+from metapandas.embedded import can_embed, get_embed_format, load_embedded, save_embedded
+
+FORMATS = [
+    # (format, extension, module, writer kwargs, reader)
+    ('parquet', '.parquet', 'pyarrow', {}, pd.read_parquet),
+    ('feather', '.feather', 'pyarrow', {}, pd.read_feather),
+    ('hdf', '.h5', 'tables', {'key': 'df', 'format': 'table'}, pd.read_hdf),
+]
+
+
+def test_get_embed_format():
+    assert get_embed_format('data.parquet') == 'parquet'
+    assert get_embed_format('data.H5') == 'hdf'
+    assert get_embed_format('data.csv') is None
+
+
+def test_can_embed():
+    pytest.importorskip('pyarrow')
+    assert can_embed('parquet', 'data.parquet', {})
+    assert not can_embed('parquet', 'data', {'partition_cols': ['a']})
+    assert not can_embed('parquet', 'data.parquet', {'engine': 'fastparquet'})
+    assert not can_embed('feather', object(), {})
+    assert not can_embed('csv', 'data.csv', {})
+
+
+@pytest.mark.parametrize('embed_format, extension, module, kwargs, reader', FORMATS)
+def test_embedded_roundtrip(tmp_path, embed_format, extension, module, kwargs, reader):
+    pytest.importorskip(module)
+    datapath = str(tmp_path / ('data' + extension))
+    mdf = MetaDataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+    with patch.object(config, 'EMBED_METADATA', 1):
+        getattr(mdf, 'to_' + embed_format)(datapath, **kwargs)
+    assert os.listdir(str(tmp_path)) == ['data' + extension]  # no sidecar written
+
+    embedded = load_embedded(datapath)
+    assert embedded['storage']['data_filepath'] == datapath
+    assert 'python-packages' in embedded
+
+    read = pandas_read_with_metadata(reader, argname='path' if embed_format != 'hdf' else 'path_or_buf',
+                                     embed=embed_format)
+    result = read(datapath)
+    pd.testing.assert_frame_equal(pd.DataFrame(result), pd.DataFrame(mdf))
+    assert result.metadata['metadata_filepath'] == datapath
+    assert callable(result.metadata['storage']['method'])
+
+
+def test_embedded_hdf_with_reader_arguments(tmp_path):
+    pytest.importorskip('tables')
+    datapath = str(tmp_path / 'data.h5')
+    with patch.object(config, 'EMBED_METADATA', 1):
+        MetaDataFrame({'a': [1, 2, 3]}).to_hdf(datapath, key='df', format='table')
+    read = pandas_read_with_metadata(pd.read_hdf, argname='path_or_buf', embed='hdf')
+    result = read(datapath, 'df', where='index > 0')
+    assert len(result) == 2
+    assert 'storage' in result.metadata
+
+
+def test_sidecar_used_unless_embedding(tmp_path):
+    pytest.importorskip('pyarrow')
+    datapath = str(tmp_path / 'data.parquet')
+    MetaDataFrame({'a': [1]}).to_parquet(datapath)
+    assert os.path.exists(datapath + '.meta.json')
+    assert load_embedded(datapath) is None
+    read = pandas_read_with_metadata(pd.read_parquet, embed='parquet')
+    assert read(datapath).metadata['metadata_filepath'] == datapath + '.meta.json'
+
+
+def test_save_embedded(tmp_path):
+    pytest.importorskip('pyarrow')
+    datapath = tmp_path / 'data.feather'
+    save_embedded(
+        MetaData(), 'feather', pd.DataFrame.to_feather, pd.DataFrame({'a': [1]}), filepath=datapath, data={'stage': 1}
+    )
+    assert load_embedded(datapath) == {'stage': 1}
+
+
+def test_oversized_hdf_metadata_falls_back_to_sidecar(tmp_path):
+    pytest.importorskip('tables')
+    datapath = str(tmp_path / 'data.h5')
+    with patch.object(config, 'EMBED_METADATA', 1):
+        mdf = MetaDataFrame({'a': [1]})
+        mdf.metadata['noise'] = os.urandom(65536).hex()
+        mdf.to_hdf(datapath, key='df')
+    assert load_embedded(datapath) is None
+    assert os.path.exists(datapath + '.meta.json')
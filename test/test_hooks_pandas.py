@@ -1,3 +1,4 @@
+from metapandas.metadata import MetaData
 from metapandas.hooks.pandas import (
     pandas_read_with_metadata,
     pandas_save_with_metadata,
@@ -23,3 +24,126 @@ def test_pandas_save_with_metadata():
 def test_pandas_read_with_metadata():
     func = pandas_read_with_metadata(lambda **kw: None)
     func()
+
+
+def test_install_metadata_hooks_with_prefetch():
+    MetaData.invalidate_environment_cache()
+    PandasMetaDataHooks.install_metadata_hooks(prefetch=True)
+    MetaData._prefetch_thread.join(timeout=60)
+    assert 'system' in MetaData.environment_cache
+    PandasMetaDataHooks.uninstall_metadata_hooks()
+
+
+def test_pandas_read_with_lazy_metadata(tmp_path):
+    import pandas as pd
+    from unittest.mock import patch
+    from metapandas import config
+    from metapandas.metadataframe import LazyMetadata, MetaDataFrame
+
+    csv = str(tmp_path / 'data.csv')
+    MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(csv, index=False)
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')
+
+    LazyMetadata.reset_stats()
+    with patch('metapandas.hooks.pandas.load_sidecar', wraps=lambda *a, **kw: {'stage': 1}) as load_sidecar:
+        untouched = read_csv(csv)
+        mdf = read_csv(csv)
+        head = mdf.head(1)
+        assert not load_sidecar.called
+        assert head.metadata['stage'] == 1  # derived frames share the deferred metadata
+        assert mdf.metadata['metadata_filepath'] == csv + '.meta.json'
+        assert load_sidecar.call_count == 1
+    assert LazyMetadata.stats() == {'deferred': 2, 'loaded': 1, 'avoided': 1}
+    assert 'storage' in untouched.metadata
+
+    with patch.object(config, 'LAZY_METADATA', 0):
+        mdf = read_csv(csv)
+    assert mdf._lazy_metadata.is_loaded
+    assert 'storage' in mdf.metadata
+
+
+def test_pickle_lazily_read_metadata(tmp_path):
+    import pickle
+    import pandas as pd
+    from metapandas.metadataframe import MetaDataFrame
+
+    csv = str(tmp_path / 'data.csv')
+    MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(csv, index=False)
+    mdf = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')(csv)
+    restored = pickle.loads(pickle.dumps(mdf))
+    assert restored.metadata['metadata_filepath'] == csv + '.meta.json'
+    assert 'storage' in restored.metadata
+
+
+def test_concurrent_saves_are_isolated(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from metapandas.context import metadata_context
+    from metapandas.metadataframe import MetaDataFrame
+    from metapandas.sidecar import load_sidecar
+
+    mdf = MetaDataFrame({'a': range(100)}, metadata={'source': 'shared'})
+    before = dict(mdf.metadata)
+    shared = MetaData()
+    to_csv = pandas_save_with_metadata(MetaDataFrame.to_csv, argname='path_or_buf', metadata=shared)
+
+    def write(i):
+        paths = []
+        with metadata_context() as metadata:
+            for j in range(4):
+                metadata.register_action(on='thread-{}'.format(i), action='write', description=str(j))
+                shared.register_action(on='shared', action='write', description='{}-{}'.format(i, j))
+                path = str(tmp_path / 'data-{}-{}.csv'.format(i, j))
+                if j % 2:
+                    mdf.to_csv(path, index=False)  # records to the thread's MetaData
+                else:
+                    to_csv(mdf, path, index=False)  # records to the shared MetaData
+                paths.append((i, path, j % 2 == 1))
+        return paths
+
+    with ThreadPoolExecutor(32) as executor:
+        results = [path for paths in executor.map(write, range(32)) for path in paths]
+
+    assert len(results) == 128
+    for i, path, contextual in results:
+        sidecar = load_sidecar(path + '.meta.json', stages='latest')
+        assert sidecar['storage']['data_filepath'] == path
+        assert sidecar['source'] == 'shared'
+        actions = sidecar.get('processing-actions', {})
+        if contextual:  # only the actions of the writing thread's own MetaData
+            assert list(actions) == ['thread-{}'.format(i)]
+        else:
+            assert list(actions) == ['shared']
+    assert dict(mdf.metadata) == before
+    assert shared.action_log.registered == len(shared.action_log) == 128
+    assert len(shared.actions['shared']) > 0
+
+
+def test_chunked_read_shares_metadata(tmp_path):
+    import pandas as pd
+    from unittest.mock import patch
+    from metapandas.metadataframe import MetaDataFrame
+    from metapandas.hooks.pandas import MetaDataFrameReader
+
+    csv = str(tmp_path / 'data.csv')
+    MetaDataFrame({'a': range(1000)}).to_csv(csv, index=False)
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')
+
+    with patch('metapandas.hooks.pandas.load_sidecar', wraps=lambda *a, **kw: {'stage': 1}) as load_sidecar:
+        with read_csv(csv, chunksize=100) as reader:
+            assert isinstance(reader, MetaDataFrameReader)
+            chunks = list(reader)
+        assert len(chunks) == 10 and sum(map(len, chunks)) == 1000
+        assert all(isinstance(chunk, MetaDataFrame) for chunk in chunks)
+        assert not load_sidecar.called
+        assert all(chunk.metadata['stage'] == 1 for chunk in chunks)
+        assert chunks[0].metadata['metadata_filepath'] == csv + '.meta.json'
+        assert load_sidecar.call_count == 1  # loaded once for all chunks
+
+    chunks[0].metadata['chunk'] = 0
+    assert 'chunk' not in chunks[1].metadata
+
+    reader = read_csv(csv, iterator=True)
+    chunk = reader.get_chunk(5)
+    assert isinstance(chunk, MetaDataFrame) and len(chunk) == 5
+    assert chunk.metadata['data_filepath'] == csv
+    reader.close()
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from metapandas import config
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.lineage import TRUNCATED, get_lineage, lineage_graph, start_lineage
+
+
+@pytest.fixture
+def lineage(monkeypatch):
+    monkeypatch.setattr(config, 'LINEAGE', 1)
+    monkeypatch.setattr(config, 'LINEAGE_SAMPLE_RATE', 1.0)
+
+
+def test_lineage_disabled_by_default():
+    mdf = MetaDataFrame({'a': [1, 2]})
+    assert mdf.head(1).lineage is None
+
+
+def test_lineage_records_operations(lineage):
+    mdf = MetaDataFrame({'a': [1, 2, 3], 'b': list('xxy')})
+    filtered = mdf[mdf['a'] > 1].copy()
+    merged = mdf.merge(filtered, on='a')
+    graph = merged.lineage
+    assert graph['ops'][0] == 'MetaDataFrame' and graph['ops'][-1] == 'merge'
+    # the merge node is last, with both the source and the filtered frame as parents
+    op, parents = graph['nodes'][-1]
+    assert graph['ops'][op] == 'merge' and len(parents) == 2 and parents[0] == 0
+    assert graph['ops'][graph['nodes'][parents[1]][0]] == 'copy'
+    # nodes are shared by derived frames
+    node = get_lineage(merged)[1][1]
+    while node is not get_lineage(filtered) and node[1]:
+        node = node[1][0]
+    assert node is get_lineage(filtered)
+    assert mdf.lineage == {'ops': ['MetaDataFrame'], 'nodes': [[0, []]]}
+
+
+def test_lineage_is_bounded_and_sampled(lineage, monkeypatch):
+    monkeypatch.setattr(config, 'LINEAGE_MAX_DEPTH', 3)
+    mdf = MetaDataFrame({'a': [1, 2]})
+    for _ in range(10):
+        mdf = mdf.copy()
+    node = get_lineage(mdf)
+    assert node[2] <= 3
+    while node[1]:
+        node = node[1][0]
+    assert node is TRUNCATED
+
+    monkeypatch.setattr(config, 'LINEAGE_SAMPLE_RATE', 0.0)
+    derived = mdf.copy()
+    assert get_lineage(derived) is get_lineage(mdf)
+
+
+def test_lineage_saved_in_sidecar(lineage, tmp_path):
+    from metapandas.sidecar import load_sidecar
+    from metapandas.hooks.pandas import pandas_read_with_metadata, pandas_save_with_metadata
+
+    csv = str(tmp_path / 'data.csv')
+    pd.DataFrame({'a': [1, 2]}).to_csv(csv, index=False)
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')
+    to_csv = pandas_save_with_metadata(MetaDataFrame.to_csv, argname='path_or_buf')
+
+    out = str(tmp_path / 'out.csv')
+    to_csv(read_csv(csv).copy(), out)
+    graph = load_sidecar(out + '.meta.json', stages='latest')['lineage']
+    assert graph == {'ops': ['read_csv', 'copy'], 'nodes': [[0, []], [1, [0]]]}
+
+
+def test_lineage_graph_shares_nodes():
+    source = start_lineage(MetaDataFrame({'a': [1]}), 'read_csv')
+    node = get_lineage(source)
+    assert lineage_graph(('concat', (node, node), 1)) == {
+        'ops': ['read_csv', 'concat'], 'nodes': [[0, []], [1, [0, 0]]]
+    }
+    assert lineage_graph(None) is None
@@ -1,13 +1,20 @@
 import unittest
+import time
 import logging
 import json
+import os
 import platform
 
 import pandas as pd
 
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-from metapandas.metadata import MetaData
+from unittest.mock import patch
+
+from metapandas import config
+from metapandas.metadata import MetaData, EnvironmentCache
+from metapandas.sidecar import read_stages
 
 
 def test_init():
@@ -202,3 +209,193 @@ def test_merge_metadata_dictionaries():
     assert len(d12) > len(d1)
     assert d12['borg']['1of3'] == [1, 2, 3]
     assert d12['sci-fi'] == 'star | trek'
+
+
+def test_environment_cache_fingerprint_and_invalidate():
+    cache = EnvironmentCache(ttl=None)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get('x', factory, fingerprint=1) == 1
+    assert cache.get('x', factory, fingerprint=1) == 1
+    assert cache.get('x', factory, fingerprint=2) == 2
+    cache.invalidate('x')
+    assert 'x' not in cache
+    assert cache.get('x', factory, fingerprint=2) == 3
+
+
+def test_environment_cache_ttl():
+    assert EnvironmentCache(ttl=0).get('x', object) is not EnvironmentCache(ttl=0).get('x', object)
+    cache = EnvironmentCache(ttl=0.01)
+    first = cache.get('x', object)
+    assert cache.get('x', object) is first
+    time.sleep(0.02)
+    assert cache.get('x', object) is not first
+
+
+def test_get_metadata_uses_environment_cache():
+    MetaData.invalidate_environment_cache()
+    with patch.object(MetaData, 'get_system_metadata', return_value={'os': 'test'}) as mock_system:
+        md = MetaData()
+        first = md.get_metadata()
+        second = md.get_metadata()
+    assert mock_system.call_count == 1
+    assert first['os'] == second['os'] == 'test'
+    assert 'created-timestamp' in second
+    MetaData.invalidate_environment_cache()
+
+
+DPKG_STATUS = """Package: adduser
+Status: install ok installed
+Architecture: all
+Version: 3.118
+Description: add and remove users and groups
+ This package includes the 'adduser' and 'deluser' commands.
+
+Package: libc6
+Status: install ok installed
+Architecture: amd64
+Multi-Arch: same
+Version: 2.31-13
+
+Package: removed-pkg
+Status: deinstall ok config-files
+Architecture: amd64
+Version: 1.0
+"""
+
+
+def test_iter_dpkg_status(tmp_path):
+    status = tmp_path / 'status'
+    status.write_text(DPKG_STATUS)
+    packages = list(MetaData.iter_dpkg_status(status))
+    assert packages == [('adduser', '3.118', 'all'), ('libc6:amd64', '2.31-13', 'amd64')]
+
+
+def test_get_apt_packages(tmp_path):
+    status = tmp_path / 'status'
+    status.write_text(DPKG_STATUS)
+    assert MetaData.get_apt_packages(status) == {'adduser': '3.118', 'libc6:amd64': '2.31-13'}
+
+
+def test_get_apt_packages_falls_back_to_dpkg():
+    fallback = pd.DataFrame([['pkg', '1.0', 'all']], columns=['name', 'version', 'architecture'])
+    with patch.object(MetaData, 'list_apt_packages', return_value=fallback):
+        assert MetaData.get_apt_packages('/no/such/dpkg/status') == {'pkg': '1.0'}
+
+
+def _make_conda_meta(tmp_path):
+    conda_meta = tmp_path / 'conda-meta'
+    conda_meta.mkdir()
+    (conda_meta / 'numpy-1.19.2-py38h54aff64_0.json').write_text(json.dumps({
+        'name': 'numpy', 'version': '1.19.2', 'build': 'py38h54aff64_0', 'subdir': 'linux-64',
+        'channel': 'https://repo.anaconda.com/pkgs/main/linux-64'}))
+    (conda_meta / 'pandas-1.1.3-py38he6710b0_0.json').write_text(json.dumps({
+        'name': 'pandas', 'version': '1.1.3', 'build': 'py38he6710b0_0', 'subdir': 'linux-64',
+        'channel': 'https://conda.anaconda.org/conda-forge/linux-64'}))
+    (conda_meta / 'python-dateutil-2.8.1-py_0.json').write_text('{not valid json')
+    (conda_meta / 'history').write_text('')
+    return conda_meta
+
+
+def test_list_conda_packages_from_conda_meta(tmp_path):
+    _make_conda_meta(tmp_path)
+    df = MetaData.list_conda_packages(prefix=tmp_path)
+    assert df.columns.to_list() == ['name', 'version', 'build', 'channel']
+    assert df.values.tolist() == [
+        ['numpy', '1.19.2', 'py38h54aff64_0', ''],
+        ['pandas', '1.1.3', 'py38he6710b0_0', 'conda-forge'],
+        ['python-dateutil', '2.8.1', 'py_0', ''],
+    ]
+
+
+def test_read_conda_meta_is_cached_by_mtime(tmp_path):
+    conda_meta = _make_conda_meta(tmp_path)
+    with patch.object(MetaData, '_read_conda_meta_record', wraps=MetaData._read_conda_meta_record) as mock_read:
+        MetaData.read_conda_meta(conda_meta)
+        MetaData.read_conda_meta(conda_meta)
+        assert mock_read.call_count == 3
+        (conda_meta / 'six-1.15.0-py_0.json').write_text(json.dumps({'name': 'six', 'version': '1.15.0'}))
+        os.utime(str(conda_meta), ns=(0, 0))
+        assert 'six' in MetaData.get_conda_packages(tmp_path)
+        assert mock_read.call_count == 7
+
+
+def test_collect_metadata_runs_collectors_concurrently_with_timeouts():
+    def slow(md, delay=0.3):
+        time.sleep(delay)
+        return {'slow': True}
+
+    def hung(md):
+        time.sleep(2)
+        return {'hung': True}
+
+    def broken(md):
+        raise RuntimeError('broken')
+
+    collectors = MetaData.METADATA_COLLECTORS
+    try:
+        MetaData.METADATA_COLLECTORS = {}
+        MetaData.register_collector('slow1', slow)
+        MetaData.register_collector('slow2', slow)
+        MetaData.register_collector('hung', hung, timeout=0.5)
+        MetaData.register_collector('broken', broken)
+        start = time.monotonic()
+        metadata = MetaData().collect_metadata()
+        assert time.monotonic() - start < 1.0
+        assert metadata == {'slow': True}
+    finally:
+        MetaData.METADATA_COLLECTORS = collectors
+
+
+def test_hung_collector_does_not_block_exit():
+    import subprocess
+    import sys
+
+    script = (
+        "import time\n"
+        "from metapandas.metadata import MetaData\n"
+        "MetaData.METADATA_COLLECTORS = {}\n"
+        "MetaData.register_collector('hung', lambda md: time.sleep(600), timeout=0.1)\n"
+        "MetaData.register_collector('quick', lambda md: {'quick': True})\n"
+        "assert MetaData().collect_metadata() == {'quick': True}\n"
+        "assert MetaData().collect_metadata() == {'quick': True}\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+    start = time.monotonic()
+    subprocess.run([sys.executable, '-c', script], env=env, check=True, timeout=60)
+    assert time.monotonic() - start < 30
+
+
+def test_collect_metadata_sequential_and_flags():
+    collectors = MetaData.METADATA_COLLECTORS
+    try:
+        MetaData.METADATA_COLLECTORS = {}
+        MetaData.register_collector('a', lambda md: {'a': 1})
+        MetaData.register_collector('b', lambda md: {'b': 2}, flag='INCLUDE_PYTHON_PACKAGE')
+        with patch.object(config, 'COLLECTOR_THREADS', 0), \
+                patch.object(config, 'INCLUDE_PYTHON_PACKAGE', 0):
+            assert MetaData().collect_metadata() == {'a': 1}
+        MetaData.unregister_collector('b')
+        assert list(MetaData.METADATA_COLLECTORS) == ['a']
+    finally:
+        MetaData.METADATA_COLLECTORS = collectors
+
+
+def _save_stages(filepath, writer, saves=5):
+    md = MetaData()
+    for i in range(saves):
+        md.save_sidecar(filepath=filepath, data={'writer': writer, 'save': i})
+
+
+def test_save_sidecar_concurrent_writers_lose_no_stages(tmp_path):
+    for extension in ('json', 'jsonl'):
+        filepath = str(tmp_path / ('metadata.' + extension))
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(_save_stages, [filepath] * 4, range(4)))
+        stages = read_stages(filepath)
+        assert len(stages) == 20
+        assert sorted((s['writer'], s['save']) for s in stages) == [(w, i) for w in range(4) for i in range(5)]
@@ -12,8 +12,10 @@ def test_MetaDataFrame_init():
     assert isinstance(mdf.metadata, dict)
     assert 'constructor' in mdf.metadata.keys()
     assert set(['args', 'class', 'kwargs']) == set(mdf.metadata['constructor'].keys())
-    assert mdf.metadata['constructor']['args'] == ([[1, 2, 3]], )
-    assert mdf.metadata['constructor']['kwargs'] == {'columns': ['a', 'b', 'c']}
+    assert mdf.metadata['constructor']['args'] == ({'type': 'list', 'len': 1, 'repr': '[[1, 2, 3]]'}, )
+    assert mdf.metadata['constructor']['kwargs'] == {
+        'columns': {'type': 'list', 'len': 3, 'repr': "['a', 'b', 'c']"}
+    }
     assert mdf.metadata['constructor']['class'] == MetaDataFrame
 
 
@@ -26,7 +28,9 @@ def test_MetaDataFrame_init_from_DataFrame():
     assert isinstance(mdf.metadata, dict)
     assert 'constructor' in mdf.metadata.keys()
     assert set(['args', 'class', 'kwargs']) == set(mdf.metadata['constructor'].keys())
-    assert mdf.metadata['constructor']['args'] == (df, )
+    assert mdf.metadata['constructor']['args'] == (
+        {'type': 'pandas.DataFrame', 'shape': [1, 3], 'columns': "['a', 'b', 'c']"},
+    )
     assert mdf.metadata['constructor']['class'] == MetaDataFrame
 
 
@@ -40,8 +44,10 @@ def test_MetaDataFrame_init_with_metadata_dict_specified():
     assert mdf.metadata['extra']
     assert 'constructor' in mdf.metadata.keys()
     assert set(['args', 'class', 'kwargs']) == set(mdf.metadata['constructor'].keys())
-    assert mdf.metadata['constructor']['args'] == ([[1, 2, 3]], )
-    assert mdf.metadata['constructor']['kwargs'] == {'columns': ['a', 'b', 'c']}
+    assert mdf.metadata['constructor']['args'] == ({'type': 'list', 'len': 1, 'repr': '[[1, 2, 3]]'}, )
+    assert mdf.metadata['constructor']['kwargs'] == {
+        'columns': {'type': 'list', 'len': 3, 'repr': "['a', 'b', 'c']"}
+    }
     assert mdf.metadata['constructor']['class'] == MetaDataFrame
 
 
@@ -53,3 +59,154 @@ def test_MetaDataFrame_copy():
     assert isinstance(mdf, MetaDataFrame)
 
     # TODO: check merge includes metadata from mdf1 & 2?
+
+
+def test_LazyMetadata_loads_once():
+    from concurrent.futures import ThreadPoolExecutor
+    from metapandas.metadataframe import LazyMetadata
+
+    calls = []
+    lazy = LazyMetadata({'a': 1}, loader=lambda: calls.append(1) or {'b': 2})
+    mdf = MetaDataFrame([[1, 2, 3]], columns=list('abc'))
+    mdf.metadata = lazy
+    assert not lazy.is_loaded
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: mdf.metadata, range(32)))
+    assert all(result == {'a': 1, 'b': 2} for result in results)
+    assert calls == [1]
+    derived = mdf[['a']]
+    assert derived.metadata == lazy.data and derived.metadata is not lazy.data
+    assert calls == [1]
+
+
+def test_MetaDataFrame_derived_frames_share_metadata_until_modified():
+    import pickle
+    from metapandas.metadataframe import LazyMetadata
+
+    calls = []
+    mdf = MetaDataFrame({'a': [1, 2, 3]}, metadata={'tags': ['raw']})
+    mdf.metadata = LazyMetadata(mdf.metadata, loader=lambda: calls.append(1) or {'source': 'data.csv'})
+    derived = mdf[mdf['a'] > 1].assign(b=1).head(2)
+    sibling = mdf.tail(1)
+    # derivation is O(1): no copy (nor load) until first accessed
+    assert derived._lazy_metadata.data is mdf._lazy_metadata.data
+    assert not calls
+
+    derived.metadata['tags'] += ['derived']
+    derived.metadata['extra'] = True
+    assert calls == [1]
+    assert mdf.metadata['tags'] == ['raw'] and 'extra' not in mdf.metadata
+    assert derived.metadata['source'] == 'data.csv'
+
+    # modifying the parent detaches frames still sharing its metadata
+    mdf.metadata['tags'] += ['parent']
+    mdf.metadata.update({'parent': True})
+    assert sibling.metadata['tags'] == ['raw'] and 'parent' not in sibling.metadata
+    assert derived.metadata['tags'] == ['raw', 'derived']
+    assert calls == [1]
+
+    restored = pickle.loads(pickle.dumps(mdf.head(1)))
+    assert restored.metadata == mdf.metadata
+
+
+def test_MetadataDict_shares_immutable_values():
+    import copy
+    import json
+    import pickle
+    import pytest
+    from metapandas.metadataframe import FrozenDict, FrozenList, LazyMetadata, thaw
+
+    packages = [{'name': str(i), 'version': '1.0'} for i in range(100)]
+    lazy = LazyMetadata({'rows': 3, 'packages': packages, 'tags': ['raw']})
+    assert lazy.materialise()['packages'] == packages and isinstance(lazy.materialise()['packages'], FrozenList)
+    derived = lazy.derive()
+    # nested values are shared rather than copied, however they are read
+    assert derived.materialise()['packages'] is lazy.materialise()['packages']
+    assert dict(derived.materialise())['tags'] is lazy.materialise()['tags']
+
+    with pytest.raises(TypeError):
+        derived.materialise()['tags'].append('derived')
+    with pytest.raises(TypeError):
+        derived.materialise()['packages'][0]['version'] = '2.0'
+    derived.materialise()['packages'] = [dict(p, version='2.0') for p in derived.materialise()['packages']]
+    assert lazy.materialise()['packages'][0]['version'] == '1.0'
+
+    frozen = lazy.materialise()['packages']
+    assert copy.deepcopy(frozen) == frozen and pickle.loads(pickle.dumps(frozen)) == frozen
+    assert isinstance(pickle.loads(pickle.dumps(frozen))[0], FrozenDict)
+    assert json.loads(json.dumps(lazy.materialise())) == thaw(lazy.materialise())
+    assert type(thaw(lazy.materialise())['packages'][0]) is dict
+
+
+def test_MetaDataFrame_mutation_never_leaks_between_frames():
+    import pytest
+
+    # a value held before deriving cannot be modified in place for either frame
+    mdf = MetaDataFrame({'a': [1, 2]}, metadata={'tags': ['raw']})
+    tags = mdf.metadata['tags']
+    head = mdf.head(1)
+    with pytest.raises(TypeError):
+        tags.append('later')
+    assert head.metadata['tags'] == ['raw'] and mdf.metadata['tags'] == ['raw']
+
+    # deriving does not swap the values of the parent, so a reference held stays current
+    mdf = MetaDataFrame({'a': [1, 2]}, metadata={'tags': ['raw']})
+    tags = mdf.metadata['tags']
+    repr(mdf.head())
+    assert mdf.metadata['tags'] is tags
+    mdf.metadata['tags'] = tags + ['cleaned']
+    assert mdf.metadata['tags'] == ['raw', 'cleaned'] and tags == ['raw']
+    assert mdf.head(1).metadata['tags'] == ['raw', 'cleaned']
+
+
+def test_MetaDataFrame_from_frame_is_zero_copy():
+    import numpy as np
+
+    class SubFrame(pd.DataFrame):
+        @property
+        def _constructor(self):
+            return SubFrame
+
+    df = pd.DataFrame({'a': np.arange(3.0), 'b': np.arange(3)})
+    values = df['a'].to_numpy()
+    mdf = MetaDataFrame.from_frame(df, metadata={'extra': True})
+    assert mdf is df
+    assert isinstance(mdf, MetaDataFrame)
+    assert mdf.metadata['extra'] and mdf.metadata['constructor']['class'] == MetaDataFrame
+    assert np.shares_memory(mdf['a'].to_numpy(), values)
+
+    sub = SubFrame({'a': np.arange(3.0)})
+    mdf = MetaDataFrame.from_frame(sub)
+    assert type(mdf) is MetaDataFrame
+    assert np.shares_memory(mdf['a'].to_numpy(), sub['a'].to_numpy())
+
+    mdf = MetaDataFrame.from_frame(pd.Series([1, 2], name='a'))
+    assert mdf.columns.to_list() == ['a']
+
+
+def test_MetaDataFrame_does_not_pin_constructor_arguments():
+    import gc
+    import weakref
+    import tracemalloc
+    import numpy as np
+
+    df = pd.DataFrame({'a': np.arange(10)})
+    ref = weakref.ref(df)
+    mdf = MetaDataFrame(df)
+    derived = mdf[mdf['a'] > 5]
+    del df
+    gc.collect()
+    assert ref() is None
+
+    tracemalloc.start()
+    try:
+        data = [list(range(1000)) for _ in range(1000)]  # ~40MB of python objects
+        mdf = MetaDataFrame(data)  # ~8MB as an int64 array
+        del data
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert current < 20 * 2 ** 20
+    assert mdf.metadata['constructor']['args'][0]['len'] == 1000
+    assert len(derived) == 4
@@ -0,0 +1,59 @@
+import json
+
+import pandas as pd
+import pytest
+
+from unittest.mock import patch
+
+from metapandas import config
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.hooks.pandas import pandas_read_with_metadata
+from metapandas.serializers import (
+    JsonPickleSerializer,
+    JsonSerializer,
+    SERIALIZERS,
+    get_serializer,
+)
+
+DATA = {'rows': 3, 'packages': {'pandas': '1.1.3'}, 'stages': [{'a': [1, 2]}], 'method': pd.DataFrame.to_csv}
+
+AVAILABLE = [name for name, (_, available) in SERIALIZERS.items() if available()]
+
+
+@pytest.mark.parametrize('name', AVAILABLE)
+def test_roundtrip(name):
+    serializer = get_serializer(name)
+    decoded = serializer.loads(serializer.dumps(DATA))
+    assert decoded == DATA
+    assert decoded['method'] is pd.DataFrame.to_csv
+
+
+@pytest.mark.parametrize('name', AVAILABLE)
+def test_compact_by_default(name):
+    serializer = get_serializer(name)
+    assert '\n' not in serializer.dumps(DATA)
+    assert '\n' in serializer.dumps(DATA, indent=2)
+
+
+def test_native_output_is_readable_by_jsonpickle():
+    encoded = JsonSerializer().dumps(DATA)
+    assert JsonPickleSerializer().loads(encoded) == DATA
+    assert json.loads(encoded)['method'] == {'py/function': 'pandas.core.generic.NDFrame.to_csv'}
+
+
+def test_falls_back_to_jsonpickle_for_non_string_keys():
+    data = {(1, 2): 'tuple-key'}
+    assert get_serializer('json').dumps(data) == JsonPickleSerializer().dumps(data)
+
+
+def test_get_serializer_defaults():
+    with patch.object(config, 'SERIALIZER', 'auto'):
+        assert get_serializer().name in ('orjson', 'ujson', 'json')
+    assert get_serializer('no-such-serializer').name in ('orjson', 'ujson', 'json')
+
+
+def test_hooks_restore_objects(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(csv, index=False)
+    mdf = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')(csv)
+    assert callable(mdf.metadata['storage']['method'])
@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+import pandas as pd
+
+from unittest.mock import patch
+
+from metapandas import config
+from metapandas.metadata import MetaData
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.hooks.pandas import pandas_read_with_metadata
+from metapandas.sidecar import (
+    _read_last_line,
+    find_sidecar,
+    get_sidecar_format,
+    load_sidecar,
+    read_stages,
+    sidecar_path,
+)
+
+
+def test_sidecar_path():
+    assert sidecar_path('data.csv', 'json') == 'data.csv.meta.json'
+    assert sidecar_path('data.csv', 'jsonl') == 'data.csv.meta.jsonl'
+    assert get_sidecar_format('data.csv.meta.jsonl') == 'jsonl'
+    assert get_sidecar_format('metadata.json') == 'json'
+    assert get_sidecar_format('data.csv.meta.msgpack') == 'msgpack'
+
+
+def test_find_sidecar(tmp_path):
+    datapath = str(tmp_path / 'data.csv')
+    assert find_sidecar(datapath) == sidecar_path(datapath)
+    (tmp_path / 'data.csv.meta.jsonl').write_text('{}\n')
+    assert find_sidecar(datapath) == sidecar_path(datapath, 'jsonl')
+
+
+def test_save_as_jsonl_appends_stages(tmp_path):
+    filepath = tmp_path / 'metadata.jsonl'
+    md = MetaData()
+    for i in range(3):
+        md.save_sidecar(filepath=filepath, data={'stage': i})
+    assert len(filepath.read_text().splitlines()) == 3
+    assert [s['stage'] for s in read_stages(filepath)] == [0, 1, 2]
+    assert read_stages(filepath, latest=True) == [{'stage': 2}]
+    assert load_sidecar(filepath, stages='latest') == {'stage': 2}
+    assert load_sidecar(filepath, stages='all') == {'stages': [{'stage': 0}, {'stage': 1}, {'stage': 2}]}
+
+    md.save_as_jsonl(filepath=filepath, data={'stage': 3}, exists_action='overwrite')
+    assert read_stages(filepath) == [{'stage': 3}]
+
+
+def test_read_last_line_spanning_blocks(tmp_path):
+    filepath = tmp_path / 'metadata.jsonl'
+    filepath.write_text('{"a": 1}\n' + json.dumps({'b': 'x' * 100}) + '\n\n')
+    with open(str(filepath), 'rb') as f:
+        assert json.loads(_read_last_line(f, block_size=7)) == {'b': 'x' * 100}
+
+
+def test_save_as_json_merges_stages(tmp_path):
+    filepath = tmp_path / 'metadata.json'
+    md = MetaData()
+    for i in range(3):
+        md.save_as_json(filepath=filepath, data={'stage': i})
+    assert [s['stage'] for s in read_stages(filepath)] == [0, 1, 2]
+    assert read_stages(filepath, latest=True) == [{'stage': 2}]
+
+
+def test_hooks_with_jsonl_sidecar(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    with patch.object(config, 'SIDECAR_FORMAT', 'jsonl'):
+        mdf = MetaDataFrame([[1, 2]], columns=['a', 'b'])
+        mdf.to_csv(csv, index=False)
+        mdf.to_csv(csv, index=False)
+    assert (tmp_path / 'data.csv.meta.jsonl').exists()
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer', stages='latest')
+    metadata = read_csv(csv).metadata
+    assert metadata['metadata_filepath'].endswith('.meta.jsonl')
+    assert 'stages' not in metadata
+    assert 'storage' in metadata
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer', stages='all')
+    assert len(read_csv(csv).metadata['stages']) == 2
+
+
+@pytest.mark.parametrize('compression', ['none', 'gzip', 'zstd'])
+def test_save_as_msgpack_merges_stages(tmp_path, compression):
+    pytest.importorskip('msgpack')
+    filepath = tmp_path / 'data.csv.meta.msgpack'
+    md = MetaData()
+    with patch.object(config, 'SIDECAR_COMPRESSION', compression):
+        for i in range(3):
+            md.save_sidecar(filepath=filepath, data={'stage': i, 'method': pd.DataFrame.to_csv})
+    # compression is detected when reading, regardless of configuration
+    stages = read_stages(filepath)
+    assert [s['stage'] for s in stages] == [0, 1, 2]
+    assert stages[0]['method'] is pd.DataFrame.to_csv
+    assert load_sidecar(filepath, stages='latest')['stage'] == 2
+
+
+def test_save_as_msgpack_corrupt(tmp_path):
+    pytest.importorskip('msgpack')
+    filepath = tmp_path / 'data.csv.meta.msgpack'
+    filepath.write_bytes(b'\x1f\x8bnot-really-gzip')
+    with pytest.warns(UserWarning, match='Error decoding MSGPACK'):
+        MetaData().save_as_msgpack(filepath=filepath, data={'stage': 0})
+    assert read_stages(filepath, latest=True) == [{'stage': 0}]
+
+
+def test_hooks_with_msgpack_sidecar(tmp_path):
+    pytest.importorskip('msgpack')
+    csv = str(tmp_path / 'data.csv')
+    with patch.object(config, 'SIDECAR_FORMAT', 'msgpack'):
+        MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(csv, index=False)
+    assert (tmp_path / 'data.csv.meta.msgpack').exists()
+    assert find_sidecar(csv) == sidecar_path(csv, 'msgpack')
+    metadata = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')(csv).metadata
+    assert metadata['metadata_filepath'].endswith('.meta.msgpack')
+    assert callable(metadata['storage']['method'])
+
+
+def test_hooks_fall_back_to_json_without_msgpack(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    with patch.object(config, 'SIDECAR_FORMAT', 'msgpack'), patch('metapandas.serializers.msgpack', None):
+        with pytest.warns(UserWarning, match='saving as json instead'):
+            MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(csv, index=False)
+    assert (tmp_path / 'data.csv.meta.json').exists()
+    assert not (tmp_path / 'data.csv.meta.msgpack').exists()
+
+
+def test_hooks_reject_unknown_sidecar_format_before_writing(tmp_path):
+    csv = tmp_path / 'data.csv'
+    with patch.object(config, 'SIDECAR_FORMAT', 'yaml'):
+        with pytest.raises(ValueError, match='Unknown sidecar format'):
+            MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(str(csv), index=False)
+    assert not csv.exists()
@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from unittest.mock import patch
+
+from metapandas import config
+from metapandas.metadataframe import MetaDataFrame
+from metapandas.hooks.pandas import pandas_read_with_metadata
+from metapandas.store import EnvironmentStore, get_environment_store, resolve_environment_refs
+
+
+ENVIRONMENT = {'os': 'Linux', 'python-packages': {'pandas': '1.1.3'}, 'environment-variables': {'HOME': '/'}}
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = EnvironmentStore(tmp_path)
+    ref = store.put({'b': 1, 'a': [1, 2]})
+    assert ref.startswith('sha256:')
+    assert EnvironmentStore(tmp_path).put({'a': [1, 2], 'b': 1}) == ref
+    assert len(list(tmp_path.glob('*/*.json'))) == 1
+    assert EnvironmentStore(tmp_path).get(ref) == {'a': [1, 2], 'b': 1}
+
+
+def test_split_and_resolve(tmp_path):
+    store = EnvironmentStore(tmp_path)
+    metadata = store.split(ENVIRONMENT)
+    assert 'python-packages' not in metadata
+    assert metadata['os'] == 'Linux'
+    assert store.resolve(metadata)['python-packages'] == {'pandas': '1.1.3'}
+
+
+def test_resolve_environment_refs_within_stages(tmp_path):
+    metadata = {'stages': [get_environment_store(tmp_path).split(ENVIRONMENT), {'os': 'Windows'}]}
+    with patch.object(config, 'TRUST_SIDECAR_ENVIRONMENT_STORE', 1):
+        resolved = resolve_environment_refs(metadata)
+    assert resolved['stages'][0]['environment-variables'] == {'HOME': '/'}
+    assert resolved['stages'][1] == {'os': 'Windows'}
+
+
+def test_save_and_read_with_environment_store(tmp_path):
+    csv = tmp_path / 'data.csv'
+    with patch.object(config, 'ENVIRONMENT_STORE_DIR', str(tmp_path / 'store')):
+        MetaDataFrame([[1, 2]], columns=['a', 'b']).to_csv(str(csv), index=False)
+        MetaDataFrame([[3, 4]], columns=['a', 'b']).to_csv(str(tmp_path / 'other.csv'), index=False)
+    sidecar = (tmp_path / 'data.csv.meta.json').read_text()
+    assert 'python-packages' not in sidecar
+    assert 'environment-ref' in sidecar
+    assert len(list((tmp_path / 'store').glob('*/*.json'))) == 1
+
+    read_csv = pandas_read_with_metadata(pd.read_csv, argname='filepath_or_buffer')
+    assert 'python-packages' not in read_csv(str(csv)).metadata  # the recorded store is not trusted
+    with patch.object(config, 'TRUST_SIDECAR_ENVIRONMENT_STORE', 1):
+        assert 'python-packages' in read_csv(str(csv)).metadata
+    with patch.object(config, 'ENVIRONMENT_STORE_DIR', str(tmp_path / 'store')):
+        assert 'python-packages' in read_csv(str(csv)).metadata
+
+
+def test_crafted_references_are_not_resolved(tmp_path):
+    store = EnvironmentStore(tmp_path / 'store')
+    ref = store.put({'python-packages': {}})
+    (tmp_path / 'secret.json').write_text('{"password": "x"}')
+    (tmp_path / 'list.json').write_text('[1, 2]')
+    for crafted in ('sha256:../../secret', 'sha256:' + '0' * 63, '../secret', None, 1):
+        with pytest.raises(KeyError):
+            store.get(crafted)
+
+    # a blob whose content does not match its digest, or is not a dictionary, is rejected
+    digest = ref.split(':')[1]
+    blob = tmp_path / 'store' / digest[:2] / '{}.json'.format(digest)
+    blob.write_text('[1, 2]')
+    with pytest.raises(KeyError):
+        EnvironmentStore(tmp_path / 'store').get(ref)
+
+    metadata = {'environment-ref': 'sha256:../../secret', 'environment-store': str(tmp_path / 'store')}
+    with patch.object(config, 'TRUST_SIDECAR_ENVIRONMENT_STORE', 1), \
+            patch.object(config, 'ENVIRONMENT_STORE_DIR', str(tmp_path / 'store')):
+        assert resolve_environment_refs(metadata) == metadata
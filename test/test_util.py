@@ -117,3 +117,42 @@ def test_verr_VERBOSE():
     with redirect_stderr(stream):
         util.verr('Hello world', end='')
     assert stream.getvalue() == 'Hello world'
+
+
+def test_atomic_write(tmp_path):
+    filepath = tmp_path / 'data.txt'
+    util.atomic_write(filepath, 'first')
+    util.atomic_write(filepath, b'second')
+    assert filepath.read_text() == 'second'
+    assert [p.name for p in tmp_path.iterdir()] == ['data.txt']
+
+
+def test_atomic_write_permissions(tmp_path):
+    filepath = tmp_path / 'data.txt'
+    util.atomic_write(filepath, 'data')
+    assert filepath.stat().st_mode & 0o777 == 0o666 & ~util._UMASK
+
+
+def test_locked_file_follows_replaced_file(tmp_path):
+    filepath = tmp_path / 'data.txt'
+    with util.locked_file(filepath) as f:
+        assert f.read() == ''
+        util.atomic_write(filepath, 'replaced')
+    with util.locked_file(filepath) as f:
+        assert f.read() == 'replaced'
+
+
+def test_summarise_arguments():
+    import numpy as np
+
+    args, kwargs = util.summarise_arguments(
+        (list(range(10 ** 6)), 'path.csv', 3, None), {'array': np.zeros((4, 2))}, max_bytes=100
+    )
+    assert args[0]['type'] == 'list' and args[0]['len'] == 10 ** 6 and len(args[0]['repr']) <= 80
+    assert args[1:] == ('path.csv', 3, None)
+    assert kwargs == {'array': {'type': 'numpy.ndarray', 'shape': [4, 2], 'dtype': 'float64'}}
+    # the repr budget is exhausted by the first argument
+    args, _ = util.summarise_arguments((['x'] * 100, ['y'] * 100, ['z'] * 100), {}, max_bytes=100)
+    assert args[0]['repr'] == "['x', 'x', 'x', 'x', 'x', 'x', ...]"
+    assert args[1]['repr'].endswith('...') and len(args[1]['repr']) < len(args[0]['repr'])
+    assert 'repr' not in args[2]
@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+import pytest
+
+from metapandas.metadata import MetaData
+from metapandas.sidecar import load_sidecar, sidecar_path
+
+
+def test_writer_streams_chunks_with_a_single_stage(tmp_path):
+    csv = str(tmp_path / 'data.csv')
+    chunks = [pd.DataFrame({'a': range(start, start + 10), 'b': 'x'}) for start in range(0, 25, 10)]
+    chunks[-1] = chunks[-1].head(5)
+    chunks[0].meta['source'] = 'generated'
+
+    with MetaData().writer(csv, index=False) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+        assert writer.summary()['rows'] == 25
+        assert not os.path.exists(sidecar_path(csv))
+
+    pd.testing.assert_frame_equal(pd.read_csv(csv), pd.concat(chunks, ignore_index=True))
+    metadata = load_sidecar(sidecar_path(csv))
+    assert 'stages' not in metadata
+    assert metadata['source'] == 'generated'
+    chunked = metadata['storage']['chunked']
+    assert chunked['rows'] == 25 and chunked['chunks'] == 3 and chunked['completed']
+    assert (chunked['min-chunk-rows'], chunked['max-chunk-rows']) == (5, 10)
+    assert chunked['columns'] == ['a', 'b']
+
+    with pytest.raises(ValueError):
+        writer.write(chunks[0])
+
+
+def test_writer_marks_failed_output_incomplete(tmp_path):
+    jsonl = str(tmp_path / 'data.jsonl')
+    with pytest.raises(RuntimeError):
+        with MetaData().writer(jsonl) as writer:
+            writer.write(pd.DataFrame({'a': [1, 2]}))
+            writer.write(pd.DataFrame({'a': [3]}))
+            raise RuntimeError('interrupted')
+
+    assert pd.read_json(jsonl, lines=True)['a'].tolist() == [1, 2, 3]
+    chunked = load_sidecar(sidecar_path(jsonl))['storage']['chunked']
+    assert chunked['rows'] == 3 and not chunked['completed']
+
+
+def test_writer_without_chunks_saves_nothing(tmp_path):
+    csv = str(tmp_path / 'empty.csv')
+    with MetaData().writer(csv) as writer:
+        pass
+    assert writer.close() is None
+    assert not os.path.exists(csv) and not os.path.exists(sidecar_path(csv))
+
+    with pytest.raises(ValueError):
+        MetaData().writer(csv, method='to_excel')
+
+    # an unknown extension is not written as csv unless asked to
+    parquet = str(tmp_path / 'data.parquet')
+    with pytest.raises(ValueError):
+        MetaData().writer(parquet)
+    dat = str(tmp_path / 'data.dat')
+    with MetaData().writer(dat, method='to_csv', index=False) as writer:
+        writer.write(pd.DataFrame({'a': [1]}))
+    assert pd.read_csv(dat)['a'].tolist() == [1]
+    assert not os.path.exists(parquet)
+
+
+def test_writer_appends_to_hdf(tmp_path):
+    pytest.importorskip('tables')
+    h5 = str(tmp_path / 'data.h5')
+    with MetaData().writer(h5, key='data') as writer:
+        for start in range(0, 20, 10):
+            writer.write(pd.DataFrame({'a': range(start, start + 10)}))
+    assert len(pd.read_hdf(h5, 'data')) == 20
+    assert load_sidecar(sidecar_path(h5))['storage']['chunked']['chunks'] == 2